@@ -14,6 +14,8 @@ app.conf.imports = (
     "celery_app.extractors.extract_pdf",
     "celery_app.extractors.extract_structured_file",
     "celery_app.tasks.conversations",
+    "celery_app.tasks.vector_snapshots",
+    "celery_app.tasks.search_metrics",
 )
 app.conf.timezone = 'Asia/Taipei'
 app.conf.enable_utc = True
@@ -28,12 +30,24 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=1, minute=0),
         'options': {'queue': 'static_crawler_queue'},
     },
+    'vector-snapshots-daily': {
+        'task': 'celery_app.tasks.vector_snapshots.rebuild_vector_snapshots',
+        'schedule': crontab(hour=5, minute=0),
+        'options': {'queue': 'static_crawler_queue'},
+    },
+    'search-metrics-purge-daily': {
+        'task': 'celery_app.tasks.search_metrics.purge_expired_search_metrics',
+        'schedule': crontab(hour=4, minute=30),
+        'options': {'queue': 'static_crawler_queue'},
+    },
 }
 
 app.conf.task_routes = {
     'celery_app.crawlers.symptoms.*': {'queue': 'dynamic_crawler_queue'},
     'celery_app.crawlers.gov_datas.*': {'queue': 'static_crawler_queue'},
     'celery_app.tasks.conversations.*': {'queue': 'conversation_queue'},
+    'celery_app.tasks.vector_snapshots.*': {'queue': 'static_crawler_queue'},
+    'celery_app.tasks.search_metrics.*': {'queue': 'static_crawler_queue'},
     'celery_app.extractors.*': {'queue': 'extractor_queue'},
 }
 
@@ -214,18 +214,146 @@ LOGOUT_REDIRECT_URL = '/login/'
 # Django Channels 設置
 ASGI_APPLICATION = 'RAGPilot.asgi.application'
 
-# Channel layers 設置
-REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# Channel layers 設置（與 Celery 共用 REDIS_HOST）
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_URL = os.getenv('REDIS_URL', f'redis://{REDIS_HOST}:6379/0')
+# 設為 redis 時 Celery worker 發出的檔案處理進度可以即時推送到網頁；memory 只能在同一行程內傳遞，頁面改以輪詢資料庫取得進度
+CHANNEL_LAYER_BACKEND = os.getenv('CHANNEL_LAYER_BACKEND', 'memory')
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 # 自建資料源檔案儲存設定
 # 您可以透過環境變數 SOURCE_FILES_DIR 來設定檔案儲存目錄
 # 例如：export SOURCE_FILES_DIR="/path/to/your/source/files"
 SOURCE_FILES_DIR = os.getenv('SOURCE_FILES_DIR', str(BASE_DIR / 'source_files'))
 
+# 單一上傳檔案大小上限（MB）：PDF 以逐頁串流處理，上限可以比結構化檔案（CSV、JSON、XML）高
+SOURCE_FILE_MAX_SIZE_MB = int(os.getenv('SOURCE_FILE_MAX_SIZE_MB', 20))
+SOURCE_PDF_MAX_SIZE_MB = int(os.getenv('SOURCE_PDF_MAX_SIZE_MB', 200))
+
 # Django Messages Framework 設定
 MESSAGE_LEVEL = messages_constants.WARNING
+
+# 檢索快取設定：行程內 LRU 在前，共用 Redis 在後
+# 快取使用獨立的 Redis（docker-compose 的 redis-cache，maxmemory + allkeys-lru），
+# 不與 Celery broker / channel layer 共用，記憶體滿時只淘汰快取鍵
+SEARCH_CACHE_REDIS_HOST = os.getenv('SEARCH_CACHE_REDIS_HOST', REDIS_HOST)
+SEARCH_CACHE_REDIS_PORT = os.getenv('SEARCH_CACHE_REDIS_PORT', '6380')
+SEARCH_CACHE_REDIS_URL = os.getenv(
+    'SEARCH_CACHE_REDIS_URL',
+    f'redis://{SEARCH_CACHE_REDIS_HOST}:{SEARCH_CACHE_REDIS_PORT}/0'
+)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SEARCH_CACHE_REDIS_URL,
+        'KEY_PREFIX': 'ragpilot',
+    },
+    # 資料集版本號不能被淘汰，存放在有持久化、不設 maxmemory 淘汰的主要 Redis（REDIS_URL）
+    'corpus': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'ragpilot',
+    },
+}
+
+# 查詢向量快取（依模型與正規化後的查詢文字定址）
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', 2048))
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL', 60 * 60 * 24 * 7))
+
+# 文件 embedding 批次設定：每次請求的筆數與 token 上限，以及並行的請求數
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 256))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', 100000))
+EMBEDDING_MAX_WORKERS = int(os.getenv('EMBEDDING_MAX_WORKERS', 4))
+
+# 文件 embedding 儲存區（home.EmbeddingRecord）前方的行程內快取筆數與存活時間（秒）
+EMBEDDING_STORE_MEMORY_SIZE = int(os.getenv('EMBEDDING_STORE_MEMORY_SIZE', 5000))
+EMBEDDING_STORE_MEMORY_TTL = int(os.getenv('EMBEDDING_STORE_MEMORY_TTL', 60 * 60 * 24))
+
+# PDF 串流處理時每個視窗的頁數，每個視窗切段、embedding、寫入後即釋放
+PDF_STREAMING_PAGE_WINDOW = int(os.getenv('PDF_STREAMING_PAGE_WINDOW', 20))
+
+# 文件摘要 map 步驟的並行數、排隊上限，以及依段落內容快取 map 結果的筆數與存活時間（秒）
+SUMMARY_MAP_MAX_WORKERS = int(os.getenv('SUMMARY_MAP_MAX_WORKERS', 4))
+SUMMARY_MAP_MAX_PENDING = int(os.getenv('SUMMARY_MAP_MAX_PENDING', 64))
+SUMMARY_MAP_CACHE_SIZE = int(os.getenv('SUMMARY_MAP_CACHE_SIZE', 1024))
+SUMMARY_MAP_CACHE_TTL = int(os.getenv('SUMMARY_MAP_CACHE_TTL', 60 * 60 * 24 * 7))
+
+# PDF 父段落向量的產生方式：embed 為重新 embedding 整段文字；pooled 為沿用切段時各句子視窗向量的平均（不需額外請求）
+PDF_PARENT_EMBEDDING_MODE = os.getenv('PDF_PARENT_EMBEDDING_MODE', 'embed')
+
+# hybrid search 背景執行緒數量（向量路線與關鍵字路線並行）
+SEARCH_MAX_WORKERS = int(os.getenv('SEARCH_MAX_WORKERS', 8))
+
+# pgvector HNSW 查詢時的候選數量（hnsw.ef_search），需大於等於每次查詢的 LIMIT
+SEARCH_HNSW_EF_SEARCH = int(os.getenv('SEARCH_HNSW_EF_SEARCH', 40))
+
+# 向量搜尋第一階段使用的精度（full / halfvec / binary / short），非 full 時會再以完整向量重新計分
+# 每個向量欄位只保留此精度的 HNSW 索引（halfvec / binary 取代 full 索引，需要 pgvector 0.7 以上），
+# 修改後需執行 sync_vector_indexes；縮短維度欄位只在 short 時寫入，切換為 short 前先執行 backfill_short_embeddings
+SEARCH_VECTOR_PRECISION = os.getenv('SEARCH_VECTOR_PRECISION', 'full')
+# 量化精度第一階段取回的候選倍數（相對於 candidate_pool）
+SEARCH_RESCORE_FACTOR = int(os.getenv('SEARCH_RESCORE_FACTOR', 4))
+
+# 過濾後預估筆數不超過此值時，向量查詢改用精確掃描（不走 HNSW）
+SEARCH_EXACT_SCAN_THRESHOLD = int(os.getenv('SEARCH_EXACT_SCAN_THRESHOLD', 5000))
+
+# hybrid search 排序策略（remote / adaptive / local），依呼叫端區分
+# adaptive：候選數量不超過 top_n，或本地融合分數在 top_n 邊界的相對差距超過門檻時，略過 Cohere rerank
+SEARCH_RERANK_POLICIES = {
+    'default': os.getenv('SEARCH_RERANK_POLICY_DEFAULT', 'adaptive'),
+    'list_view': os.getenv('SEARCH_RERANK_POLICY_LIST_VIEW', 'adaptive'),
+    'chat_tool': os.getenv('SEARCH_RERANK_POLICY_CHAT_TOOL', 'remote'),
+    'reference': os.getenv('SEARCH_RERANK_POLICY_REFERENCE', 'local'),
+}
+SEARCH_RERANK_SKIP_MARGIN = float(os.getenv('SEARCH_RERANK_SKIP_MARGIN', 0.15))
+
+# Cohere rerank 結果快取（依正規化問題與候選內容雜湊定址）
+RERANK_CACHE_SIZE = int(os.getenv('RERANK_CACHE_SIZE', 1024))
+RERANK_CACHE_TTL = int(os.getenv('RERANK_CACHE_TTL', 60 * 60 * 6))
+
+# 列表頁語意搜尋的分頁快取：第一次搜尋取回較深的候選集合並快取排序後的 id，換頁時直接切片
+SEARCH_SESSION_CANDIDATE_POOL = int(os.getenv('SEARCH_SESSION_CANDIDATE_POOL', 50))
+SEARCH_SESSION_CACHE_SIZE = int(os.getenv('SEARCH_SESSION_CACHE_SIZE', 512))
+SEARCH_SESSION_TTL = int(os.getenv('SEARCH_SESSION_TTL', 60 * 30))
+# 列表頁搜尋送交 Cohere rerank 的候選數上限為每頁筆數的幾倍，其餘名次依本地融合分數排序
+SEARCH_LIST_VIEW_RERANK_FACTOR = int(os.getenv('SEARCH_LIST_VIEW_RERANK_FACTOR', 2))
+
+# 爬蟲資料（Symptom / Dataset）的行程內向量快照，爬取完成後由 Celery 重建
+# 快照目錄需為 web 與 worker 共用的路徑；快照過期或資料版本不符時自動改用 pgvector
+VECTOR_SNAPSHOT_ENABLED = os.getenv('VECTOR_SNAPSHOT_ENABLED', 'False').lower() == 'true'
+VECTOR_SNAPSHOT_DIR = os.getenv('VECTOR_SNAPSHOT_DIR', str(BASE_DIR / 'vector_snapshots'))
+VECTOR_SNAPSHOT_MAX_AGE = int(os.getenv('VECTOR_SNAPSHOT_MAX_AGE', 60 * 60 * 24 * 2))
+# 爬取完成後延後多久重建快照（秒），期間內多次重建要求合併為一次
+VECTOR_SNAPSHOT_REBUILD_DELAY = int(os.getenv('VECTOR_SNAPSHOT_REBUILD_DELAY', 60 * 10))
+
+# 聊天工具的語意查詢快取：查詢向量（前 256 維）餘弦相似度達門檻即沿用先前的結果清單
+SEMANTIC_QUERY_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_QUERY_CACHE_THRESHOLD', 0.92))
+SEMANTIC_QUERY_CACHE_TTL = int(os.getenv('SEMANTIC_QUERY_CACHE_TTL', 60 * 60 * 6))
+SEMANTIC_QUERY_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_QUERY_CACHE_MAX_ENTRIES', 200))
+
+# hybrid search 階段耗時紀錄的輸出位置，以逗號分隔（log / print / redis / database 或自訂類別路徑）
+# 預設只寫入 logging；database 每次搜尋寫入約十筆，需要時再開啟
+SEARCH_METRICS_SINKS = [
+    sink.strip() for sink in os.getenv('SEARCH_METRICS_SINKS', 'log').split(',') if sink.strip()
+]
+# database 輸出的保留天數，由排程每日清除過期紀錄
+SEARCH_METRICS_RETENTION_DAYS = int(os.getenv('SEARCH_METRICS_RETENTION_DAYS', 14))
+# 每個階段的 Redis Stream 保留筆數上限
+SEARCH_METRICS_REDIS_MAXLEN = int(os.getenv('SEARCH_METRICS_REDIS_MAXLEN', 10000))
@@ -1,14 +1,24 @@
+import hashlib
 import io
+import os
+import tempfile
+from typing import Iterator
 import requests
 import pandas as pd
 from crawlers.models import Dataset, File, ASSOCIATED_CATEGORIES_DATABASE_NAME
 from RAGPilot.celery import app
-from langchain_openai import OpenAIEmbeddings
 from django.conf import settings
 from utils.str_date import parse_datetime_string
 from utils.file_to_df import FileDataFrameHandler
+from utils.embeddings import embed_texts
+from utils.vectors import short_embedding_for_storage
+from celery_app.tasks.vector_snapshots import schedule_vector_snapshot_rebuild
+from utils.corpus_version import coalesce_corpus_version_bumps
 from fake_useragent import UserAgent
 
+# 下載資料集檔案時每次寫入暫存檔的位元組數
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 @app.task()
 def period_crawl_government_datasets(demo=False):
@@ -27,40 +37,45 @@ def period_crawl_government_datasets(demo=False):
 
     processed_datasets = 0
 
-    for category in [tmp for tmp in categories if tmp in ASSOCIATED_CATEGORIES_DATABASE_NAME]:
-        sub_df = filtered_df[filtered_df['服務分類'] == category]
-        for _, row in sub_df.iterrows():
-            dataset, created = Dataset.objects.update_or_create(
-                dataset_id=row.資料集識別碼,
-                defaults={
-                    'url': f"https://data.gov.tw/dataset/{row.資料集識別碼}",
-                    'name': row.資料集名稱,
-                    'category': row.服務分類,
-                    'description': row.資料集描述,
-                    'description_embeddings': OpenAIEmbeddings(
-                        model="text-embedding-3-small").embed_query(row.資料集描述),
-                    'department': row.提供機關,
-                    'update_frequency': row.更新頻率,
-                    'license': row.授權方式,
-                    'price': row.計費方式,
-                    'contact_person': row.提供機關聯絡人姓名 if pd.notna(row.提供機關聯絡人姓名) else None,
-                    'contact_phone': row.提供機關聯絡人電話 if pd.notna(row.提供機關聯絡人電話) else None,
-                    'upload_time': parse_datetime_string(row.上架日期),
-                    'update_time': parse_datetime_string(row.詮釋資料更新時間),
-                }
-            )
-
-            if created:
-                print(f"新增資料集: {dataset.name}")
+    with coalesce_corpus_version_bumps():
+        for category in [tmp for tmp in categories if tmp in ASSOCIATED_CATEGORIES_DATABASE_NAME]:
+            sub_df = filtered_df[filtered_df['服務分類'] == category]
+            for _, row in sub_df.iterrows():
+                # 描述沒有變動的資料集直接沿用儲存區中的向量
+                description_embeddings = embed_texts([row.資料集描述])[0]
+                dataset, created = Dataset.objects.update_or_create(
+                    dataset_id=row.資料集識別碼,
+                    defaults={
+                        'url': f"https://data.gov.tw/dataset/{row.資料集識別碼}",
+                        'name': row.資料集名稱,
+                        'category': row.服務分類,
+                        'description': row.資料集描述,
+                        'description_embeddings': description_embeddings,
+                        'description_embeddings_short': short_embedding_for_storage(description_embeddings),
+                        'department': row.提供機關,
+                        'update_frequency': row.更新頻率,
+                        'license': row.授權方式,
+                        'price': row.計費方式,
+                        'contact_person': row.提供機關聯絡人姓名 if pd.notna(row.提供機關聯絡人姓名) else None,
+                        'contact_phone': row.提供機關聯絡人電話 if pd.notna(row.提供機關聯絡人電話) else None,
+                        'upload_time': parse_datetime_string(row.上架日期),
+                        'update_time': parse_datetime_string(row.詮釋資料更新時間),
+                    }
+                )
+
+                if created:
+                    print(f"新增資料集: {dataset.name}")
             
-            if demo:
-                process_dataset_files(row.to_dict(), dataset.id)
-            else:
-                process_dataset_files.delay(row.to_dict(), dataset.id)
-            processed_datasets += 1
+                if demo:
+                    process_dataset_files(row.to_dict(), dataset.id)
+                else:
+                    process_dataset_files.delay(row.to_dict(), dataset.id)
+                processed_datasets += 1
 
     print(f"完成處理 {processed_datasets} 個資料集")
 
+    schedule_vector_snapshot_rebuild(["crawlers.Dataset"], demo=demo)
+
 
 @app.task()
 def process_dataset_files(data: dict, dataset_id: int):
@@ -86,77 +101,82 @@ def process_dataset_files(data: dict, dataset_id: int):
         if file_format not in ['csv', 'xml', 'json']:
             continue
 
+        # 檔案串流下載到暫存檔，再逐段解析寫入資料表，不需把整個檔案讀進記憶體
         try:
-            response = requests.get(download_url, verify=False, timeout=30, headers={'User-Agent': UserAgent().random})
-            response.raise_for_status()
+            path, content_md5 = _download_dataset_file(download_url)
         except Exception as e:
             print(f"下載失敗 {download_url}: {str(e)}")
             continue
-        
+
         try:
-            df = handler.convert_to_dataframe(response.content, file_format, encoding)
-        except Exception as e:
-            print(f"讀取失敗 {download_url}: {str(e)}")
-            continue
-        
-        if df is None or df.empty:
-            continue
-            
-        df_md5 = handler.get_dataframe_md5(df)
+            if content_md5 in seen_md5:
+                continue
 
-        if df_md5 in seen_md5:
-            continue
+            if File.objects.filter(content_md5=content_md5).exists():
+                continue
 
-        if File.objects.filter(content_md5=df_md5).exists():
-            continue
+            seen_md5.add(content_md5)
 
-        try:
-            seen_md5.add(df_md5)
-            
             column_description = data.主要欄位說明.split(';') if pd.notna(data.主要欄位說明) else []
             success, result = _process_and_save_dataset_file(
-                handler, df, dataset, download_url, file_format, encoding, column_description
+                handler, path, dataset, download_url, file_format, encoding, column_description, content_md5
             )
-            
+
             if success:
                 new_tables.append(result)
             else:
                 print(f"儲存失敗 {download_url}: {result}")
         except Exception as e:
-            seen_md5.discard(df_md5)
+            seen_md5.discard(content_md5)
             print(f"處理失敗 {download_url}: {str(e)}")
-    
+        finally:
+            os.remove(path)
+
     if new_tables:
         print(f"資料集 {dataset.name} 新增 {len(new_tables)} 個檔案")
 
 
-def _process_and_save_dataset_file(handler: FileDataFrameHandler, df: pd.DataFrame, 
-                                 dataset: Dataset, download_url: str, file_format: str, 
-                                 encoding: str, column_description: list) -> tuple[bool, str]:
-    if df is None or df.empty:
-        return False, "DataFrame 為空"
-    
-    content_md5 = handler.get_dataframe_md5(df)
-    
-    if File.objects.filter(content_md5=content_md5).exists():
-        return False, "相同內容的檔案已存在"
-    
+def _download_dataset_file(download_url: str) -> tuple[str, str]:
+    """
+    以 stream=True 分段寫入暫存檔，同時計算檔案內容的 MD5，回傳 (暫存檔路徑, MD5)；
+    暫存檔由呼叫端負責刪除。
+    """
+    digest = hashlib.md5()
+    with requests.get(
+        download_url, verify=False, timeout=30, stream=True, headers={'User-Agent': UserAgent().random}
+    ) as response:
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            try:
+                for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    digest.update(block)
+                    f.write(block)
+            except Exception:
+                f.close()
+                os.remove(f.name)
+                raise
+    return f.name, digest.hexdigest()
+
+
+def _process_and_save_dataset_file(handler: FileDataFrameHandler, path: str,
+                                 dataset: Dataset, download_url: str, file_format: str,
+                                 encoding: str, column_description: list, content_md5: str) -> tuple[bool, str]:
     table_name = f"{dataset.dataset_id}_{content_md5}"
     database_name = ASSOCIATED_CATEGORIES_DATABASE_NAME[dataset.category]
-    
+
     try:
-        processed_df = _prepare_dataframe_for_dataset_storage(
-            handler, df, dataset, download_url, file_format, content_md5
+        # 原始欄位名稱 -> Excel 風格欄位名稱，後續段落出現的新欄位依序接在後面
+        column_names = {}
+        processed_chunks = _prepare_chunks_for_dataset_storage(
+            handler,
+            handler.iter_dataframe_chunks(path, file_format, encoding),
+            column_names, dataset, download_url, file_format, content_md5,
         )
-        
-        column_mapping_list = _create_column_mapping_list(
-            handler, df, column_description
-        )
-        
-        success, message = handler.save_to_database(
-            processed_df, table_name, database_name
+
+        success, message, _ = handler.save_chunks_to_database(
+            processed_chunks, table_name, database_name
         )
-        
+
         if success:
             File.objects.create(
                 dataset=dataset,
@@ -166,34 +186,39 @@ def _process_and_save_dataset_file(handler: FileDataFrameHandler, df: pd.DataFra
                 content_md5=content_md5,
                 table_name=table_name,
                 database_name=database_name,
-                column_mapping_list=column_mapping_list,
+                column_mapping_list=_create_column_mapping_list(handler, len(column_names), column_description),
             )
-            
+
             return True, table_name
         else:
             return False, message
-            
+
     except Exception as e:
         return False, f"儲存失敗: {str(e)}"
 
 
-def _prepare_dataframe_for_dataset_storage(handler: FileDataFrameHandler, df: pd.DataFrame, 
-                                         dataset: Dataset, download_url: str, 
-                                         file_format: str, content_md5: str) -> pd.DataFrame:
-    processed_df = handler.rename_dataframe_columns_to_excel_style(df)
-    
-    processed_df['_dataset_id'] = dataset.dataset_id
-    processed_df['_original_url'] = download_url
-    processed_df['_original_format'] = file_format
-    processed_df['_content_md5'] = content_md5
-    processed_df['_created_at'] = pd.Timestamp.now()
-    
-    return processed_df
+def _prepare_chunks_for_dataset_storage(handler: FileDataFrameHandler, chunks: Iterator[pd.DataFrame],
+                                        column_names: dict, dataset: Dataset, download_url: str,
+                                        file_format: str, content_md5: str) -> Iterator[pd.DataFrame]:
+    created_at = pd.Timestamp.now()
+    for chunk in chunks:
+        new_columns = [column for column in chunk.columns if column not in column_names]
+        if new_columns:
+            excel_column_names = handler.generate_excel_column_names(len(column_names) + len(new_columns))
+            for column, excel_column_name in zip(new_columns, excel_column_names[len(column_names):]):
+                column_names[column] = excel_column_name
+
+        processed_chunk = chunk.rename(columns=column_names)
+        processed_chunk['_dataset_id'] = dataset.dataset_id
+        processed_chunk['_original_url'] = download_url
+        processed_chunk['_original_format'] = file_format
+        processed_chunk['_content_md5'] = content_md5
+        processed_chunk['_created_at'] = created_at
+        yield processed_chunk
 
 
-def _create_column_mapping_list(handler: FileDataFrameHandler, df: pd.DataFrame, 
+def _create_column_mapping_list(handler: FileDataFrameHandler, num_columns: int,
                               column_description: list) -> list:
-    num_columns = len(df.columns)
     excel_column_names = handler.generate_excel_column_names(num_columns)
     
     column_mapping_list = []
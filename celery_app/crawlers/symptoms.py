@@ -9,7 +9,10 @@ from selenium import webdriver
 from fake_useragent import UserAgent
 from RAGPilot.celery import app
 from crawlers.models import Symptom
-from langchain_openai import OpenAIEmbeddings
+from utils.embeddings import embed_texts
+from utils.vectors import short_embedding_for_storage
+from celery_app.tasks.vector_snapshots import schedule_vector_snapshot_rebuild
+from utils.corpus_version import coalesce_corpus_version_bumps
 
 
 START_POINTS = [
@@ -68,6 +71,7 @@ def get_paragraph(browser: Chrome, symptom: str, department: str):
                 continue
 
             clean_question = question.replace(" ", "").replace("\n", "")
+            question_embeddings = embed_texts([clean_question])[0]
             Symptom.objects.create(
                 subject_id=int(subject.split(" ")[0].replace("#", "")),
                 subject="".join(subject.split(" ")[1:]),
@@ -78,9 +82,8 @@ def get_paragraph(browser: Chrome, symptom: str, department: str):
                 answer=answer,
                 department=department,
                 answer_time=answer_time,
-                question_embeddings=OpenAIEmbeddings(
-                    model="text-embedding-3-small",
-                ).embed_query(clean_question),
+                question_embeddings=question_embeddings,
+                question_embeddings_short=short_embedding_for_storage(question_embeddings),
             )
         except Exception as e:
             print(e)
@@ -125,19 +128,22 @@ def symptom_crawler_task(department: str, start_url: str, demo=False):
     symptom_list = [tmp.get_attribute("value") for tmp in symptom_select_menu.find_elements(
         By.TAG_NAME, "option") if tmp.get_attribute("value")]
 
-    for symptom in symptom_list:
-        url = (f"https://sp1.hso.mohw.gov.tw/doctor/Often_question/type_detail.php?"
-               f"q_type={symptom}&UrlClass={department}")
-        browser.get(url)
-        page = 1
+    with coalesce_corpus_version_bumps():
+        for symptom in symptom_list:
+            url = (f"https://sp1.hso.mohw.gov.tw/doctor/Often_question/type_detail.php?"
+                   f"q_type={symptom}&UrlClass={department}")
+            browser.get(url)
+            page = 1
 
-        while browser.find_elements(By.CSS_SELECTOR, "ul.QAunit"):
-            get_paragraph(browser=browser, department=department, symptom=symptom)
+            while browser.find_elements(By.CSS_SELECTOR, "ul.QAunit"):
+                get_paragraph(browser=browser, department=department, symptom=symptom)
 
-            page += 1
-            tmp_url = url + f"&PageNo={page}"
+                page += 1
+                tmp_url = url + f"&PageNo={page}"
 
-            time.sleep(random.randint(4, 8))
-            browser.get(tmp_url)
+                time.sleep(random.randint(4, 8))
+                browser.get(tmp_url)
 
     browser.quit()
+
+    schedule_vector_snapshot_rebuild(["crawlers.Symptom"], demo=demo)
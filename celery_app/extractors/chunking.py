@@ -0,0 +1,80 @@
+from enum import StrEnum
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_experimental.text_splitter import SemanticChunker
+
+
+class ParentEmbeddingMode(StrEnum):
+    EMBED = "embed"  # 將整段父段落文字重新送去 embedding
+    POOLED = "pooled"  # 以切段時該段落各句子視窗向量的平均作為父段落向量
+
+
+class RecordingSemanticChunker(SemanticChunker):
+    """
+    SemanticChunker 為了找斷點，會把每個句子連同前後 buffer_size 句送去 embedding；
+    這裡把這些句子視窗向量依切出的段落分組保留在 chunk_window_embeddings，供後續沿用。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chunk_window_embeddings = []
+        self._last_sentences = None
+
+    def _calculate_sentence_distances(self, single_sentences_list):
+        distances, sentences = super()._calculate_sentence_distances(single_sentences_list)
+        self._last_sentences = sentences
+        return distances, sentences
+
+    def split_text(self, text: str) -> list[str]:
+        self._last_sentences = None
+        chunks = super().split_text(text)
+        self.chunk_window_embeddings.extend(self._group_window_embeddings(chunks))
+        return chunks
+
+    def take_chunk_window_embeddings(self) -> list[list]:
+        """取出目前累積的句子視窗向量並清空，串流處理時每個視窗取一次，避免整份文件的向量留在記憶體。"""
+        window_embeddings, self.chunk_window_embeddings = self.chunk_window_embeddings, []
+        return window_embeddings
+
+    def _group_window_embeddings(self, chunks: list[str]) -> list[list]:
+        # 只有一個句子時 SemanticChunker 不會呼叫 embedding，沒有可沿用的向量
+        if not self._last_sentences:
+            return [[] for _ in chunks]
+
+        # 段落為連續句子以空白相接而成，依長度依序對應回句子
+        sentences = self._last_sentences
+        groups, position = [], 0
+        for chunk in chunks:
+            group, length = [], -1
+            while position < len(sentences) and length < len(chunk):
+                length += len(sentences[position]["sentence"]) + 1
+                group.append(sentences[position]["combined_sentence_embedding"])
+                position += 1
+            groups.append(group)
+        return groups
+
+
+def pooled_embedding(vectors: list) -> list[float]:
+    """句子視窗向量取平均後做 L2 正規化。"""
+    pooled = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+    norm = np.linalg.norm(pooled)
+    return (pooled / norm if norm else pooled).tolist()
+
+
+def parent_chunk_embeddings(
+    parent_chunks: list[str],
+    window_embeddings: list[list],
+    embeddings: Embeddings,
+    mode: ParentEmbeddingMode = ParentEmbeddingMode.EMBED,
+) -> list[list[float]]:
+    """
+    pooled 模式下有句子視窗向量的段落直接取平均，其餘（例如單句段落）才送去 embedding；
+    embed 模式下全部重新 embedding，相同文字由 embeddings 的快取沿用。
+    """
+    if mode == ParentEmbeddingMode.EMBED:
+        return embeddings.embed_documents(parent_chunks)
+
+    vectors = [pooled_embedding(group) if group else None for group in window_embeddings]
+    missing = [text for text, vector in zip(parent_chunks, vectors) if vector is None]
+    embedded = iter(embeddings.embed_documents(missing))
+    return [vector if vector is not None else next(embedded) for vector in vectors]
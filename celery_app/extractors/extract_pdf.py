@@ -1,12 +1,18 @@
 from RAGPilot.celery import app
-from sources.models import SourceFile, SourceFileChunk, ProcessingStatus
+from sources.models import SourceFile, ProcessingStatus
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
+from django.conf import settings
+from django.db import transaction
 from langchain.chains.summarize import load_summarize_chain
 from langchain.prompts import PromptTemplate
+from langchain_core.documents import Document
 from celery_app.extractors import utils
-from langchain_experimental.text_splitter import SemanticChunker
+from celery_app.extractors.progress import ExtractionProgress, ProgressStage
+from celery_app.extractors.summarization import ParallelMapSummarizer
+from celery_app.extractors.chunking import ParentEmbeddingMode, RecordingSemanticChunker, parent_chunk_embeddings
+from utils.embeddings import CachedDocumentEmbeddings, EmbeddingUsage
 
 MAP_PROMPT = PromptTemplate.from_template("""
 你是一個專業的文本摘要助手，請將以下內容進行摘要，使用繁體中文，並保持重點清晰。摘要請控制在 200 字以內：
@@ -34,34 +40,21 @@ def extract_pdf_soruce_file_content(source_file_id: int):
         source_file.save()
         source_file.refresh_from_db()
         
-        if source_file.sourcefilechunk_set.count() > 0:
-            source_file.sourcefilechunk_set.all().delete()
+        # 既有片段不先刪除：內容沒有變動的父段落（連同 map 摘要）直接沿用，處理完後只刪除已不存在的父段落
+        existing_parents = utils.existing_parent_chunks(source_file)
     except Exception as e:
-        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "刪除 SourceFileChunk 物件失敗。")
-        return f"刪除 SourceFileChunk 物件失敗: {str(e)}"
+        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "讀取既有 SourceFileChunk 物件失敗。")
+        return f"讀取既有 SourceFileChunk 物件失敗: {str(e)}"
 
+    # 初始化 embeddings 模型，同一檔案內相同的文字只會送出一次
     try:
-        # 使用 PyPDFLoader 載入 PDF
-        loader = PyPDFLoader(source_file.path)
-        documents = loader.load()
-    except Exception as e:
-        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "載入 PDF 檔案失敗。")
-        return f"載入 PDF 檔案失敗: {str(e)}"
-        
-    if not documents:
-        utils.set_source_file_status(source_file, ProcessingStatus.COMPLETED)
-        source_file.summary = f"PDF 檔案 {source_file.filename} 沒有可提取的內容，請使用其他方式提取內容。"
-        source_file.save()
-        return f"PDF 檔案 {source_file.filename} 沒有可提取的內容，請使用其他方式提取內容。"
-    
-    # 初始化 embeddings 模型
-    try:
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        embedding_usage = EmbeddingUsage()
+        embeddings = CachedDocumentEmbeddings(usage=embedding_usage)
     except Exception as e:
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "初始化 embeddings 模型失敗。")
         return f"初始化 embeddings 模型失敗: {str(e)}"
     
-    parent_text_splitter = SemanticChunker(
+    parent_text_splitter = RecordingSemanticChunker(
         embeddings=embeddings,
         buffer_size=3,  # 增加緩衝區大小，提供更好的上下文
         add_start_index=True,  # 啟用索引追蹤，便於除錯
@@ -76,73 +69,174 @@ def extract_pdf_soruce_file_content(source_file_id: int):
         separators=["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""]  # 支援中英文分隔符
     )
 
-    try:
-        parent_chunks_docs = parent_text_splitter.split_documents(documents)
-        parent_chunks = [doc.page_content for doc in parent_chunks_docs]
-        tmp_parent_chunks = "---".join(parent_chunks)
-        print(tmp_parent_chunks)
-        
-        # 分批處理 embeddings 以避免 API 限制
-        parent_chunk_embeddings = []
-        batch_size = 1000  # 每批處理 1000 個文字塊，OpenAI API 可以處理更大批次
-        
-        for i in range(0, len(parent_chunks), batch_size):
-            batch = parent_chunks[i:i + batch_size]
-            batch_embeddings = embeddings.embed_documents(batch)
-            parent_chunk_embeddings.extend(batch_embeddings)
-            
-    except Exception as e:
-        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "分割父段落失敗。")
-        return f"分割父段落失敗: {str(e)}"
-    
+    # map_reduce 摘要拆成兩段：map 在背景執行緒池中與切段、寫入同時進行，全部頁面處理完再 reduce
     try:
         llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-        chain = load_summarize_chain(
+        summary_chain = load_summarize_chain(
             llm, 
             chain_type="map_reduce", 
             map_prompt=MAP_PROMPT, 
             combine_prompt=COMBINE_PROMPT
         )
-        summary = chain.invoke(parent_chunks_docs)
-        source_file.summary = summary.get("output_text")
-        source_file.save()
-        source_file.refresh_from_db()
     except Exception as e:
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "生成摘要失敗。")
         return f"生成摘要失敗: {str(e)}"
-    
+
+    # 使用 PyPDFLoader 逐頁串流載入 PDF，每次只處理一個視窗的頁面，記憶體用量不隨檔案大小增加
+    # 檔案不存在或無法讀取時 PyPDFLoader 會直接拋出例外，需標記為失敗，避免檔案停在處理中
+    try:
+        page_windows = utils.iter_windows(
+            PyPDFLoader(source_file.path).lazy_load(),
+            settings.PDF_STREAMING_PAGE_WINDOW,
+        )
+        # 處理進度寫入 SourceFile.progress 並推送到資料源頁面
+        progress = ExtractionProgress(source_file, total_pages=utils.count_pdf_pages(source_file.path))
+    except Exception as e:
+        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "載入 PDF 檔案失敗。")
+        return f"載入 PDF 檔案失敗: {str(e)}"
+
+    page_count = 0
+    parent_chunks_unchanged = 0
     parent_chunks_created = 0
+    parent_chunks_deleted = 0
     child_chunks_created = 0
-    
-    for i, (parent_chunk_text, embedding) in enumerate(zip(parent_chunks, parent_chunk_embeddings)):
-        try:
-            parent_chunk = SourceFileChunk.objects.create(
-                user=source_file.user,
-                source_file=source_file,
-                content=parent_chunk_text,
-                content_embedding=embedding
-            )
-            parent_chunks_created += 1
-
-            # 分割子文字塊
-            child_chunks = child_text_splitter.split_text(parent_chunk_text)
-            if child_chunks:
-                child_chunk_embeddings = embeddings.embed_documents(child_chunks)
-                
-                for child_chunk_text, child_chunk_embedding in zip(child_chunks, child_chunk_embeddings):
-                    SourceFileChunk.objects.create(
-                        user=source_file.user,
-                        source_file=source_file,
-                        source_file_chunk=parent_chunk,
-                        content=child_chunk_text,
-                        content_embedding=child_chunk_embedding
+
+    # 每個視窗的片段各自分批提交，不在整個檔案外包一個長交易（避免長時間鎖住資料列，進度也能即時寫入）；
+    # 處理完成後才在一個短交易內寫回 map 摘要並刪除已不存在的父段落。失敗時刪除本次新增的片段，既有片段維持原狀
+    created_parent_ids = []
+    try:
+        with ParallelMapSummarizer(llm, MAP_PROMPT) as summarizer:
+            # 需要寫回父段落的 map 摘要：(摘要 future, 父段落 id)
+            map_summary_targets = []
+
+            while True:
+                progress.enter(ProgressStage.READING)
+                try:
+                    pages = next(page_windows, None)
+                except Exception as e:
+                    raise utils.ExtractionFailed("載入 PDF 檔案失敗。", f"載入 PDF 檔案失敗: {str(e)}")
+
+                if pages is None:
+                    break
+                page_count += len(pages)
+                progress.add(pages_read=len(pages))
+
+                progress.enter(ProgressStage.EMBEDDING)
+                try:
+                    parent_chunks_docs = parent_text_splitter.split_documents(pages)
+                    parent_chunks = [doc.page_content for doc in parent_chunks_docs]
+                    del pages, parent_chunks_docs
+
+                    # 與既有父段落比對 content_hash，只有新的段落需要 embedding、寫入與 map 摘要；
+                    # 摘要依段落順序送出，map 步驟在背景執行，同時繼續處理子段落與寫入
+                    changed_chunks, changed_window_embeddings, changed_summary_futures = [], [], []
+                    for text, window_embeddings in zip(parent_chunks, parent_text_splitter.take_chunk_window_embeddings()):
+                        existing = existing_parents.get(utils.content_hash(text))
+                        if existing:
+                            pk, map_summary = existing.pop()
+                            parent_chunks_unchanged += 1
+                            if map_summary is not None:
+                                summarizer.reuse(map_summary)
+                            else:
+                                # 先前處理時尚未保存 map 摘要的父段落補做一次並寫回
+                                map_summary_targets.append((summarizer.submit([text])[0], pk))
+                        else:
+                            changed_chunks.append(text)
+                            changed_window_embeddings.append(window_embeddings)
+                            changed_summary_futures.extend(summarizer.submit([text]))
+
+                    # 依設定沿用切段時的句子視窗向量，或重新產生父段落 embeddings
+                    parent_chunk_vectors = parent_chunk_embeddings(
+                        changed_chunks,
+                        changed_window_embeddings,
+                        embeddings,
+                        mode=ParentEmbeddingMode(settings.PDF_PARENT_EMBEDDING_MODE),
+                    )
+                except Exception as e:
+                    raise utils.ExtractionFailed("分割父段落失敗。", f"分割父段落失敗: {str(e)}")
+
+                try:
+                    # 分割子文字塊，視窗內所有父段落的子段落合併後一起分批產生 embeddings，再依順序對應回各自的父段落
+                    child_texts_by_parent = [child_text_splitter.split_text(text) for text in changed_chunks]
+                    child_embeddings = iter(embeddings.embed_documents(
+                        [child_text for child_texts in child_texts_by_parent for child_text in child_texts]
+                    ))
+                    child_chunks_list = [
+                        [(child_text, next(child_embeddings)) for child_text in child_texts]
+                        for child_texts in child_texts_by_parent
+                    ]
+                    progress.add(chunks_embedded=len(changed_chunks) + sum(map(len, child_texts_by_parent)))
+                except Exception as e:
+                    raise utils.ExtractionFailed(f"處理文字塊失敗: {str(e)}", f"處理文字塊失敗: {str(e)}")
+
+                progress.enter(ProgressStage.PERSISTING)
+                try:
+                    # 每批交易提交後才計入 batches_persisted，進度不會包含尚未提交的資料
+                    window_parent_ids, window_children_created = utils.bulk_create_source_file_chunks(
+                        source_file,
+                        list(zip(changed_chunks, parent_chunk_vectors, child_chunks_list)),
+                        on_batch_persisted=lambda: progress.add(batches_persisted=1),
                     )
-                    child_chunks_created += 1
-                    
+                except Exception as e:
+                    raise utils.ExtractionFailed(f"儲存文字塊失敗: {str(e)}", f"儲存文字塊失敗: {str(e)}")
+
+                created_parent_ids.extend(window_parent_ids)
+                map_summary_targets.extend(zip(changed_summary_futures, window_parent_ids))
+                parent_chunks_created += len(window_parent_ids)
+                child_chunks_created += window_children_created
+                embeddings.clear()
+                print(
+                    f"📄 {source_file.filename}：已處理 {page_count} 頁，"
+                    f"新增 {parent_chunks_created} 個、沿用 {parent_chunks_unchanged} 個父文字片段"
+                )
+
+            progress.enter(ProgressStage.SUMMARIZING)
+            try:
+                map_summaries = summarizer.results()
+                new_map_summaries = {pk: future.result() for future, pk in map_summary_targets}
+                print(f"📝 {source_file.filename}：{len(map_summaries)} 段摘要（沿用 {summarizer.cached} 段）")
+            except Exception as e:
+                raise utils.ExtractionFailed("生成摘要失敗。", f"生成摘要失敗: {str(e)}")
+
+        try:
+            with transaction.atomic():
+                utils.save_map_summaries(new_map_summaries)
+                parent_chunks_deleted = utils.delete_source_file_chunks(
+                    [pk for existing in existing_parents.values() for pk, _ in existing]
+                )
         except Exception as e:
-            utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"處理文字塊失敗: {str(e)}")
-            return f"處理文字塊失敗: {str(e)}"
+            raise utils.ExtractionFailed("刪除 SourceFileChunk 物件失敗。", f"刪除 SourceFileChunk 物件失敗: {str(e)}")
+    except utils.ExtractionFailed as e:
+        utils.discard_source_file_chunks(created_parent_ids)
+        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, e.reason)
+        return e.message
+    except BaseException:
+        # 其他非預期的例外照常拋出，但先清除已提交的新片段，避免與既有片段並存
+        utils.discard_source_file_chunks(created_parent_ids)
+        raise
+
+    if page_count == 0:
+        utils.set_source_file_status(source_file, ProcessingStatus.COMPLETED)
+        source_file.summary = f"PDF 檔案 {source_file.filename} 沒有可提取的內容，請使用其他方式提取內容。"
+        source_file.save()
+        return f"PDF 檔案 {source_file.filename} 沒有可提取的內容，請使用其他方式提取內容。"
+
+    # 內容完全沒有變動時沿用既有摘要
+    has_changes = parent_chunks_created or parent_chunks_deleted or not source_file.summary
+    try:
+        if has_changes:
+            summary = summary_chain.reduce_documents_chain.invoke({
+                "input_documents": [Document(page_content=text) for text in map_summaries],
+            })
+            source_file.summary = summary.get("output_text")
+            source_file.save()
+            source_file.refresh_from_db()
+    except Exception as e:
+        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, "生成摘要失敗。")
+        return f"生成摘要失敗: {str(e)}"
 
+    print(f"📊 {source_file.filename} embedding 用量：{embedding_usage}")
+    progress.finish()
     utils.set_source_file_status(source_file, ProcessingStatus.COMPLETED)
     
-    return f"成功提取 PDF 檔案 {source_file.filename} 的內容，創建了 {parent_chunks_created} 個父文字片段和 {child_chunks_created} 個子文字片段。"
+    return f"成功提取 PDF 檔案 {source_file.filename} 的內容，共 {page_count} 頁，創建了 {parent_chunks_created} 個父文字片段和 {child_chunks_created} 個子文字片段，沿用 {parent_chunks_unchanged} 個、刪除 {parent_chunks_deleted} 個父文字片段（embedding 用量：{embedding_usage}）。"
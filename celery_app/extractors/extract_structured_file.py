@@ -1,3 +1,4 @@
+import itertools
 import os
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
@@ -5,15 +6,18 @@ from RAGPilot.celery import app
 from sources.models import SourceFile, SourceFileChunk, SourceFileTable, ProcessingStatus
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
 from utils.file_to_df import FileDataFrameHandler
 from langchain.chains.summarize import load_summarize_chain
 from langchain.prompts import PromptTemplate
 from celery_app.extractors import utils
+from celery_app.extractors.progress import ExtractionProgress, ProgressStage
+from utils.embeddings import embed_texts
+from utils.vectors import short_embedding_for_storage
 
 SUMMARY_PROMPT = PromptTemplate.from_template("""這份資料的檔案名稱叫做：{filename}。
 這份資料共有 {record_count} 筆紀錄，欄位有：{columns}。
-以下是部分欄位的統計資訊：
+以下是前 {sample_count} 筆紀錄的欄位統計資訊（只涵蓋第一段資料，不代表全部紀錄）：
 {column_summary}
 
 請以繁體中文撰寫一段 500 字以內的摘要，說明這份資料的特性與可能用途，
@@ -24,33 +28,43 @@ SUMMARY_PROMPT = PromptTemplate.from_template("""這份資料的檔案名稱叫
 def extract_structured_file_content(source_file_id: int):
     source_file = SourceFile.objects.get(id=source_file_id)
 
-    try:
-        source_file.failed_reason = None
-        source_file.save()
-        source_file.refresh_from_db()
-        if source_file.sourcefiletable_set.count() > 0:
-            source_file.sourcefiletable_set.all().delete()
-    except Exception as e:
-        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"刪除 SourceFileTable 物件失敗。")
-        return f"刪除 SourceFileTable 物件失敗: {str(e)}"
+    source_file.failed_reason = None
+    source_file.save()
+    source_file.refresh_from_db()
 
     utils.set_source_file_status(source_file, ProcessingStatus.PROCESSING)
     supported_formats = ['csv', 'json', 'xml']
     if source_file.format not in supported_formats:
         return f"檔案 {source_file.filename} 格式 {source_file.format} 不支援結構化資料提取"
-        
+
+    # 處理進度寫入 SourceFile.progress 並推送到資料源頁面
+    progress = ExtractionProgress(source_file)
+    progress.enter(ProgressStage.READING)
     try:
         if not os.path.exists(source_file.path):
             raise FileNotFoundError(f"檔案不存在: {source_file.path}")    
-        with open(source_file.path, 'rb') as f:
-            file_content = f.read()
+        file_content_hash = utils.file_content_hash(source_file.path)
     except Exception as e:
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"讀取檔案失敗。")
         return f"讀取檔案失敗: {str(e)}"
+
+    # 檔案內容與上次建立資料表時相同，且已有摘要，直接沿用既有資料表
+    if source_file.summary and source_file.sourcefiletable_set.filter(content_hash=file_content_hash).exists():
+        utils.set_source_file_status(source_file, ProcessingStatus.COMPLETED)
+        return f"結構化資料 {source_file.filename} 內容未變更，沿用既有資料表 {source_file.uuid}"
+
+    try:
+        if source_file.sourcefiletable_set.count() > 0:
+            source_file.sourcefiletable_set.all().delete()
+    except Exception as e:
+        utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"刪除 SourceFileTable 物件失敗。")
+        return f"刪除 SourceFileTable 物件失敗: {str(e)}"
     
+    # 逐段解析檔案，第一段用來建立資料表與產生欄位統計，其餘邊解析邊寫入
     handler = FileDataFrameHandler()
     try:
-        df = handler.convert_to_dataframe(file_content, source_file.format, encoding='utf-8')
+        chunks = handler.iter_dataframe_chunks(source_file.path, source_file.format, encoding='utf-8')
+        df = next(chunks, None)
     except Exception as e:
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"轉換為 DataFrame 失敗。")
         return f"轉換為 DataFrame 失敗: {str(e)}"
@@ -59,26 +73,32 @@ def extract_structured_file_content(source_file_id: int):
         utils.set_source_file_status(source_file, ProcessingStatus.COMPLETED)
         return f"檔案 {source_file.filename} 沒有可提取的結構化資料"
     
-    success, message = handler.save_to_database(
-            df=df, 
+    progress.enter(ProgressStage.LOADING)
+    success, message, record_count = handler.save_chunks_to_database(
+            chunks=itertools.chain([df], chunks), 
             table_name=source_file.uuid, 
-            database_name=source_file.user.username
+            database_name=source_file.user.username,
+            on_chunk_saved=lambda row_count: progress.add(rows_loaded=row_count),
         )
     if not success:
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, message)
-        return f"儲存資料到資料庫失敗: {str(e)}"
+        return f"儲存資料到資料庫失敗: {message}"
     
     SourceFileTable.objects.create(
         user=source_file.user,
         source_file=source_file,
         table_name=source_file.uuid,
-        database_name=source_file.user.username
+        database_name=source_file.user.username,
+        content_hash=file_content_hash,
     )
     
+    progress.enter(ProgressStage.SUMMARIZING)
+    # 串流處理時只保留第一段資料，統計資訊僅以第一段計算
     col_summary = df.describe(include='all').to_dict()
     summary_prompt = SUMMARY_PROMPT.format(
         filename=source_file.filename,
-        record_count=len(df),
+        record_count=record_count,
+        sample_count=len(df),
         columns=', '.join(df.columns),
         column_summary=col_summary
     )
@@ -90,18 +110,21 @@ def extract_structured_file_content(source_file_id: int):
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"生成摘要失敗。")
         return f"生成摘要失敗: {str(e)}"
     
+    progress.enter(ProgressStage.EMBEDDING)
     try:
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        summary_embedding = embeddings.embed_query(summary_content)
+        summary_embedding = embed_texts([summary_content])[0]
     except Exception as e:
         utils.set_source_file_status(source_file, ProcessingStatus.FAILED, f"生成摘要嵌入失敗。")
         return f"生成摘要嵌入失敗: {str(e)}"
     
     source_file.summary = summary_content
     source_file.summary_embedding = summary_embedding
+    source_file.summary_embedding_short = short_embedding_for_storage(summary_embedding)
     source_file.save()
     source_file.refresh_from_db()
 
+    progress.add(chunks_embedded=1)
+    progress.finish()
     utils.set_source_file_status(source_file, ProcessingStatus.COMPLETED)
     
     return f"成功提取結構化資料 {source_file.filename}，創建資料表 {source_file.uuid}"
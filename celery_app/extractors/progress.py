@@ -0,0 +1,162 @@
+import json
+import time
+from collections import defaultdict
+from enum import StrEnum
+from typing import Optional
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.utils import timezone
+from sources.models import SourceFile
+
+# 同一階段內兩次寫入進度的最短間隔（秒），切換階段時一律寫入
+PROGRESS_PUBLISH_INTERVAL = 1.0
+
+
+class ProgressStage(StrEnum):
+    READING = "reading"  # 讀取檔案 / PDF 頁面
+    EMBEDDING = "embedding"  # 切段與產生 embeddings
+    PERSISTING = "persisting"  # 寫入片段
+    LOADING = "loading"  # 結構化資料寫入資料表
+    SUMMARIZING = "summarizing"  # 產生摘要
+
+
+# 各階段用來計算處理速度的計數項目
+STAGE_THROUGHPUT_COUNTERS = {
+    ProgressStage.READING: "pages_read",
+    ProgressStage.EMBEDDING: "chunks_embedded",
+    ProgressStage.PERSISTING: "batches_persisted",
+    ProgressStage.LOADING: "rows_loaded",
+}
+
+
+def source_progress_group_name(source_id: int) -> str:
+    return f"source_{source_id}_progress"
+
+
+def send_source_progress_event(source_id: int, event: dict):
+    """透過 channel layer 推送給正在瀏覽資料源頁面的使用者，推送失敗不影響檔案處理。"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            source_progress_group_name(source_id),
+            {"type": "source_file_event", "event": event},
+        )
+    except Exception as e:
+        print(f"⚠️  推送檔案處理進度失敗：{e}")
+
+
+def save_source_file_progress(source_file_id: int, progress: dict):
+    """
+    只更新 progress 欄位，避免覆蓋其他流程寫入的狀態。
+    channel layer 為 InMemory 時網頁端是輪詢這個欄位，因此進度必須立即提交：
+    呼叫端在交易內時改用獨立的 autocommit 連線寫入，不受外層交易影響。
+    """
+    using = router.db_for_write(SourceFile)
+    if not transaction.get_connection(using).in_atomic_block:
+        SourceFile.objects.using(using).filter(pk=source_file_id).update(progress=progress)
+        return
+
+    connection = connections.create_connection(using or DEFAULT_DB_ALIAS)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {connection.ops.quote_name(SourceFile._meta.db_table)} SET progress = %s WHERE id = %s",
+                [json.dumps(progress, cls=DjangoJSONEncoder), source_file_id],
+            )
+    finally:
+        connection.close()
+
+
+def publish_source_file_status(source_file: SourceFile):
+    send_source_progress_event(source_file.source_id, {
+        "file_id": source_file.id,
+        "status": source_file.status,
+        "status_display": source_file.get_status_display(),
+        "failed_reason": source_file.failed_reason,
+        "progress": source_file.progress,
+    })
+
+
+class ExtractionProgress:
+    """
+    記錄單一檔案的處理進度：目前階段、各項計數與各階段累計耗時，
+    寫入 SourceFile.progress 並透過 channel layer 推送；同一階段內最多每秒寫入一次。
+    """
+
+    def __init__(self, source_file: SourceFile, total_pages: Optional[int] = None):
+        self.source_file = source_file
+        self.total_pages = total_pages
+        self.stage = None
+        self.counters = defaultdict(int)
+        self.stage_seconds = defaultdict(float)
+        self._started_at = time.monotonic()
+        self._stage_started_at = self._started_at
+        self._published_at = 0.0
+
+    def enter(self, stage: ProgressStage):
+        now = time.monotonic()
+        if self.stage is not None:
+            self.stage_seconds[self.stage] += now - self._stage_started_at
+        self.stage, self._stage_started_at = stage, now
+        self.publish(force=True)
+
+    def finish(self):
+        """結束最後一個階段並寫入最終的耗時與處理速度。"""
+        if self.stage is not None:
+            self.stage_seconds[self.stage] += time.monotonic() - self._stage_started_at
+        self.stage = None
+        self.publish(force=True)
+
+    def add(self, **counts: int):
+        for name, count in counts.items():
+            self.counters[name] += count
+        self.publish()
+
+    def snapshot(self) -> dict:
+        stage_seconds = dict(self.stage_seconds)
+        if self.stage is not None:
+            stage_seconds[self.stage] = stage_seconds.get(self.stage, 0.0) + time.monotonic() - self._stage_started_at
+
+        throughput = {
+            stage: round(self.counters[counter] / stage_seconds[stage], 2)
+            for stage, counter in STAGE_THROUGHPUT_COUNTERS.items()
+            if self.counters.get(counter) and stage_seconds.get(stage)
+        }
+
+        return {
+            "stage": self.stage,
+            "total_pages": self.total_pages,
+            **self.counters,
+            "throughput": throughput,
+            "stage_seconds": {stage: round(seconds, 1) for stage, seconds in stage_seconds.items()},
+            "eta_seconds": self.eta_seconds(),
+            "updated_at": timezone.now().isoformat(),
+        }
+
+    def eta_seconds(self) -> Optional[int]:
+        # 以目前為止每頁的平均耗時估算剩餘頁數所需時間，不含最後的摘要
+        pages_read = self.counters.get("pages_read")
+        if not self.total_pages or not pages_read:
+            return None
+        elapsed = time.monotonic() - self._started_at
+        return max(0, round(elapsed / pages_read * (self.total_pages - pages_read)))
+
+    def publish(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._published_at < PROGRESS_PUBLISH_INTERVAL:
+            return
+        self._published_at = now
+
+        progress = self.snapshot()
+        save_source_file_progress(self.source_file.pk, progress)
+        self.source_file.progress = progress
+        send_source_progress_event(self.source_file.source_id, {
+            "file_id": self.source_file.id,
+            "status": self.source_file.status,
+            "status_display": self.source_file.get_status_display(),
+            "progress": progress,
+        })
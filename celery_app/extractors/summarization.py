@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from django.conf import settings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import PromptTemplate
+from utils.cache import TwoTierCache
+
+# map 階段的摘要結果依 (模型, prompt, 段落內容) 快取，任務重試時不需重新摘要
+map_summary_cache = TwoTierCache(
+    namespace="map_summary",
+    max_entries=settings.SUMMARY_MAP_CACHE_SIZE,
+    ttl=settings.SUMMARY_MAP_CACHE_TTL,
+)
+
+
+def map_summary_key(model: str, prompt: PromptTemplate, text: str) -> str:
+    content = f"{model}\x00{prompt.template}\x00{text}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ParallelMapSummarizer:
+    """
+    以有上限的執行緒池（SUMMARY_MAP_MAX_WORKERS）在背景執行 map_reduce 的 map 步驟，
+    呼叫端送出段落後可以繼續切段、embedding 與寫入，最後再以 results() 依送出順序取回摘要。
+    排隊中的段落超過 SUMMARY_MAP_MAX_PENDING 時 submit 會等待，避免大型檔案的段落全部堆在記憶體。
+    """
+
+    def __init__(self, llm: BaseChatModel, map_prompt: PromptTemplate):
+        self.llm = llm
+        self.map_prompt = map_prompt
+        self.model = getattr(llm, "model_name", type(llm).__name__)
+        self.cached = 0
+        self._cached_lock = threading.Lock()
+        self._futures = []
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.SUMMARY_MAP_MAX_WORKERS,
+            thread_name_prefix="summary-map",
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # 發生錯誤提前離開時取消尚未開始的摘要
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, texts: list[str]) -> list[Future]:
+        futures = []
+        for text in texts:
+            pending = [future for future in self._futures if not future.done()]
+            if len(pending) >= settings.SUMMARY_MAP_MAX_PENDING:
+                wait(pending, return_when=FIRST_COMPLETED)
+            futures.append(self._executor.submit(self._summarize, text))
+        self._futures.extend(futures)
+        return futures
+
+    def reuse(self, summary: str):
+        """沿用已保存的 map 摘要，不呼叫 LLM，仍依加入順序出現在 results() 中。"""
+        future = Future()
+        future.set_result(summary)
+        self._futures.append(future)
+        with self._cached_lock:
+            self.cached += 1
+
+    def results(self) -> list[str]:
+        return [future.result() for future in self._futures]
+
+    def _summarize(self, text: str) -> str:
+        key = map_summary_key(self.model, self.map_prompt, text)
+        summary = map_summary_cache.get(key)
+        if summary is not None:
+            with self._cached_lock:
+                self.cached += 1
+            return summary
+
+        summary = self.llm.invoke(self.map_prompt.format(text=text)).content
+        map_summary_cache.set(key, summary)
+        return summary
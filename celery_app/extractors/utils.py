@@ -1,10 +1,160 @@
-from sources.models import SourceFile, ProcessingStatus
+import hashlib
+from collections import defaultdict
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+from django.db import transaction
+from pypdf import PdfReader
+from sources.models import SourceFile, SourceFileChunk, ProcessingStatus
+from celery_app.extractors.progress import publish_source_file_status
+from utils.keywords import keyword_text
+from utils.vectors import short_embedding_for_storage
+
+# 每個交易寫入的父段落數量，以及 bulk_create 每次 INSERT 的筆數
+CHUNK_TRANSACTION_PARENT_COUNT = 100
+CHUNK_BULK_CREATE_BATCH_SIZE = 500
+# 每次刪除過期片段的父段落數量
+CHUNK_DELETE_BATCH_SIZE = 1000
+# 每次寫回父段落 map 摘要的筆數
+MAP_SUMMARY_UPDATE_BATCH_SIZE = 500
+# 計算檔案雜湊時每次讀入的位元組數
+FILE_HASH_READ_SIZE = 1024 * 1024
 
 
 def set_source_file_status(source_file: SourceFile, status: ProcessingStatus, failed_reason: str = None):
     source_file.status = status
     if failed_reason:
         source_file.failed_reason = failed_reason
+    if status == ProcessingStatus.PROCESSING:
+        source_file.progress = None
     source_file.save()
     source_file.refresh_from_db()
-    return source_file
\ No newline at end of file
+    publish_source_file_status(source_file)
+    return source_file
+
+
+def count_pdf_pages(path: str) -> int | None:
+    """只讀取 PDF 的頁面目錄取得總頁數，用來估算剩餘時間；無法讀取時回傳 None。"""
+    try:
+        return len(PdfReader(path).pages)
+    except Exception as e:
+        print(f"⚠️  無法取得 PDF 頁數：{e}")
+        return None
+
+
+def content_hash(content: str | bytes) -> str:
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_content_hash(path: str) -> str:
+    """分段讀取檔案計算 sha256，與 content_hash(整個檔案內容) 結果相同，不需把檔案讀進記憶體。"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(FILE_HASH_READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionFailed(Exception):
+    """處理流程中的失敗：reason 寫入 SourceFile.failed_reason，message 為任務的回傳值。"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+def existing_parent_chunks(source_file: SourceFile) -> dict[str, list[tuple[int, str | None]]]:
+    """
+    既有父段落依 content_hash 分組的 (id, map 摘要)，重新處理時用來比對哪些父段落（連同子段落）沒有變動，
+    沒有變動的父段落也直接沿用先前的 map 摘要。
+    """
+    existing = defaultdict(list)
+    parent_chunks = SourceFileChunk.objects.filter(source_file=source_file, source_file_chunk__isnull=True)
+    for pk, chunk_hash, map_summary in parent_chunks.values_list('id', 'content_hash', 'map_summary').iterator():
+        existing[chunk_hash].append((pk, map_summary))
+    return existing
+
+
+def save_map_summaries(map_summaries: dict[int, str]) -> None:
+    """將 map 摘要寫回對應的父段落，下次重新處理時沿用。"""
+    chunks = [SourceFileChunk(id=pk, map_summary=summary) for pk, summary in map_summaries.items()]
+    SourceFileChunk.objects.bulk_update(chunks, ['map_summary'], batch_size=MAP_SUMMARY_UPDATE_BATCH_SIZE)
+
+
+def delete_source_file_chunks(chunk_ids: list[int]) -> int:
+    """分批刪除父段落，子段落由 CASCADE 一併刪除。回傳刪除的父段落數。"""
+    for start in range(0, len(chunk_ids), CHUNK_DELETE_BATCH_SIZE):
+        SourceFileChunk.objects.filter(id__in=chunk_ids[start:start + CHUNK_DELETE_BATCH_SIZE]).delete()
+    return len(chunk_ids)
+
+
+def discard_source_file_chunks(chunk_ids: list[int]) -> None:
+    """處理失敗時刪除本次已提交的新父段落，清除失敗只記錄不再拋出，避免蓋掉原本的失敗原因。"""
+    try:
+        delete_source_file_chunks(chunk_ids)
+    except Exception as e:
+        print(f"⚠️  刪除未完成的 SourceFileChunk 物件失敗：{e}")
+
+
+def iter_windows(items: Iterable, size: int) -> Iterator[list]:
+    """依序每 size 個項目組成一個視窗，只在記憶體中保留目前的視窗。"""
+    iterator = iter(items)
+    while window := list(islice(iterator, size)):
+        yield window
+
+
+def bulk_create_source_file_chunks(
+    source_file: SourceFile,
+    parent_items: list,
+    on_batch_persisted: Optional[Callable[[], None]] = None,
+) -> tuple[list[int], int]:
+    """
+    批次寫入父段落與子段落，parent_items 為 [(父段落文字, 父段落向量, [(子段落文字, 子段落向量), ...]), ...]。
+    每批父段落一個交易：先 bulk_create 父段落取得 id，再一次寫入所屬的子段落；
+    on_batch_persisted 在每批交易提交後呼叫（例如更新處理進度）。
+    回傳 (依 parent_items 順序的父段落 id, 子段落數)。
+    """
+    parent_chunk_ids = []
+    child_chunks_created = 0
+
+    for start in range(0, len(parent_items), CHUNK_TRANSACTION_PARENT_COUNT):
+        batch = parent_items[start:start + CHUNK_TRANSACTION_PARENT_COUNT]
+
+        with transaction.atomic():
+            parent_chunks = SourceFileChunk.objects.bulk_create(
+                [
+                    build_source_file_chunk(source_file, parent_text, parent_embedding)
+                    for parent_text, parent_embedding, _ in batch
+                ],
+                batch_size=CHUNK_BULK_CREATE_BATCH_SIZE,
+            )
+
+            # PostgreSQL 的 bulk_create 會回填 id，子段落可直接指向父段落
+            child_chunks = [
+                build_source_file_chunk(source_file, child_text, child_embedding, parent_chunk)
+                for parent_chunk, (_, _, children) in zip(parent_chunks, batch)
+                for child_text, child_embedding in children
+            ]
+            SourceFileChunk.objects.bulk_create(child_chunks, batch_size=CHUNK_BULK_CREATE_BATCH_SIZE)
+
+        parent_chunk_ids.extend(parent_chunk.id for parent_chunk in parent_chunks)
+        child_chunks_created += len(child_chunks)
+        if on_batch_persisted is not None:
+            on_batch_persisted()
+
+    return parent_chunk_ids, child_chunks_created
+
+
+def build_source_file_chunk(source_file: SourceFile, content: str, embedding, parent_chunk=None) -> SourceFileChunk:
+    return SourceFileChunk(
+        user_id=source_file.user_id,
+        source_file=source_file,
+        source_file_chunk=parent_chunk,
+        content=content,
+        content_normalized=keyword_text(content),
+        content_embedding=embedding,
+        content_embedding_short=short_embedding_for_storage(embedding),
+        content_hash=content_hash(content),
+    )
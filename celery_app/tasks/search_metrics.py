@@ -0,0 +1,9 @@
+from RAGPilot.celery import app
+from utils.search_metrics import purge_search_metrics
+
+
+@app.task()
+def purge_expired_search_metrics():
+    """清除超過 SEARCH_METRICS_RETENTION_DAYS 的搜尋階段耗時紀錄，由排程每日執行。"""
+    deleted = purge_search_metrics()
+    return f"已刪除 {deleted} 筆過期的搜尋耗時紀錄"
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import caches
+from redis.exceptions import RedisError
+from RAGPilot.celery import app
+from utils.vector_snapshots import SNAPSHOT_CORPORA, build_vector_snapshot
+
+REBUILD_PENDING_CACHE_ALIAS = "search"
+
+
+def rebuild_pending_key(label: str) -> str:
+    return f"vector_snapshot_rebuild_pending:{label}"
+
+
+def schedule_vector_snapshot_rebuild(labels: list[str], demo=False):
+    """
+    合併短時間內的多次重建要求（例如各科別的爬蟲陸續完成）：同一資料集已有排定的重建時不再重複排入，
+    重建延後 VECTOR_SNAPSHOT_REBUILD_DELAY 秒執行，開始重建時才清除標記，之後的異動會再排下一次。
+    """
+    if demo:
+        rebuild_vector_snapshots(labels)
+        return
+
+    pending_labels = []
+    for label in labels:
+        try:
+            # 標記保留到延遲時間的兩倍，重建任務遺失時也會自動失效
+            if caches[REBUILD_PENDING_CACHE_ALIAS].add(
+                rebuild_pending_key(label), 1, timeout=settings.VECTOR_SNAPSHOT_REBUILD_DELAY * 2
+            ):
+                pending_labels.append(label)
+        except RedisError as e:
+            print(f"⚠️  無法確認向量快照重建排程（{label}），直接排入重建：{e}")
+            pending_labels.append(label)
+
+    if pending_labels:
+        rebuild_vector_snapshots.apply_async(
+            args=[pending_labels],
+            countdown=settings.VECTOR_SNAPSHOT_REBUILD_DELAY,
+        )
+
+
+@app.task()
+def rebuild_vector_snapshots(labels=None):
+    """
+    重建爬蟲資料的向量快照，於爬取完成後觸發（見 schedule_vector_snapshot_rebuild），並由排程每日補跑一次。
+    """
+    if not settings.VECTOR_SNAPSHOT_ENABLED:
+        return "未啟用向量快照"
+
+    labels = labels or list(SNAPSHOT_CORPORA.keys())
+    try:
+        caches[REBUILD_PENDING_CACHE_ALIAS].delete_many([rebuild_pending_key(label) for label in labels])
+    except RedisError as e:
+        print(f"⚠️  清除向量快照重建標記失敗：{e}")
+
+    results = []
+    for label in labels:
+        meta = build_vector_snapshot(label)
+        print(f"✅ 已重建 {label} 向量快照：{meta['count']} 筆（{meta['generation']}）")
+        results.append(f"{label}={meta['count']}")
+
+    return f"完成重建向量快照：{', '.join(results)}"
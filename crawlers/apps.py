@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CrawlersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crawlers'
+
+    def ready(self):
+        # 導入信號處理器以確保它們被註冊
+        import crawlers.signals
+
+        from django.core import checks
+        from utils.vector_indexes import check_vector_search_indexes
+        checks.register(check_vector_search_indexes, checks.Tags.database)
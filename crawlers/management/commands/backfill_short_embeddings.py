@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from crawlers.models import Dataset, Symptom
+from sources.models import SourceFile, SourceFileChunk
+from utils.vectors import short_field_name, shorten_embedding
+
+SHORT_EMBEDDING_PATHS = {
+    "symptom": (Symptom, "question_embeddings"),
+    "dataset": (Dataset, "description_embeddings"),
+    "source_file": (SourceFile, "summary_embedding"),
+    "source_file_chunk": (SourceFileChunk, "content_embedding"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        '以資料庫內已存的完整向量計算縮短維度向量（取前 N 維再 L2 正規化），不重新呼叫 OpenAI；'
+        '在 Python 端計算，不需要 pgvector 0.7 的 subvector / l2_normalize'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            choices=list(SHORT_EMBEDDING_PATHS.keys()),
+            action='append',
+            help='指定要回填的資料表，可重複指定（預設全部）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='每批更新的筆數（預設 5000）'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只顯示待回填的筆數，不實際更新'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['path'] or list(SHORT_EMBEDDING_PATHS.keys())
+
+        for path in paths:
+            model, vector_field_name = SHORT_EMBEDDING_PATHS[path]
+            short_name = short_field_name(vector_field_name)
+            pending = model.objects.filter(**{
+                f'{short_name}__isnull': True,
+                f'{vector_field_name}__isnull': False,
+            })
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n📐 {path}（{model.__name__}.{short_name}）'))
+            total = pending.count()
+            self.stdout.write(f'待回填：{total} 筆')
+            if options['dry_run'] or not total:
+                continue
+
+            updated = 0
+            while True:
+                # 已回填的資料不再符合 pending 條件，每批都從頭取即可
+                batch = list(pending.order_by('pk').only('pk', vector_field_name)[:options['batch_size']])
+                if not batch:
+                    break
+                for instance in batch:
+                    setattr(instance, short_name, shorten_embedding(getattr(instance, vector_field_name)))
+                model.objects.bulk_update(batch, [short_name])
+                updated += len(batch)
+                self.stdout.write(f'   已回填 {updated}/{total}')
+
+            self.stdout.write(self.style.SUCCESS(f'✅ {path} 回填完成，共 {updated} 筆'))
@@ -0,0 +1,380 @@
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from crawlers.models import Dataset, Symptom, ASSOCIATED_CATEGORIES_DATABASE_NAME, SYMPTOM_DEPARTMENTS
+from utils.benchmark import (
+    HashedBigramEmbedder,
+    StubReranker,
+    percentile,
+    recall_at_k,
+    synthetic_dataset_description,
+    synthetic_symptom_question,
+)
+import utils.search as search_module
+import utils.search_metrics as search_metrics_module
+from utils.cache import TwoTierCache
+from utils.keywords import keyword_text
+from utils.search import (
+    RerankPolicy,
+    SearchOptions,
+    SearchTimings,
+    VectorScanPlan,
+    hybrid_search_with_rerank,
+    vector_candidates,
+)
+from utils.vector_indexes import sync_vector_search_index
+from utils.vectors import VectorPrecision, short_field_name, shorten_embedding
+
+@contextmanager
+def isolated_search_state():
+    """
+    benchmark 期間不寫入搜尋耗時紀錄（結果已由 SearchTimings 直接彙整）、不讀寫共用的 rerank 快取，
+    也不使用以正式資料建立的向量快照，避免與線上搜尋互相污染。
+    """
+    original_rerank_cache = search_module.rerank_cache
+    original_sinks = search_metrics_module._sinks
+    search_module.rerank_cache = TwoTierCache(
+        namespace="benchmark_rerank_scores",
+        max_entries=settings.RERANK_CACHE_SIZE,
+        ttl=settings.RERANK_CACHE_TTL,
+        alias=None,
+    )
+    search_metrics_module._sinks = []
+    try:
+        with override_settings(VECTOR_SNAPSHOT_ENABLED=False):
+            yield
+    finally:
+        search_module.rerank_cache = original_rerank_cache
+        search_metrics_module._sinks = original_sinks
+
+
+BENCHMARK_CORPORA = {
+    "symptom": {
+        "model": Symptom,
+        "vector_field_name": "question_embeddings",
+        "text_field_name": "question",
+        "query_argument": "question",
+        "filter_argument": "department",
+        "filter_values": SYMPTOM_DEPARTMENTS,
+    },
+    "dataset": {
+        "model": Dataset,
+        "vector_field_name": "description_embeddings",
+        "text_field_name": "description",
+        "query_argument": "description",
+        "filter_argument": "category",
+        "filter_values": list(ASSOCIATED_CATEGORIES_DATABASE_NAME.keys()),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        '在獨立的 benchmark 資料庫（test_<POSTGRES_DB>）以合成資料與本地 embedding / rerank stub '
+        '測量語意搜尋延遲百分位數與 recall@k，只需本機 Postgres + pgvector，不呼叫 OpenAI 或 Cohere'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            choices=list(BENCHMARK_CORPORA.keys()),
+            action='append',
+            help='指定要測試的資料集，可重複指定（預設全部）'
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=10000,
+            help='每個資料集的合成資料筆數，例如 10000 / 100000 / 1000000（預設 10000）'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=50,
+            help='測試查詢數量（預設 50）'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=10,
+            help='計算 recall@k 的 k（預設 10）'
+        )
+        parser.add_argument(
+            '--ef-search',
+            type=int,
+            default=settings.SEARCH_HNSW_EF_SEARCH,
+            help='查詢時使用的 hnsw.ef_search（預設為 SEARCH_HNSW_EF_SEARCH 設定值）'
+        )
+        parser.add_argument(
+            '--precision',
+            choices=[precision.value for precision in VectorPrecision],
+            default=settings.SEARCH_VECTOR_PRECISION,
+            help='HNSW 第一階段的向量精度，量化精度會再以完整向量重新計分（預設為 SEARCH_VECTOR_PRECISION 設定值）'
+        )
+        parser.add_argument(
+            '--rerank-policy',
+            choices=[policy.value for policy in RerankPolicy],
+            default=RerankPolicy.REMOTE.value,
+            help='hybrid search 使用的排序策略，remote 會呼叫 stub reranker（預設 remote）'
+        )
+        parser.add_argument(
+            '--rerank-latency-ms',
+            type=float,
+            default=0,
+            help='stub reranker 模擬的遠端延遲（毫秒）'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='寫入合成資料的批次大小（預設 1000）'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='亂數種子，相同種子產生相同的資料與查詢（預設 42）'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='結束後保留 benchmark 資料庫，下次執行可沿用相同筆數的合成資料'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='刪除保留的 benchmark 資料庫後結束'
+        )
+
+    def handle(self, *args, **options):
+        corpora = options['corpus'] or list(BENCHMARK_CORPORA.keys())
+        if options['queries'] < 1:
+            raise CommandError('--queries 必須大於等於 1')
+        if options['size'] < 1:
+            raise CommandError('--size 必須大於等於 1')
+
+        # 合成資料只寫進獨立的 test_ 資料庫，不會出現在正式資料表或被其他連線查到；
+        # 背景執行緒的新連線同樣讀取 settings.DATABASES，因此也會連到 benchmark 資料庫
+        # 需求：資料庫帳號可建立資料庫，且 template1 已啟用 vector extension（見 docker-compose 的 postgres-init）
+        original_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+            keepdb=options['keepdb'] or options['clear'],
+        )
+        self.stdout.write(f'🗄️  使用 benchmark 資料庫：{connection.settings_dict["NAME"]}')
+
+        try:
+            if options['clear']:
+                return
+
+            self.embedder = HashedBigramEmbedder()
+            self.reranker = StubReranker(latency_ms=options['rerank_latency_ms'])
+
+            with isolated_search_state():
+                for corpus in corpora:
+                    spec = BENCHMARK_CORPORA[corpus]
+                    self.seed_corpus(corpus, spec, options)
+                    self.run_benchmark(corpus, spec, options)
+        finally:
+            keepdb = options['keepdb'] and not options['clear']
+            connection.creation.destroy_test_db(original_name, verbosity=0, keepdb=keepdb)
+            if not keepdb:
+                self.stdout.write(self.style.SUCCESS('🧹 已刪除 benchmark 資料庫'))
+
+    def seed_corpus(self, corpus, spec, options):
+        model = spec['model']
+        size = options['size']
+        existing = model.objects.filter(id__lt=0).count()
+        # --keepdb 沿用的資料若是以其他精度產生，可能沒有縮短維度向量
+        short_missing = VectorPrecision(options['precision']) == VectorPrecision.SHORT and model.objects.filter(**{
+            'id__lt': 0,
+            f'{short_field_name(spec["vector_field_name"])}__isnull': True,
+        }).exists()
+
+        if existing == size and not short_missing:
+            self.stdout.write(f'♻️  {corpus}：沿用既有的 {existing} 筆合成資料')
+            self.sync_index(model, options)
+            return
+
+        if existing:
+            model.objects.filter(id__lt=0).delete()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'🌱 {corpus}：產生 {size} 筆合成資料...'))
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+
+        for start in range(0, size, options['batch_size']):
+            end = min(start + options['batch_size'], size)
+            rows = [
+                self.build_row(corpus, spec, index, rng, now, options)
+                for index in range(start, end)
+            ]
+            model.objects.bulk_create(rows)
+            self.stdout.write(f'   已寫入 {end}/{size}')
+
+        self.sync_index(model, options)
+
+        # 大量寫入後更新統計資訊，讓 planner 的預估筆數正確
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def sync_index(self, model, options):
+        # benchmark 資料庫的向量索引依 --precision 建立，與 SEARCH_VECTOR_PRECISION 無關
+        with connection.schema_editor() as schema_editor:
+            sync_vector_search_index(schema_editor, model, VectorPrecision(options['precision']))
+
+    def build_row(self, corpus, spec, index, rng, now, options):
+        synthetic_id = -(index + 1)
+        store_short = VectorPrecision(options['precision']) == VectorPrecision.SHORT
+
+        if corpus == 'symptom':
+            department = rng.choice(spec['filter_values'])
+            question = synthetic_symptom_question(rng, department)
+            embedding = self.embedder.embed_query(question)
+            return Symptom(
+                id=synthetic_id,
+                subject_id=synthetic_id,
+                subject=question[:20],
+                department=department,
+                symptom=question[:10],
+                question=question,
+                question_normalized=keyword_text(question),
+                answer='benchmark',
+                gender=rng.choice(['男', '女']),
+                question_time=now,
+                answer_time=now,
+                question_embeddings=embedding,
+                question_embeddings_short=shorten_embedding(embedding) if store_short else None,
+            )
+
+        description = synthetic_dataset_description(rng)
+        embedding = self.embedder.embed_query(description)
+        return Dataset(
+            id=synthetic_id,
+            dataset_id=synthetic_id,
+            url='https://data.gov.tw/',
+            name=description[:20],
+            category=rng.choice(spec['filter_values']),
+            description=description,
+            description_normalized=keyword_text(description),
+            department='benchmark',
+            update_frequency='benchmark',
+            license='benchmark',
+            price='免費',
+            description_embeddings=embedding,
+            description_embeddings_short=shorten_embedding(embedding) if store_short else None,
+        )
+
+    def run_benchmark(self, corpus, spec, options):
+        model = spec['model']
+        base_queryset = model.objects.filter(id__lt=0)
+        rng = random.Random(options['seed'] + 1)
+        k = options['k']
+
+        latencies = defaultdict(list)
+        stage_latencies = defaultdict(list)
+        recalls = []
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n🔎 {corpus}：執行 {options["queries"]} 個查詢...'))
+
+        for _ in range(options['queries']):
+            if corpus == 'symptom':
+                query = synthetic_symptom_question(rng, rng.choice(spec['filter_values']))
+            else:
+                query = synthetic_dataset_description(rng)
+            filter_value = rng.choice(spec['filter_values'])
+
+            # 向量路線：HNSW 與精確掃描比較 recall@k
+            embedding = self.embedder.embed_query(query)
+            ann_ids, ann_ms = self.vector_ids(base_queryset, spec, embedding, k, options, VectorScanPlan.ANN)
+            exact_ids, exact_ms = self.vector_ids(base_queryset, spec, embedding, k, options, VectorScanPlan.EXACT)
+            latencies['vector_ann'].append(ann_ms)
+            latencies['vector_exact'].append(exact_ms)
+            recalls.append(recall_at_k(ann_ids, exact_ids, k))
+
+            # 完整 hybrid search，記錄各階段耗時
+            timings = SearchTimings()
+            started_at = perf_counter()
+            hybrid_search_with_rerank(
+                queryset=base_queryset,
+                vector_field_name=spec['vector_field_name'],
+                text_field_name=spec['text_field_name'],
+                original_question=query,
+                options=self.search_options(options),
+                timings=timings,
+            )
+            latencies['hybrid_search'].append((perf_counter() - started_at) * 1000)
+            for stage, duration_ms in timings.stages.items():
+                stage_latencies[stage].append(duration_ms)
+
+            # 透過 build_queryset 的完整路徑（含過濾條件）
+            started_at = perf_counter()
+            list(base_queryset.build_queryset(**{
+                spec['query_argument']: query,
+                'search_options': self.search_options(options),
+            }))
+            latencies['build_queryset'].append((perf_counter() - started_at) * 1000)
+
+            started_at = perf_counter()
+            list(base_queryset.build_queryset(**{
+                spec['query_argument']: query,
+                spec['filter_argument']: filter_value,
+                'search_options': self.search_options(options),
+            }))
+            latencies['build_queryset_filtered'].append((perf_counter() - started_at) * 1000)
+
+        self.report(corpus, latencies, stage_latencies, recalls, k, options)
+
+    def vector_ids(self, queryset, spec, embedding, k, options, scan_plan):
+        started_at = perf_counter()
+        results = vector_candidates(
+            queryset,
+            spec['vector_field_name'],
+            embedding,
+            limit=k,
+            ef_search=options['ef_search'],
+            scan_plan=scan_plan,
+            precision=VectorPrecision(options['precision']),
+        )
+        return [result.id for result in results], (perf_counter() - started_at) * 1000
+
+    def search_options(self, options) -> SearchOptions:
+        return SearchOptions(
+            ef_search=options['ef_search'],
+            caller='benchmark',
+            rerank_policy=RerankPolicy(options['rerank_policy']),
+            materialize=True,
+            embedder=self.embedder,
+            reranker=self.reranker,
+            precision=VectorPrecision(options['precision']),
+        )
+
+    def report(self, corpus, latencies, stage_latencies, recalls, k, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n📊 {corpus}（{options["size"]} 筆，ef_search={options["ef_search"]}，precision={options["precision"]}，'
+            f'rerank={options["rerank_policy"]}）'
+        ))
+
+        self.stdout.write(f'{"項目":<26}{"p50":>10}{"p95":>10}{"p99":>10}{"max":>10}  (ms)')
+        for name, values in list(latencies.items()) + [(f'  stage:{stage}', values) for stage, values in stage_latencies.items()]:
+            self.stdout.write(
+                f'{name:<26}'
+                f'{percentile(values, 50):>10.2f}'
+                f'{percentile(values, 95):>10.2f}'
+                f'{percentile(values, 99):>10.2f}'
+                f'{max(values):>10.2f}'
+            )
+
+        mean_recall = sum(recalls) / len(recalls) if recalls else 0.0
+        style = self.style.SUCCESS if mean_recall >= 0.95 else self.style.WARNING
+        self.stdout.write(style(
+            f'\n🎯 recall@{k}（HNSW 對比精確掃描）：平均 {mean_recall:.4f}，最低 {min(recalls, default=0):.4f}'
+        ))
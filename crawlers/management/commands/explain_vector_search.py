@@ -0,0 +1,98 @@
+import random
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from crawlers.models import Dataset, Symptom
+from sources.models import SourceFile, SourceFileChunk
+from utils.search import build_vector_queryset, hnsw_search_settings
+from utils.vector_indexes import VECTOR_SEARCH_COLUMNS
+from utils.vectors import VectorPrecision, quantized_index_name
+
+# (模型, 向量欄位)
+VECTOR_QUERY_PATHS = {
+    "symptom": (Symptom, "question_embeddings"),
+    "dataset": (Dataset, "description_embeddings"),
+    "source_file": (SourceFile, "summary_embedding"),
+    "source_file_chunk": (SourceFileChunk, "content_embedding"),
+}
+
+
+class Command(BaseCommand):
+    help = '輸出各向量查詢路徑的 EXPLAIN 計畫，確認是否使用 HNSW 索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            choices=list(VECTOR_QUERY_PATHS.keys()),
+            action='append',
+            help='指定要檢查的查詢路徑，可重複指定（預設全部）'
+        )
+        parser.add_argument(
+            '--ef-search',
+            type=int,
+            default=settings.SEARCH_HNSW_EF_SEARCH,
+            help='查詢時使用的 hnsw.ef_search（預設為 SEARCH_HNSW_EF_SEARCH 設定值）'
+        )
+        parser.add_argument(
+            '--precision',
+            choices=[precision.value for precision in VectorPrecision],
+            default=settings.SEARCH_VECTOR_PRECISION,
+            help='第一階段向量查詢的精度（預設為 SEARCH_VECTOR_PRECISION 設定值）'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='向量查詢的 LIMIT（預設 10）'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='使用 EXPLAIN ANALYZE 實際執行查詢'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['path'] or list(VECTOR_QUERY_PATHS.keys())
+        missing_index_paths = []
+
+        for path in paths:
+            model, vector_field_name = VECTOR_QUERY_PATHS[path]
+            column = VECTOR_SEARCH_COLUMNS[model._meta.label]
+            precision = VectorPrecision(options['precision'])
+            if precision == VectorPrecision.SHORT:
+                index_name = quantized_index_name(column.prefix, precision)
+            else:
+                index_name = column.index(precision).name
+            plan = self.explain_path(model, vector_field_name, options)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n🔎 {path}（{model.__name__}.{vector_field_name}）'))
+            self.stdout.write(plan)
+
+            if index_name in plan:
+                self.stdout.write(self.style.SUCCESS(f'✅ 使用索引 {index_name}'))
+            else:
+                missing_index_paths.append(path)
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️  未使用索引 {index_name}，可能退化為全表掃描（精度與索引不符時請執行 sync_vector_indexes）'
+                ))
+
+        if missing_index_paths:
+            self.stdout.write(self.style.ERROR(f'\n未使用 HNSW 索引的路徑：{", ".join(missing_index_paths)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n所有向量查詢路徑皆使用 HNSW 索引'))
+
+    def explain_path(self, model, vector_field_name, options) -> str:
+        embedding = self.sample_embedding(model, vector_field_name)
+        queryset = build_vector_queryset(
+            model.objects.all(), vector_field_name, embedding, VectorPrecision(options['precision'])
+        )
+
+        with hnsw_search_settings(options['ef_search']):
+            return queryset[:options['limit']].explain(analyze=options['analyze'])
+
+    def sample_embedding(self, model, vector_field_name) -> list[float]:
+        stored = model.objects.values_list(vector_field_name, flat=True).first()
+        if stored is not None:
+            return list(stored)
+
+        dimensions = model._meta.get_field(vector_field_name).dimensions
+        return [random.uniform(-1, 1) for _ in range(dimensions)]
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction, connection
 from django.apps import apps
+from utils.keywords import fill_keyword_text
 
 
 class Command(BaseCommand):
@@ -48,6 +49,11 @@ class Command(BaseCommand):
                 
                 # 遷移 Symptom 資料
                 self.migrate_symptoms(dry_run)
+
+                # 以 SQL 直接寫入的資料不會觸發 pre_save，補上關鍵字索引使用的正規化文字
+                if not dry_run:
+                    fill_keyword_text(apps.get_model('crawlers', 'Dataset'), 'description')
+                    fill_keyword_text(apps.get_model('crawlers', 'Symptom'), 'question')
                 
                 if dry_run:
                     self.stdout.write(
@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from utils.vector_indexes import VECTOR_SEARCH_COLUMNS, sync_vector_search_index
+from utils.vectors import VectorPrecision
+
+
+class Command(BaseCommand):
+    help = (
+        '依向量精度建立各向量欄位的 HNSW 索引並刪除其他精度的索引，'
+        '修改 SEARCH_VECTOR_PRECISION 後執行，每個欄位只保留一個索引'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--precision',
+            choices=[precision.value for precision in VectorPrecision],
+            default=settings.SEARCH_VECTOR_PRECISION,
+            help='要保留的索引精度（預設為 SEARCH_VECTOR_PRECISION 設定值）'
+        )
+
+    def handle(self, *args, **options):
+        precision = VectorPrecision(options['precision'])
+
+        for label in VECTOR_SEARCH_COLUMNS:
+            model = apps.get_model(label)
+            self.stdout.write(f'🔧 {label}：同步向量索引...')
+            # 每個資料表各自一個交易，大表建立索引失敗不影響已完成的資料表
+            with connection.schema_editor() as schema_editor:
+                index_precision = sync_vector_search_index(schema_editor, model, precision)
+            self.stdout.write(self.style.SUCCESS(f'✅ {label}：保留 {index_precision} 精度的 HNSW 索引'))
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+import utils.keywords
+from django.db import migrations, models
+
+# 正規化（NFKC、casefold、去除空白與標點）由 Python 的 keyword_text() 完成並存入 *_normalized 欄位，
+# SQL 端只負責切成字元二元組，與查詢端的 to_bigrams() 結果逐字相同
+CREATE_BIGRAM_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION cjk_bigram_tsvector(normalized text)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT coalesce(array_to_tsvector(array_agg(DISTINCT substr(normalized, i, 2))), ''::tsvector)
+    FROM generate_series(1, char_length(normalized) - 1) AS i
+$$;
+"""
+
+DROP_BIGRAM_FUNCTION_SQL = "DROP FUNCTION IF EXISTS cjk_bigram_tsvector(text);"
+
+
+# 以下正規化與回填邏輯為建立此 migration 時的凍結版本，不引用 utils.keywords 的現行實作，
+# 之後調整 keyword_text() 不會改變這個 migration 的結果
+KEYWORD_TEXT_BATCH_SIZE = 2000
+BIGRAM_STRIP_PATTERN = re.compile(r"[\s\W_]+")
+
+
+def keyword_text(text):
+    normalized = unicodedata.normalize("NFKC", text or "")
+    normalized = re.sub(r"\s+", " ", normalized).strip().casefold()
+    return BIGRAM_STRIP_PATTERN.sub("", normalized)
+
+
+def fill_model_keyword_text(model, text_field_name):
+    field_name = f"{text_field_name}_normalized"
+    pending = model.objects.filter(**{f"{field_name}__isnull": True}).order_by("pk")
+    while True:
+        rows = list(pending.only("pk", text_field_name)[:KEYWORD_TEXT_BATCH_SIZE])
+        if not rows:
+            return
+        for row in rows:
+            setattr(row, field_name, keyword_text(getattr(row, text_field_name)))
+        model.objects.bulk_update(rows, [field_name])
+
+
+def fill_keyword_text(apps, schema_editor):
+    fill_model_keyword_text(apps.get_model('crawlers', 'Dataset'), 'description')
+    fill_model_keyword_text(apps.get_model('crawlers', 'Symptom'), 'question')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawlers', '0002_alter_dataset_options_alter_file_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='description_normalized',
+            field=models.TextField(blank=True, editable=False, help_text='description 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。', null=True),
+        ),
+        migrations.AddField(
+            model_name='symptom',
+            name='question_normalized',
+            field=models.TextField(blank=True, editable=False, help_text='question 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。', null=True),
+        ),
+        migrations.RunPython(fill_keyword_text, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_BIGRAM_FUNCTION_SQL, DROP_BIGRAM_FUNCTION_SQL),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=django.contrib.postgres.indexes.GinIndex(utils.keywords.BigramDocument('description_normalized'), name='crawlers_desc_bigram_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=django.contrib.postgres.indexes.GinIndex(utils.keywords.BigramDocument('question_normalized'), name='crawlers_symp_q_bigram_gin'),
+        ),
+    ]
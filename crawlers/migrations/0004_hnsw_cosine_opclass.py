@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+import pgvector.django.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawlers', '0003_bigram_keyword_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dataset',
+            name='crawlers_desc_emb_hnsw_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='symptom',
+            name='crawlers_symp_q_emb_hnsw_idx',
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['description_embeddings'], m=16, name='crawlers_desc_emb_hnsw_idx', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['question_embeddings'], m=16, name='crawlers_symp_q_emb_hnsw_idx', opclasses=['vector_cosine_ops']),
+        ),
+    ]
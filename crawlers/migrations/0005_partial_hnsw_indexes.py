@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:59
+
+import pgvector.django.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawlers', '0004_hnsw_cosine_opclass'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '生育保健')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_0ca657ec_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '出生及收養')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_4942a42d_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '求學及進修')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_ec9743d8_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '服兵役')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_8083cb0e_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '求職及就業')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_6379ac31_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '開創事業')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_6ad7efd8_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '婚姻')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_77184366_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '投資理財')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_b45c5a1f_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '休閒旅遊')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_3093dec6_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '交通及通訊')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_7ac6ef91_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '就醫')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_3ee6ce65_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '購屋及遷徙')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_66798101_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '選舉及投票')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_44393766_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '生活安全及品質')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_00022842_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '退休')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_e911d910_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '老年安養')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_63d0a7c5_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '生命禮儀')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_61608ad8_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('category', '公共資訊')), ef_construction=64, fields=['description_embeddings'], m=16, name='ds_cat_9e690548_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '內科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_5f54863d_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '外科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_49c86207_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '牙科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_06d50270_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '骨科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_14e00107_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '眼科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_ab5129ad_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '肝膽腸胃科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_0d99fcb2_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '耳鼻喉科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_a792d5db_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=pgvector.django.indexes.HnswIndex(condition=models.Q(('department', '皮膚科')), ef_construction=64, fields=['question_embeddings'], m=16, name='symp_dept_cfc9756b_hnsw', opclasses=['vector_cosine_ops']),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import utils.vector_indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    完整精度的 HNSW 索引改由 SyncVectorSearchIndex 管理，migration 一律建立完整精度索引；
+    切換為 halfvec / binary / short 請執行 manage.py sync_vector_indexes，量化索引取代完整索引而不是額外增加。
+    """
+
+    dependencies = [
+        ('crawlers', '0005_partial_hnsw_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='dataset',
+                    name='crawlers_desc_emb_hnsw_idx',
+                ),
+            ],
+        ),
+        utils.vector_indexes.SyncVectorSearchIndex(model_name='dataset'),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='symptom',
+                    name='crawlers_symp_q_emb_hnsw_idx',
+                ),
+            ],
+        ),
+        utils.vector_indexes.SyncVectorSearchIndex(model_name='symptom'),
+    ]
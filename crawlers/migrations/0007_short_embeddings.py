@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import pgvector.django.vector
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawlers', '0006_quantized_hnsw_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='description_embeddings_short',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=256, help_text='description_embeddings 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。', null=True),
+        ),
+        migrations.AddField(
+            model_name='symptom',
+            name='question_embeddings_short',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=256, help_text='question_embeddings 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。', null=True),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from .gov_data import Dataset, File, ASSOCIATED_CATEGORIES_DATABASE_NAME
-from .symptom import Symptom
+from .symptom import Symptom, SYMPTOM_DEPARTMENTS
 
 __all__ = [
     'Dataset',
     'File',
     'Symptom',
     'ASSOCIATED_CATEGORIES_DATABASE_NAME',
+    'SYMPTOM_DEPARTMENTS',
 ]
@@ -1,7 +1,11 @@
+import hashlib
 from django.db import models
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
+from django.contrib.postgres.indexes import GinIndex
 from pgvector.django import VectorField, HnswIndex
 from typing import Optional
+from utils.keywords import BigramDocument, keyword_field_name
+from utils.vectors import SHORT_EMBEDDING_DIMENSIONS
 
 
 ASSOCIATED_CATEGORIES_DATABASE_NAME = {
@@ -26,6 +30,10 @@ ASSOCIATED_CATEGORIES_DATABASE_NAME = {
 }
 
 
+def category_hnsw_index_name(category: str) -> str:
+    return f"ds_cat_{hashlib.md5(category.encode('utf-8')).hexdigest()[:8]}_hnsw"
+
+
 
 
 class DatasetQuerySet(models.QuerySet):
@@ -39,7 +47,8 @@ class DatasetQuerySet(models.QuerySet):
         upload_start: Optional[str] = None,
         upload_end: Optional[str] = None,
         update_start: Optional[str] = None,
-        update_end: Optional[str] = None
+        update_end: Optional[str] = None,
+        search_options=None,
     ) -> 'DatasetQuerySet':
         """
         構建 Dataset 查詢集
@@ -56,16 +65,6 @@ class DatasetQuerySet(models.QuerySet):
         if name:
             queryset = queryset.filter(name__icontains=name)
         
-        if description:
-            queryset = hybrid_search_with_rerank(
-                queryset=queryset,
-                vector_field_name="description_embeddings",
-                text_field_name="description",
-                original_question=description,
-            )
-        else:
-            queryset = queryset.order_by("-dataset_id")
-        
         # 上架時間過濾
         if upload_start:
             try:
@@ -96,6 +95,18 @@ class DatasetQuerySet(models.QuerySet):
             except (ValueError, TypeError):
                 pass
         
+        # 語意搜尋放在所有過濾條件之後，讓候選集合先被縮小
+        if description:
+            queryset = hybrid_search_with_rerank(
+                queryset=queryset,
+                vector_field_name="description_embeddings",
+                text_field_name="description",
+                original_question=description,
+                options=search_options,
+            )
+        else:
+            queryset = queryset.order_by("-dataset_id")
+        
         return queryset
 
 
@@ -115,6 +126,12 @@ class Dataset(models.Model):
     name = models.CharField(max_length=255, verbose_name="資料集名稱")
     category = models.CharField(max_length=100, verbose_name="服務分類", db_index=True)
     description = models.TextField(null=True, blank=True, verbose_name="資料集描述")
+    description_normalized = models.TextField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="description 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。"
+    )
     department = models.CharField(max_length=100, verbose_name="提供機關")
     update_frequency = models.CharField(max_length=100, verbose_name="更新頻率")
     license = models.CharField(max_length=100, verbose_name="授權方式")
@@ -127,6 +144,12 @@ class Dataset(models.Model):
         dimensions=1536,
         help_text="基於 rag_description 欄位並使用 OpenAI text-embedding-3-small 產生向量。"
     )
+    description_embeddings_short = VectorField(
+        dimensions=SHORT_EMBEDDING_DIMENSIONS,
+        null=True,
+        blank=True,
+        help_text="description_embeddings 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。"
+    )
 
     # 使用自定義管理器
     objects = DatasetManager()
@@ -135,13 +158,23 @@ class Dataset(models.Model):
         verbose_name = '政府資料集'
         verbose_name_plural = '政府資料集'
         indexes = [
-            HnswIndex(
-                name="crawlers_desc_emb_hnsw_idx",
-                fields=["description_embeddings"],
-                m=16,
-                ef_construction=64,
-                opclasses=["vector_l2_ops"],
-            )
+            # 向量搜尋的 HNSW 索引依 SEARCH_VECTOR_PRECISION 由 utils.vector_indexes 建立，不列在這裡
+            GinIndex(
+                BigramDocument(keyword_field_name("description")),
+                name="crawlers_desc_bigram_gin",
+            ),
+            # 依服務分類建立部分索引，分類過濾後的向量查詢仍能走 HNSW 而不損失召回
+            *[
+                HnswIndex(
+                    name=category_hnsw_index_name(category),
+                    fields=["description_embeddings"],
+                    m=16,
+                    ef_construction=64,
+                    opclasses=["vector_cosine_ops"],
+                    condition=Q(category=category),
+                )
+                for category in ASSOCIATED_CATEGORIES_DATABASE_NAME
+            ],
         ]
 
     def __str__(self):
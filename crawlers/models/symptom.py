@@ -1,11 +1,28 @@
+import hashlib
 from django.db import models
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
+from django.contrib.postgres.indexes import GinIndex
 from pgvector.django import VectorField, HnswIndex
 from typing import Optional
+from utils.keywords import BigramDocument, keyword_field_name
+from utils.vectors import SHORT_EMBEDDING_DIMENSIONS
 
 
+SYMPTOM_DEPARTMENTS = [
+    "內科",
+    "外科",
+    "牙科",
+    "骨科",
+    "眼科",
+    "肝膽腸胃科",
+    "耳鼻喉科",
+    "皮膚科",
+]
 
 
+def department_hnsw_index_name(department: str) -> str:
+    return f"symp_dept_{hashlib.md5(department.encode('utf-8')).hexdigest()[:8]}_hnsw"
+
 
 class SymptomQuerySet(models.QuerySet):
     """Symptom 查詢集，包含自定義查詢方法"""
@@ -14,7 +31,8 @@ class SymptomQuerySet(models.QuerySet):
         self,
         department: Optional[str] = None, 
         gender: Optional[str] = None, 
-        question: Optional[str] = None
+        question: Optional[str] = None,
+        search_options=None,
     ) -> 'SymptomQuerySet':
         """
         構建 Symptom 查詢集
@@ -24,7 +42,10 @@ class SymptomQuerySet(models.QuerySet):
         
         queryset = self
         
-        if department:
+        if department in SYMPTOM_DEPARTMENTS:
+            # 完整科別名稱使用等值過濾，才能命中依科別建立的部分 HNSW 索引
+            queryset = queryset.filter(department=department)
+        elif department:
             queryset = queryset.filter(department__icontains=department)
         
         if gender:
@@ -36,6 +57,7 @@ class SymptomQuerySet(models.QuerySet):
                 vector_field_name="question_embeddings",
                 text_field_name="question",
                 original_question=question,
+                options=search_options,
             )
         else:
             queryset = queryset.order_by("-question_time")
@@ -62,6 +84,12 @@ class Symptom(models.Model):
 
     symptom = models.CharField(max_length=255)
     question = models.TextField(db_index=True)
+    question_normalized = models.TextField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="question 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。"
+    )
     answer = models.TextField()
 
     gender = models.CharField(max_length=10)
@@ -73,6 +101,12 @@ class Symptom(models.Model):
         dimensions=1536,
         help_text="基於 question 欄位並使用 OpenAI text-embedding-3-small 產生向量。"
     )
+    question_embeddings_short = VectorField(
+        dimensions=SHORT_EMBEDDING_DIMENSIONS,
+        null=True,
+        blank=True,
+        help_text="question_embeddings 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。"
+    )
 
     # 使用自定義管理器
     objects = SymptomManager()
@@ -81,13 +115,23 @@ class Symptom(models.Model):
         verbose_name = '衛福部-台灣e院-症狀'
         verbose_name_plural = '衛福部-台灣e院-症狀'
         indexes = [
-            HnswIndex(
-                name="crawlers_symp_q_emb_hnsw_idx",
-                fields=["question_embeddings"],
-                m=16,
-                ef_construction=64,
-                opclasses=["vector_l2_ops"],
-            )
+            # 向量搜尋的 HNSW 索引依 SEARCH_VECTOR_PRECISION 由 utils.vector_indexes 建立，不列在這裡
+            GinIndex(
+                BigramDocument(keyword_field_name("question")),
+                name="crawlers_symp_q_bigram_gin",
+            ),
+            # 依科別建立部分索引，科別過濾後的向量查詢仍能走 HNSW 而不損失召回
+            *[
+                HnswIndex(
+                    name=department_hnsw_index_name(department),
+                    fields=["question_embeddings"],
+                    m=16,
+                    ef_construction=64,
+                    opclasses=["vector_cosine_ops"],
+                    condition=Q(department=department),
+                )
+                for department in SYMPTOM_DEPARTMENTS
+            ],
         ]
 
     def __str__(self):
@@ -0,0 +1,30 @@
+"""
+Crawlers 應用的信號處理器
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from utils.corpus_version import bump_corpus_version
+from utils.keywords import set_keyword_text
+
+
+@receiver(pre_save, sender='crawlers.Symptom')
+def fill_symptom_keyword_text(sender, instance, **kwargs):
+    set_keyword_text(instance, 'question')
+
+
+@receiver(pre_save, sender='crawlers.Dataset')
+def fill_dataset_keyword_text(sender, instance, **kwargs):
+    set_keyword_text(instance, 'description')
+
+
+@receiver(post_save, sender='crawlers.Symptom')
+@receiver(post_delete, sender='crawlers.Symptom')
+@receiver(post_save, sender='crawlers.Dataset')
+@receiver(post_delete, sender='crawlers.Dataset')
+def bump_crawled_corpus_version(sender, instance, **kwargs):
+    """
+    Symptom / Dataset 有異動時遞增資料集版本，
+    向量快照與語意查詢快取會因版本不符而改回查詢資料庫。
+    """
+    bump_corpus_version(sender._meta.label)
@@ -1,3 +1,331 @@
-from django.test import TestCase
+import math
+import time
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.db import OperationalError
+from django.db.models import Q
+from django.test import SimpleTestCase, override_settings
+from celery_app.crawlers.gov_datas import _create_column_mapping_list, _prepare_chunks_for_dataset_storage
+from crawlers.models import Dataset, Symptom
+from crawlers.models.symptom import SYMPTOM_DEPARTMENTS
+from utils.corpus_version import bump_corpus_version, coalesce_corpus_version_bumps, get_corpus_version
+from utils.file_to_df import FileDataFrameHandler
+from utils.keywords import build_keyword_query, extract_keywords, keyword_text, to_bigrams
+from utils import semantic_cache
+from utils.search import RRF_K, _fuse_scores, bm25_scores, rerank_cache_key, resolve_vector_precision
+from utils.vector_indexes import VECTOR_SEARCH_COLUMNS, check_vector_search_indexes
+from utils.vector_snapshots import VectorSnapshot
+from utils.vectors import SHORT_EMBEDDING_DIMENSIONS, VectorPrecision, short_embedding_for_storage, shorten_embedding
 
-# Create your tests here.
+
+class KeywordTextTests(SimpleTestCase):
+    """關鍵字正規化與二元組切分，索引端（keyword_text）與查詢端（to_bigrams）必須逐字一致。"""
+
+    def test_keyword_text_normalizes_width_case_and_punctuation(self):
+        self.assertEqual(keyword_text("ＡＢＣ def"), "abcdef")
+        self.assertEqual(keyword_text("頭痛，發燒！ 怎麼辦？"), "頭痛發燒怎麼辦")
+        self.assertEqual(keyword_text("snake_case\tword"), "snakecaseword")
+
+    def test_keyword_text_handles_empty_values(self):
+        self.assertEqual(keyword_text(None), "")
+        self.assertEqual(keyword_text("  \n "), "")
+
+    def test_to_bigrams_splits_normalized_text_without_duplicates(self):
+        self.assertEqual(to_bigrams("頭痛頭痛"), ["頭痛", "痛頭"])
+        self.assertEqual(to_bigrams("Ａb，c"), ["ab", "bc"])
+
+    def test_to_bigrams_ignores_text_shorter_than_two_characters(self):
+        self.assertEqual(to_bigrams("痛"), [])
+        self.assertEqual(to_bigrams("！"), [])
+
+    def test_query_bigrams_match_indexed_text(self):
+        # 查詢端的二元組必須全部出現在同一段文字正規化後的內容中，GIN 索引才查得到
+        document = keyword_text("最近常常頭痛，該怎麼處理？")
+        for keyword in extract_keywords("頭痛怎麼辦"):
+            for bigram in to_bigrams(keyword):
+                self.assertIn(bigram, document)
+
+    def test_build_keyword_query_joins_keywords_with_or(self):
+        query = build_keyword_query(["頭痛", "發燒"])
+        self.assertEqual(query.get_source_expressions()[0].value, "('頭痛') | ('發燒')")
+        self.assertIsNone(build_keyword_query(["痛"]))
+
+
+class LocalRankingTests(SimpleTestCase):
+    """本地 RRF + BM25 排序。"""
+
+    def test_bm25_prefers_documents_containing_query_terms(self):
+        scores = bm25_scores(to_bigrams("頭痛"), ["經常頭痛", "腳踝扭傷", "頭痛又頭暈"])
+        self.assertGreater(scores[0], 0)
+        self.assertEqual(scores[1], 0)
+        self.assertGreater(scores[2], 0)
+
+    def test_bm25_penalizes_longer_documents(self):
+        scores = bm25_scores(to_bigrams("頭痛"), ["頭痛", "頭痛" + "，另外還有其他很多不相關的描述內容" * 5])
+        self.assertGreater(scores[0], scores[1])
+
+    def test_bm25_without_terms_or_documents(self):
+        self.assertEqual(bm25_scores([], ["頭痛"]), [0.0])
+        self.assertEqual(bm25_scores(["頭痛"], []), [])
+
+    def test_fuse_scores_sums_reciprocal_ranks(self):
+        first = Symptom(id=1, question="最近頭痛")
+        second = Symptom(id=2, question="腳踝扭傷")
+        third = Symptom(id=3, question="喉嚨痛")
+
+        fused = _fuse_scores(
+            keyword_results=[first],
+            vector_results=[second, first],
+            combined_results=[first, second, third],
+            text_field_name="question",
+            question="頭痛怎麼辦",
+        )
+
+        # first：關鍵字第 1、向量第 2、BM25 第 1；second：向量第 1、BM25 第 2；third：BM25 第 3
+        self.assertAlmostEqual(fused[1], 2 / (RRF_K + 1) + 1 / (RRF_K + 2))
+        self.assertAlmostEqual(fused[2], 1 / (RRF_K + 1) + 1 / (RRF_K + 2))
+        self.assertAlmostEqual(fused[3], 1 / (RRF_K + 3))
+        self.assertEqual([pk for pk, _ in fused.most_common()], [1, 2, 3])
+
+
+class RerankCacheKeyTests(SimpleTestCase):
+    """rerank 快取鍵只取決於問題、候選集合內容與 top_n。"""
+
+    def setUp(self):
+        self.candidates = [Symptom(id=1, question="最近頭痛"), Symptom(id=2, question="腳踝扭傷")]
+
+    def key(self, candidates=None, question="頭痛怎麼辦", top_n=5):
+        return rerank_cache_key(candidates or self.candidates, "question", question, top_n)
+
+    def test_key_ignores_candidate_order_and_question_spacing(self):
+        self.assertEqual(self.key(), self.key(list(reversed(self.candidates))))
+        self.assertEqual(self.key(), self.key(question="  頭痛怎麼辦 "))
+
+    def test_key_changes_with_candidate_content(self):
+        edited = [Symptom(id=1, question="最近頭痛很久"), self.candidates[1]]
+        self.assertNotEqual(self.key(), self.key(edited))
+
+    def test_key_changes_with_question_and_top_n(self):
+        self.assertNotEqual(self.key(), self.key(question="發燒怎麼辦"))
+        self.assertNotEqual(self.key(), self.key(top_n=3))
+
+
+class PartialIndexPrecisionTests(SimpleTestCase):
+    """過濾條件命中完整精度的部分 HNSW 索引時，第一階段改用 FULL。"""
+
+    def precision(self, queryset, precision=VectorPrecision.HALFVEC):
+        return resolve_vector_precision(queryset, "question_embeddings", precision)
+
+    def test_department_filter_uses_full_precision(self):
+        department = SYMPTOM_DEPARTMENTS[0]
+        self.assertEqual(self.precision(Symptom.objects.filter(department=department)), VectorPrecision.FULL)
+        self.assertEqual(
+            self.precision(Symptom.objects.filter(department=department, gender="女"), VectorPrecision.BINARY),
+            VectorPrecision.FULL,
+        )
+
+    def test_filters_without_matching_partial_index_keep_precision(self):
+        department = SYMPTOM_DEPARTMENTS[0]
+        for queryset in [
+            Symptom.objects.all(),
+            Symptom.objects.filter(department="不存在的科別"),
+            Symptom.objects.filter(gender="女"),
+            Symptom.objects.exclude(department=department),
+            Symptom.objects.filter(Q(department=department) | Q(gender="女")),
+        ]:
+            self.assertEqual(self.precision(queryset), VectorPrecision.HALFVEC)
+
+
+class VectorIndexCheckTests(SimpleTestCase):
+    """資料庫中的向量索引與 SEARCH_VECTOR_PRECISION 不一致時，系統檢查提出警告。"""
+
+    def run_check(self, existing_indexes=None, error=None):
+        connection = mock.MagicMock()
+        if error is not None:
+            connection.cursor.side_effect = error
+        connection.introspection.get_constraints.return_value = {name: {} for name in existing_indexes or []}
+        with mock.patch("utils.vector_indexes.connections", {"default": connection}):
+            return check_vector_search_indexes(databases=["default"])
+
+    @override_settings(SEARCH_VECTOR_PRECISION="halfvec")
+    def test_warns_for_each_column_missing_the_configured_index(self):
+        full_indexes = [column.index(VectorPrecision.FULL).name for column in VECTOR_SEARCH_COLUMNS.values()]
+        warnings = self.run_check(full_indexes)
+        self.assertEqual([warning.obj for warning in warnings], list(VECTOR_SEARCH_COLUMNS))
+        self.assertTrue(all(warning.id == "crawlers.W001" for warning in warnings))
+
+    @override_settings(SEARCH_VECTOR_PRECISION="halfvec")
+    def test_no_warning_when_configured_index_exists(self):
+        halfvec_indexes = [column.index(VectorPrecision.HALFVEC).name for column in VECTOR_SEARCH_COLUMNS.values()]
+        self.assertEqual(self.run_check(halfvec_indexes), [])
+
+    def test_skipped_without_databases_or_connection(self):
+        self.assertEqual(check_vector_search_indexes(databases=None), [])
+        self.assertEqual(self.run_check(error=OperationalError("connection refused")), [])
+
+
+class ShortEmbeddingTests(SimpleTestCase):
+    """縮短維度向量：取前 256 維後 L2 正規化。"""
+
+    def test_shorten_embedding_truncates_and_normalizes(self):
+        embedding = [3.0, 4.0] + [0.0] * SHORT_EMBEDDING_DIMENSIONS
+        shortened = shorten_embedding(embedding)
+        self.assertEqual(len(shortened), SHORT_EMBEDDING_DIMENSIONS)
+        self.assertAlmostEqual(shortened[0], 0.6)
+        self.assertAlmostEqual(shortened[1], 0.8)
+        self.assertAlmostEqual(math.sqrt(sum(value * value for value in shortened)), 1.0)
+
+    def test_shorten_embedding_keeps_zero_vector(self):
+        self.assertEqual(shorten_embedding([0.0] * 4, dimensions=2), [0.0, 0.0])
+
+    def test_short_embedding_is_stored_only_for_short_precision(self):
+        embedding = [1.0] * (SHORT_EMBEDDING_DIMENSIONS * 2)
+        with override_settings(SEARCH_VECTOR_PRECISION="full"):
+            self.assertIsNone(short_embedding_for_storage(embedding))
+        with override_settings(SEARCH_VECTOR_PRECISION="short"):
+            self.assertEqual(short_embedding_for_storage(embedding), shorten_embedding(embedding))
+            self.assertIsNone(short_embedding_for_storage(None))
+
+
+LOCMEM_CORPUS_CACHE = {"corpus": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CORPUS_CACHE)
+class CorpusVersionTests(SimpleTestCase):
+    """資料集版本為不重複的 token，異動後換新值，批次期間合併更新。"""
+
+    def test_version_is_stable_until_bumped(self):
+        version = get_corpus_version("crawlers.Symptom")
+        self.assertIsNotNone(version)
+        self.assertEqual(get_corpus_version("crawlers.Symptom"), version)
+
+        bump_corpus_version("crawlers.Symptom")
+        self.assertNotEqual(get_corpus_version("crawlers.Symptom"), version)
+
+    def test_coalesced_bumps_update_once_at_start_and_end(self):
+        before = get_corpus_version("crawlers.Dataset")
+        with coalesce_corpus_version_bumps():
+            bump_corpus_version("crawlers.Dataset")
+            during = get_corpus_version("crawlers.Dataset")
+            bump_corpus_version("crawlers.Dataset")
+            self.assertEqual(get_corpus_version("crawlers.Dataset"), during)
+        self.assertNotIn(get_corpus_version("crawlers.Dataset"), (before, during))
+
+
+class VectorSnapshotStalenessTests(SimpleTestCase):
+    """快照在版本不符、版本未知或超過存活時間時視為過期。"""
+
+    def snapshot(self, corpus_version="v1", age=0):
+        return VectorSnapshot(
+            label="crawlers.Symptom",
+            ids=np.arange(3),
+            vectors=np.eye(3, SHORT_EMBEDDING_DIMENSIONS, dtype=np.float32),
+            created_at=time.time() - age,
+            corpus_version=corpus_version,
+            meta_mtime=0,
+        )
+
+    def is_stale(self, snapshot, current_version):
+        with mock.patch("utils.vector_snapshots.get_corpus_version", return_value=current_version):
+            return snapshot.is_stale()
+
+    def test_matching_version_is_fresh(self):
+        self.assertFalse(self.is_stale(self.snapshot(), "v1"))
+
+    def test_changed_version_is_stale(self):
+        self.assertTrue(self.is_stale(self.snapshot(), "v2"))
+
+    def test_unknown_version_is_stale(self):
+        self.assertTrue(self.is_stale(self.snapshot(), None))
+        self.assertTrue(self.is_stale(self.snapshot(corpus_version=None), "v1"))
+
+    @override_settings(VECTOR_SNAPSHOT_MAX_AGE=60)
+    def test_expired_snapshot_is_stale(self):
+        self.assertTrue(self.is_stale(self.snapshot(age=120), "v1"))
+
+    def test_search_returns_closest_ids(self):
+        embedding = [0.0, 1.0] + [0.0] * (SHORT_EMBEDDING_DIMENSIONS - 2)
+        self.assertEqual(self.snapshot().search(embedding, 2)[0], 1)
+
+
+class DatasetFileChunkTests(SimpleTestCase):
+    """政府資料集檔案逐段寫入：欄位依出現順序對應到 Excel 風格名稱，並附上來源欄位。"""
+
+    def test_columns_are_renamed_consistently_across_chunks(self):
+        handler = FileDataFrameHandler()
+        column_names = {}
+        chunks = [pd.DataFrame({"日期": ["2024-01-01"], "金額": [1]}), pd.DataFrame({"金額": [2], "備註": ["無"]})]
+
+        processed = list(_prepare_chunks_for_dataset_storage(
+            handler, iter(chunks), column_names, Dataset(dataset_id="1001"), "https://example.com/a.csv", "csv", "md5",
+        ))
+
+        self.assertEqual(column_names, {"日期": "a", "金額": "b", "備註": "c"})
+        self.assertEqual(list(processed[1].columns[:2]), ["b", "c"])
+        self.assertEqual(processed[0]["_content_md5"].tolist(), ["md5"])
+        self.assertEqual(processed[0]["_created_at"].iloc[0], processed[1]["_created_at"].iloc[0])
+        self.assertEqual(
+            _create_column_mapping_list(handler, len(column_names), ["日期說明"]),
+            [["a", "日期說明"], ["b", "欄位_2"], ["c", "欄位_3"]],
+        )
+
+
+class FakeRedisList:
+    """只實作語意查詢快取用到的 LRANGE / LPUSH / LTRIM / EXPIRE。"""
+
+    def __init__(self):
+        self.lists = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists[key][start:end + 1]
+
+    def expire(self, key, seconds):
+        pass
+
+
+@override_settings(
+    CACHES={"search": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    SEMANTIC_QUERY_CACHE_MAX_ENTRIES=2,
+    SEMANTIC_QUERY_CACHE_THRESHOLD=0.9,
+)
+class SemanticCacheEntryTests(SimpleTestCase):
+    """語意查詢快取以 Redis 清單保存向量，只有命中的項目才讀取內容。"""
+
+    def setUp(self):
+        self.redis = FakeRedisList()
+        patcher = mock.patch.object(semantic_cache, "_redis_client", lambda cache, key, write=False: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def vector(self, index):
+        vector = np.zeros(SHORT_EMBEDDING_DIMENSIONS, dtype=np.float32)
+        vector[index] = 1
+        return vector
+
+    def test_returns_payload_of_similar_entry(self):
+        semantic_cache._add_entry("scope", self.vector(0), {"ids": [1]})
+        semantic_cache._add_entry("scope", self.vector(1), {"ids": [2]})
+
+        self.assertEqual(semantic_cache._find_similar_entry("scope", self.vector(1)), {"ids": [2]})
+        self.assertIsNone(semantic_cache._find_similar_entry("scope", self.vector(2)))
+        self.assertIsNone(semantic_cache._find_similar_entry("other-scope", self.vector(1)))
+
+    def test_keeps_only_latest_entries(self):
+        for index in range(3):
+            semantic_cache._add_entry("scope", self.vector(index), {"ids": [index]})
+
+        self.assertIsNone(semantic_cache._find_similar_entry("scope", self.vector(0)))
+        self.assertEqual(semantic_cache._find_similar_entry("scope", self.vector(2)), {"ids": [2]})
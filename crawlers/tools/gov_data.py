@@ -1,7 +1,8 @@
 import json
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
-from utils.search import hybrid_search_with_rerank
+from utils.search import SearchOptions, hybrid_search_with_rerank
+from utils.semantic_cache import cached_semantic_search
 from typing import Type
 from crawlers.models import Dataset, File
 
@@ -51,7 +52,8 @@ class GovDataDatasetQueryTool(BaseTool):
                     queryset=queryset, 
                     vector_field_name="description_embeddings",
                     text_field_name="description",
-                    original_question=question
+                    original_question=question,
+                    options=SearchOptions(caller="reference", materialize=True),
                 )
         else:
             # 建立基本查詢集
@@ -59,11 +61,18 @@ class GovDataDatasetQueryTool(BaseTool):
             
             # 使用語意搜尋
             if question.strip():
-                queryset = hybrid_search_with_rerank(
+                # 語意相近的問題直接沿用先前的檢索結果
+                queryset = cached_semantic_search(
                     queryset=queryset,
-                    vector_field_name="description_embeddings", 
-                    text_field_name="description",
-                    original_question=question
+                    question=question,
+                    scope={"caller": "chat_tool"},
+                    run_search=lambda: hybrid_search_with_rerank(
+                        queryset=Dataset.objects.all(),
+                        vector_field_name="description_embeddings", 
+                        text_field_name="description",
+                        original_question=question,
+                        options=SearchOptions(caller="chat_tool", materialize=True),
+                    ),
                 )
 
         result = f"找到 {queryset.count()} 筆相關資料集：\n\n"
@@ -77,6 +86,8 @@ class GovDataDatasetQueryTool(BaseTool):
             if dataset.description:
                 result += f"   描述：{dataset.description[:200]}{'...' if len(dataset.description) > 200 else ''}\n"
             result += f"   網址：{dataset.url}\n"
+            if getattr(dataset, "relevance_score", None) is not None:
+                result += f"   相關度分數：{dataset.relevance_score:.3f}\n"
         
             # 獲取該資料集的所有檔案
             file_queryset = File.objects.filter(dataset=dataset).order_by("-id")[:5]
@@ -1,7 +1,8 @@
 import json
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
-from utils.search import hybrid_search_with_rerank
+from utils.search import SearchOptions, hybrid_search_with_rerank
+from utils.semantic_cache import cached_semantic_search
 from crawlers.models import Symptom
 
 
@@ -57,14 +58,29 @@ class SymptomDataRetrievalTool(BaseTool):
                 queryset=Symptom.objects.filter(id__in=reference_id_list), 
                 vector_field_name="question_embeddings",
                 text_field_name="question",
-                original_question=question
+                original_question=question,
+                options=SearchOptions(caller="reference", materialize=True),
             )
         else:
-            queryset = Symptom.objects.build_queryset(
-                department=department, 
-                gender=gender, 
-                question=question
-            )
+            def run_search():
+                return Symptom.objects.build_queryset(
+                    department=department, 
+                    gender=gender, 
+                    question=question,
+                    search_options=SearchOptions(caller="chat_tool", materialize=True),
+                )
+
+            if question.strip():
+                # 語意相近且條件相同的問題直接沿用先前的檢索結果
+                queryset = cached_semantic_search(
+                    queryset=Symptom.objects.all(),
+                    question=question,
+                    scope={"caller": "chat_tool", "department": department, "gender": gender},
+                    run_search=run_search,
+                )
+            else:
+                # 沒有問題內容時只依科別、性別過濾，不需要語意快取
+                queryset = run_search()
 
         result = f"找到 {queryset.count()} 筆類似症狀資料：\n\n"
 
@@ -72,6 +88,9 @@ class SymptomDataRetrievalTool(BaseTool):
             result += f"{i}. 【{symptom.department}】{symptom.gender}\n"
             result += f"   主訴：{symptom.symptom}\n"
             result += f"   問題：{symptom.question}\n"
-            result += f"   回答：{symptom.answer}\n\n"
+            result += f"   回答：{symptom.answer}\n"
+            if getattr(symptom, "relevance_score", None) is not None:
+                result += f"   相關度分數：{symptom.relevance_score:.3f}\n"
+            result += "\n"
         
         return result 
\ No newline at end of file
@@ -7,6 +7,11 @@ from django.views import View
 from django.conf import settings
 from crawlers.models import Dataset, ASSOCIATED_CATEGORIES_DATABASE_NAME
 from home.mixins import UserPlanContextMixin
+from utils.search_sessions import (
+    get_or_create_search_session,
+    list_view_search_options,
+    search_fingerprint,
+)
 
 
 
@@ -26,16 +31,31 @@ class GovDataDatasetListView(LoginRequiredMixin, UserPlanContextMixin, ListView)
         upload_end = self.request.GET.get('upload_end')
         update_start = self.request.GET.get('update_start')
         update_end = self.request.GET.get('update_end')
+        self.search_token = ''
         
-        queryset = Dataset.objects.build_queryset(
-            category=category,
-            description=description,
-            name=name,
-            upload_start=upload_start,
-            upload_end=upload_end,
-            update_start=update_start,
-            update_end=update_end
-        )
+        filters = {
+            'category': category,
+            'name': name,
+            'upload_start': upload_start,
+            'upload_end': upload_end,
+            'update_start': update_start,
+            'update_end': update_end,
+        }
+        
+        if description:
+            # 語意搜尋結果快取在 search_token 下，換頁時只查詢當頁資料
+            self.search_token, queryset = get_or_create_search_session(
+                token=self.request.GET.get('search_token'),
+                queryset=Dataset.objects.all(),
+                fingerprint=search_fingerprint(Dataset.objects.all(), description=description, **filters),
+                run_search=lambda: Dataset.objects.build_queryset(
+                    description=description,
+                    search_options=list_view_search_options(self.paginate_by),
+                    **filters,
+                ),
+            )
+        else:
+            queryset = Dataset.objects.build_queryset(**filters)
         
         # 預載入檔案關聯以提高效能
         return queryset.prefetch_related('file_set')
@@ -54,6 +74,7 @@ class GovDataDatasetListView(LoginRequiredMixin, UserPlanContextMixin, ListView)
         context['update_start'] = self.request.GET.get('update_start', '')
         context['update_end'] = self.request.GET.get('update_end', '')
         context['request_path'] = self.request.path
+        context['search_token'] = self.search_token
         
         return context
 
@@ -6,6 +6,11 @@ from django.http import JsonResponse
 from django.views import View
 from crawlers.models import Symptom
 from home.mixins import UserPlanContextMixin
+from utils.search_sessions import (
+    get_or_create_search_session,
+    list_view_search_options,
+    search_fingerprint,
+)
 
 
 @method_decorator(never_cache, name='dispatch')
@@ -20,16 +25,31 @@ class SymptomListView(LoginRequiredMixin, UserPlanContextMixin, ListView):
         department = self.request.GET.get('department')
         gender = self.request.GET.get('gender')
         question = self.request.GET.get('question')
+        self.search_token = ''
         
-        return Symptom.objects.build_queryset(
-            department=department, 
-            gender=gender, 
-            question=question
+        if not question:
+            return Symptom.objects.build_queryset(department=department, gender=gender)
+        
+        # 語意搜尋結果快取在 search_token 下，換頁時只查詢當頁資料
+        self.search_token, results = get_or_create_search_session(
+            token=self.request.GET.get('search_token'),
+            queryset=Symptom.objects.all(),
+            fingerprint=search_fingerprint(
+                Symptom.objects.all(), department=department, gender=gender, question=question
+            ),
+            run_search=lambda: Symptom.objects.build_queryset(
+                department=department,
+                gender=gender,
+                question=question,
+                search_options=list_view_search_options(self.paginate_by),
+            ),
         )
+        return results
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['request_path'] = self.request.path
+        context['search_token'] = self.search_token
         context['department'] = self.request.GET.get('department', '')
         context['gender'] = self.request.GET.get('gender', '')
         context['question'] = self.request.GET.get('question', '')
@@ -1,3 +1,62 @@
 from django.contrib import admin
+from django.db.models import Aggregate, Count, FloatField
+from .models import SearchStageMetric
 
 # Register your models here.
+
+
+class Percentile(Aggregate):
+    """PostgreSQL percentile_cont 聚合函式"""
+    function = 'percentile_cont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+@admin.register(SearchStageMetric)
+class SearchStageMetricAdmin(admin.ModelAdmin):
+    """
+    SearchStageMetric 模型的 Admin 配置
+    """
+    list_display = ['stage', 'duration_ms', 'result_count', 'caller', 'corpus', 'model', 'created_at']
+    list_filter = ['stage', 'caller', 'corpus', 'model', 'created_at']
+    search_fields = ['search_id']
+    date_hierarchy = 'created_at'
+    readonly_fields = [field.name for field in SearchStageMetric._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        """
+        依目前的篩選條件統計各階段耗時的 p50 / p95
+        """
+        response = super().changelist_view(request, extra_context=extra_context)
+
+        changelist = getattr(response, 'context_data', {}).get('cl')
+        if changelist is None:
+            return response
+
+        stage_stats = (
+            changelist.queryset
+            .order_by()
+            .values('stage')
+            .annotate(
+                samples=Count('id'),
+                p50=Percentile('duration_ms', 0.5),
+                p95=Percentile('duration_ms', 0.95),
+            )
+            .order_by('-p95')
+        )
+        response.context_data['stage_stats'] = [
+            {
+                'stage': stat['stage'],
+                'samples': stat['samples'],
+                'p50': round(stat['p50'], 2),
+                'p95': round(stat['p95'], 2),
+            }
+            for stat in stage_stats
+        ]
+        return response
@@ -2,9 +2,11 @@ import json
 import asyncio
 from datetime import datetime
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import InMemoryChannelLayer
 from asgiref.sync import sync_to_async
 from celery_app.tasks.conversations import process_conversation_async
 from conversations.models import SenderChoices
+from celery_app.extractors.progress import source_progress_group_name
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -227,4 +229,92 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'type': 'error',
             'message': error_message,
             'timestamp': datetime.now().strftime('%H:%M:%S')
-        }))
\ No newline at end of file
+        }))
+
+class SourceProgressConsumer(AsyncWebsocketConsumer):
+    """
+    推送資料源內各檔案的處理狀態與進度。
+    Celery worker 透過 channel layer 發出的事件即時轉送；
+    只有 channel layer 為 InMemory（無法跨行程）時，才另以輪詢 SourceFile.progress 補上更新。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.polling = False
+        self.poll_task = None
+        self.file_cache = {}
+
+    async def connect(self):
+        if self.scope["user"].is_anonymous:
+            await self.close()
+            return
+
+        self.user = self.scope["user"]
+        self.source_id = int(self.scope["url_route"]["kwargs"]["source_id"])
+        if not await self.user_owns_source():
+            await self.close()
+            return
+
+        self.group_name = source_progress_group_name(self.source_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        await self.send_file_updates()
+
+        # Redis 等跨行程的 channel layer 會收到 worker 的事件，不需要輪詢資料庫
+        if isinstance(self.channel_layer, InMemoryChannelLayer):
+            self.polling = True
+            self.poll_task = asyncio.create_task(self.poll_progress())
+
+    async def disconnect(self, close_code):
+        self.polling = False
+        if self.poll_task is not None:
+            self.poll_task.cancel()
+            self.poll_task = None
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def source_file_event(self, event):
+        file_event = event["event"]
+        self.file_cache[file_event["file_id"]] = (file_event["status"], file_event.get("progress"))
+        await self.send(text_data=json.dumps({'type': 'file_progress', **file_event}))
+
+    async def poll_progress(self):
+        while self.polling:
+            try:
+                await self.send_file_updates()
+                await asyncio.sleep(2)
+            except Exception:
+                await asyncio.sleep(5)
+
+    async def send_file_updates(self):
+        for file_event in await self.get_file_events():
+            cached = self.file_cache.get(file_event["file_id"])
+            current = (file_event["status"], file_event["progress"])
+            if cached != current:
+                self.file_cache[file_event["file_id"]] = current
+                await self.send(text_data=json.dumps({'type': 'file_progress', **file_event}))
+
+    @sync_to_async
+    def user_owns_source(self):
+        from sources.models import Source
+
+        return Source.objects.filter(id=self.source_id, user=self.user).exists()
+
+    @sync_to_async
+    def get_file_events(self):
+        from sources.models import SourceFile
+
+        files = SourceFile.objects.filter(source_id=self.source_id).only(
+            'id', 'status', 'failed_reason', 'progress'
+        )
+        return [
+            {
+                'file_id': source_file.id,
+                'status': source_file.status,
+                'status_display': source_file.get_status_display(),
+                'failed_reason': source_file.failed_reason,
+                'progress': source_file.progress,
+            }
+            for source_file in files
+        ]
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from utils.search_metrics import purge_search_metrics
+
+
+class Command(BaseCommand):
+    help = '刪除超過保留天數的搜尋階段耗時紀錄（SearchStageMetric）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SEARCH_METRICS_RETENTION_DAYS,
+            help=f'保留最近幾天的紀錄（預設 SEARCH_METRICS_RETENTION_DAYS={settings.SEARCH_METRICS_RETENTION_DAYS}）'
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_search_metrics(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'✅ 已刪除 {deleted} 筆超過 {options["days"]} 天的搜尋耗時紀錄'))
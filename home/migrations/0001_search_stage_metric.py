@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchStageMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('search_id', models.UUIDField(db_index=True, verbose_name='搜尋 ID')),
+                ('stage', models.CharField(max_length=50, verbose_name='階段')),
+                ('duration_ms', models.FloatField(verbose_name='耗時（毫秒）')),
+                ('result_count', models.IntegerField(blank=True, null=True, verbose_name='筆數')),
+                ('caller', models.CharField(max_length=50, verbose_name='呼叫端')),
+                ('model', models.CharField(max_length=100, verbose_name='Embedding 模型')),
+                ('corpus', models.CharField(max_length=100, verbose_name='資料集')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': '搜尋階段耗時',
+                'verbose_name_plural': '搜尋階段耗時',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['stage', 'created_at'], name='search_metric_stage_idx')],
+            },
+        ),
+    ]
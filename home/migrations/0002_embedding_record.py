@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0001_search_stage_metric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Embedding 模型')),
+                ('text_hash', models.CharField(max_length=64, verbose_name='文字 SHA-256')),
+                ('embedding', pgvector.django.vector.VectorField(verbose_name='向量')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Embedding 紀錄',
+                'verbose_name_plural': 'Embedding 紀錄',
+                'constraints': [models.UniqueConstraint(fields=('model', 'text_hash'), name='embedding_record_unique')],
+            },
+        ),
+    ]
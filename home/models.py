@@ -1,3 +1,51 @@
 from django.db import models
+from pgvector.django import VectorField
 
-# Create your models here.
+
+class SearchStageMetric(models.Model):
+    """
+    hybrid search 各階段的耗時紀錄，由 utils.search_metrics 的 DatabaseSink 寫入。
+    同一次搜尋的各階段共用 search_id。
+    """
+    search_id = models.UUIDField(db_index=True, verbose_name='搜尋 ID')
+    stage = models.CharField(max_length=50, verbose_name='階段')
+    duration_ms = models.FloatField(verbose_name='耗時（毫秒）')
+    result_count = models.IntegerField(null=True, blank=True, verbose_name='筆數')
+    caller = models.CharField(max_length=50, verbose_name='呼叫端')
+    model = models.CharField(max_length=100, verbose_name='Embedding 模型')
+    corpus = models.CharField(max_length=100, verbose_name='資料集')
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = '搜尋階段耗時'
+        verbose_name_plural = '搜尋階段耗時'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['stage', 'created_at'], name='search_metric_stage_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.corpus} - {self.stage}：{self.duration_ms}ms"
+
+
+class EmbeddingRecord(models.Model):
+    """
+    以 (model, sha256(文字)) 定址的文件 embedding 儲存區，由 utils.embeddings.embed_texts 讀寫。
+    重新上傳檔案或重新爬取時，內容沒有變動的文字不需要再呼叫 OpenAI。
+    """
+    model = models.CharField(max_length=100, verbose_name='Embedding 模型')
+    text_hash = models.CharField(max_length=64, verbose_name='文字 SHA-256')
+    embedding = VectorField(verbose_name='向量')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Embedding 紀錄'
+        verbose_name_plural = 'Embedding 紀錄'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'text_hash'], name='embedding_record_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} - {self.text_hash}"
@@ -4,4 +4,5 @@ from . import consumers
 websocket_urlpatterns = [
     re_path(r'ws/chat/$', consumers.ChatConsumer.as_asgi()),
     re_path(r'ws/symptoms/chat/$', consumers.ChatConsumer.as_asgi()),  # 症狀頁面也使用同一個消費者
+    re_path(r'ws/sources/(?P<source_id>\d+)/progress/$', consumers.SourceProgressConsumer.as_asgi()),
 ] 
\ No newline at end of file
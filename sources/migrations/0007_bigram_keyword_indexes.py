@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+import utils.keywords
+from django.conf import settings
+from django.db import migrations, models
+
+
+# 以下正規化與回填邏輯為建立此 migration 時的凍結版本，不引用 utils.keywords 的現行實作，
+# 之後調整 keyword_text() 不會改變這個 migration 的結果
+KEYWORD_TEXT_BATCH_SIZE = 2000
+BIGRAM_STRIP_PATTERN = re.compile(r"[\s\W_]+")
+
+
+def keyword_text(text):
+    normalized = unicodedata.normalize("NFKC", text or "")
+    normalized = re.sub(r"\s+", " ", normalized).strip().casefold()
+    return BIGRAM_STRIP_PATTERN.sub("", normalized)
+
+
+def fill_model_keyword_text(model, text_field_name):
+    field_name = f"{text_field_name}_normalized"
+    pending = model.objects.filter(**{f"{field_name}__isnull": True}).order_by("pk")
+    while True:
+        rows = list(pending.only("pk", text_field_name)[:KEYWORD_TEXT_BATCH_SIZE])
+        if not rows:
+            return
+        for row in rows:
+            setattr(row, field_name, keyword_text(getattr(row, text_field_name)))
+        model.objects.bulk_update(rows, [field_name])
+
+
+def fill_keyword_text(apps, schema_editor):
+    fill_model_keyword_text(apps.get_model('sources', 'SourceFile'), 'summary')
+    fill_model_keyword_text(apps.get_model('sources', 'SourceFileChunk'), 'content')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawlers', '0003_bigram_keyword_indexes'),
+        ('sources', '0006_remove_source_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcefile',
+            name='summary_normalized',
+            field=models.TextField(blank=True, editable=False, help_text='summary 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。', null=True),
+        ),
+        migrations.AddField(
+            model_name='sourcefilechunk',
+            name='content_normalized',
+            field=models.TextField(blank=True, editable=False, help_text='content 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。', null=True),
+        ),
+        migrations.RunPython(fill_keyword_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='sourcefile',
+            index=django.contrib.postgres.indexes.GinIndex(utils.keywords.BigramDocument('summary_normalized'), name='file_summary_bigram_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='sourcefilechunk',
+            index=django.contrib.postgres.indexes.GinIndex(utils.keywords.BigramDocument('content_normalized'), name='file_chunk_bigram_gin'),
+        ),
+    ]
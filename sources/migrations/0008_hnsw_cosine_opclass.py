@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+import pgvector.django.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0007_bigram_keyword_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sourcefile',
+            name='file_summary_embedding_hnsw_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sourcefilechunk',
+            name='file_chunk_embedding_hnsw_idx',
+        ),
+        migrations.AddIndex(
+            model_name='sourcefile',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['summary_embedding'], m=16, name='file_summary_embedding_hnsw_idx', opclasses=['vector_cosine_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='sourcefilechunk',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['content_embedding'], m=16, name='file_chunk_embedding_hnsw_idx', opclasses=['vector_cosine_ops']),
+        ),
+    ]
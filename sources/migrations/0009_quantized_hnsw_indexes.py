@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import utils.vector_indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    完整精度的 HNSW 索引改由 SyncVectorSearchIndex 管理，migration 一律建立完整精度索引；
+    切換為 halfvec / binary / short 請執行 manage.py sync_vector_indexes，量化索引取代完整索引而不是額外增加。
+    """
+
+    dependencies = [
+        ('sources', '0008_hnsw_cosine_opclass'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='sourcefile',
+                    name='file_summary_embedding_hnsw_idx',
+                ),
+            ],
+        ),
+        utils.vector_indexes.SyncVectorSearchIndex(model_name='sourcefile'),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='sourcefilechunk',
+                    name='file_chunk_embedding_hnsw_idx',
+                ),
+            ],
+        ),
+        utils.vector_indexes.SyncVectorSearchIndex(model_name='sourcefilechunk'),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import pgvector.django.vector
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0009_quantized_hnsw_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcefile',
+            name='summary_embedding_short',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=256, help_text='summary_embedding 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。', null=True),
+        ),
+        migrations.AddField(
+            model_name='sourcefilechunk',
+            name='content_embedding_short',
+            field=pgvector.django.vector.VectorField(blank=True, dimensions=256, help_text='content_embedding 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。', null=True),
+        ),
+    ]
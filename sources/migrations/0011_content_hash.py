@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0010_short_embeddings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcefilechunk',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='content 的 SHA-256，重新處理時用來比對哪些片段沒有變動。', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='sourcefiletable',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='建立資料表時原始檔案內容的 SHA-256，重新處理時內容未變更即略過。', max_length=64, null=True),
+        ),
+        # 既有片段直接在資料庫內計算雜湊，第一次重新處理時就能比對
+        migrations.RunSQL(
+            sql="UPDATE sources_sourcefilechunk SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex') WHERE content_hash IS NULL",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
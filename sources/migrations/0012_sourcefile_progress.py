@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0011_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcefile',
+            name='progress',
+            field=models.JSONField(blank=True, help_text='處理進度快照（目前階段、已讀頁數、已 embedding 片段數、已寫入批次、各階段處理速度與預估剩餘時間）', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0012_sourcefile_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcefilechunk',
+            name='map_summary',
+            field=models.TextField(blank=True, help_text='父段落在 map_reduce 摘要 map 步驟的摘要，重新處理時內容未變更的父段落直接沿用。', null=True),
+        ),
+    ]
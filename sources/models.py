@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
-from pgvector.django import VectorField, HnswIndex
+from django.contrib.postgres.indexes import GinIndex
+from pgvector.django import VectorField
+from utils.keywords import BigramDocument, keyword_field_name
+from utils.vectors import SHORT_EMBEDDING_DIMENSIONS
 import uuid
 
 class SourceFileFormat(models.TextChoices):
@@ -57,10 +60,22 @@ class SourceFile(models.Model):
     size = models.FloatField(help_text="檔案大小，單位為 MB")
     format = models.CharField(max_length=10, choices=SourceFileFormat.choices)
     summary = models.TextField(null=True, blank=True)
+    summary_normalized = models.TextField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="summary 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。"
+    )
     summary_embedding = VectorField(
         dimensions=1536,
         help_text="使用 OpenAI text-embedding-3-small 產生向量。"
     )
+    summary_embedding_short = VectorField(
+        dimensions=SHORT_EMBEDDING_DIMENSIONS,
+        null=True,
+        blank=True,
+        help_text="summary_embedding 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。"
+    )
 
     path = models.CharField(
         max_length=255, 
@@ -72,6 +87,11 @@ class SourceFile(models.Model):
 
     status = models.CharField(max_length=20, choices=ProcessingStatus.choices, default=ProcessingStatus.PENDING)
     failed_reason = models.TextField(null=True, blank=True)
+    progress = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="處理進度快照（目前階段、已讀頁數、已 embedding 片段數、已寫入批次、各階段處理速度與預估剩餘時間）"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -80,13 +100,11 @@ class SourceFile(models.Model):
         verbose_name_plural = '資料源檔案'
         ordering = ['-created_at']
         indexes = [
-            HnswIndex(
-                name="file_summary_embedding_hnsw_idx",
-                fields=["summary_embedding"],
-                m=16,
-                ef_construction=64,
-                opclasses=["vector_l2_ops"],
-            )
+            # 向量搜尋的 HNSW 索引依 SEARCH_VECTOR_PRECISION 由 utils.vector_indexes 建立，不列在這裡
+            GinIndex(
+                BigramDocument(keyword_field_name("summary")),
+                name="file_summary_bigram_gin",
+            ),
         ]
 
     def __str__(self):
@@ -106,6 +124,12 @@ class SourceFileTable(models.Model):
     source_file = models.ForeignKey(SourceFile, on_delete=models.CASCADE)
     table_name = models.CharField(max_length=255)
     database_name = models.CharField(max_length=255)
+    content_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="建立資料表時原始檔案內容的 SHA-256，重新處理時內容未變更即略過。"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -126,10 +150,33 @@ class SourceFileChunk(models.Model):
     )
 
     content = models.TextField()
+    content_normalized = models.TextField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="content 經 keyword_text() 正規化後的內容，供關鍵字 GIN 索引使用。"
+    )
     content_embedding = VectorField(
         dimensions=1536,
         help_text="使用 OpenAI text-embedding-3-small 產生向量。"
     )
+    content_embedding_short = VectorField(
+        dimensions=SHORT_EMBEDDING_DIMENSIONS,
+        null=True,
+        blank=True,
+        help_text="content_embedding 前 256 維經 L2 正規化，SEARCH_VECTOR_PRECISION 為 short 時作為向量搜尋的第一階段。"
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="content 的 SHA-256，重新處理時用來比對哪些片段沒有變動。"
+    )
+    map_summary = models.TextField(
+        null=True,
+        blank=True,
+        help_text="父段落在 map_reduce 摘要 map 步驟的摘要，重新處理時內容未變更的父段落直接沿用。"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -137,13 +184,11 @@ class SourceFileChunk(models.Model):
         verbose_name = '資料源檔案片段'
         verbose_name_plural = '資料源檔案片段'
         indexes = [
-            HnswIndex(
-                name="file_chunk_embedding_hnsw_idx",
-                fields=["content_embedding"],
-                m=16,
-                ef_construction=64,
-                opclasses=["vector_l2_ops"],
-            )
+            # 向量搜尋的 HNSW 索引依 SEARCH_VECTOR_PRECISION 由 utils.vector_indexes 建立，不列在這裡
+            GinIndex(
+                BigramDocument(keyword_field_name("content")),
+                name="file_chunk_bigram_gin",
+            ),
         ]
 
     def __str__(self):
@@ -3,8 +3,20 @@ Sources 應用的信號處理器
 """
 
 import os
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, pre_save
 from django.dispatch import receiver
+from utils.keywords import set_keyword_text
+
+
+@receiver(pre_save, sender='sources.SourceFile')
+def fill_source_file_keyword_text(sender, instance, **kwargs):
+    set_keyword_text(instance, 'summary')
+
+
+@receiver(pre_save, sender='sources.SourceFileChunk')
+def fill_source_file_chunk_keyword_text(sender, instance, **kwargs):
+    # bulk_create 不會觸發 pre_save，批次寫入的片段由 build_source_file_chunk 直接設定
+    set_keyword_text(instance, 'content')
 
 
 @receiver(pre_delete, sender='sources.SourceFile')
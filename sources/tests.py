@@ -1,3 +1,134 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+import pandas as pd
+from django.test import SimpleTestCase
+from utils import file_to_df
+from utils.file_to_df import FileDataFrameHandler
 
-# Create your tests here.
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+
+class JsonStreamReaderTests(SimpleTestCase):
+    """串流解析 JSON 陣列：元素（特別是數字與字串）剛好跨過讀取緩衝區邊界時仍需正確解析。"""
+
+    ITEMS = [
+        {"id": 1, "value": 12345678901234, "name": "頭痛"},
+        {"id": 2, "value": -0.125e-3, "name": "含有 \"引號\" 與 ] , [ 的字串"},
+        {"id": 3, "value": None, "name": "", "nested": {"list": [1, 2, [3]]}},
+        987654321,
+        "純字串元素",
+        [1.5, 2.5],
+        True,
+    ]
+
+    def parse(self, text: str, read_size: int) -> list:
+        stream = io.StringIO(text)
+        with mock.patch.object(file_to_df, "JSON_READ_SIZE", read_size):
+            head = stream.read(file_to_df.JSON_READ_SIZE).lstrip()
+            return list(FileDataFrameHandler()._iter_json_array_items(stream, head))
+
+    def test_items_split_at_every_buffer_boundary(self):
+        for text in [json.dumps(self.ITEMS, ensure_ascii=False), json.dumps(self.ITEMS, indent=2)]:
+            for read_size in range(1, 12):
+                with self.subTest(read_size=read_size, indent="\n" in text):
+                    self.assertEqual(self.parse(text, read_size), self.ITEMS)
+
+    def test_trailing_number_is_not_truncated(self):
+        # 最後一個數字剛好讀到緩衝區結尾時，要再讀入後才知道數字是否完整
+        for read_size in range(1, 8):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(self.parse("[1, 22, 3333333]", read_size), [1, 22, 3333333])
+
+    def test_empty_array(self):
+        self.assertEqual(self.parse("[]", 1), [])
+        self.assertEqual(self.parse("[ \n ]", 2), [])
+
+    def test_truncated_file_raises(self):
+        with self.assertRaises(json.JSONDecodeError):
+            self.parse('[{"id": 1}, {"id": ', 4)
+
+    def test_iter_dataframe_chunks_splits_rows(self):
+        rows = [{"id": index, "name": f"第 {index} 筆"} for index in range(5)]
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False)
+        self.addCleanup(os.remove, f.name)
+
+        with mock.patch.object(file_to_df, "COPY_CHUNK_ROWS", 2), mock.patch.object(file_to_df, "JSON_READ_SIZE", 7):
+            chunks = list(FileDataFrameHandler().iter_dataframe_chunks(f.name, "json"))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(pd.concat(chunks, ignore_index=True).to_dict("records"), rows)
+
+
+class ColumnTypeWideningTests(SimpleTestCase):
+    """串流寫入時後續 chunk 的型別與資料表欄位不符，放寬欄位型別而不是略過資料行。"""
+
+    def setUp(self):
+        self.handler = FileDataFrameHandler()
+
+    def test_widened_column_type(self):
+        widen = self.handler._widened_column_type
+        self.assertIsNone(widen("BIGINT", "BIGINT"))
+        self.assertIsNone(widen("TEXT", "BIGINT"))
+        self.assertIsNone(widen("DOUBLE PRECISION", "BIGINT"))
+        self.assertEqual(widen("BIGINT", "DOUBLE PRECISION"), "DOUBLE PRECISION")
+        self.assertEqual(widen("BIGINT", "TEXT"), "TEXT")
+        self.assertEqual(widen("DOUBLE PRECISION", "TEXT"), "TEXT")
+        self.assertEqual(widen("BOOLEAN", "BIGINT"), "TEXT")
+
+    def align(self, first: pd.DataFrame, later: pd.DataFrame):
+        column_types = self.handler._infer_column_types(first, widen_text=True)
+        cursor = RecordingCursor()
+        chunk = self.handler._align_column_types(cursor, later, "table", column_types, widen_text=True)
+        return chunk, column_types, cursor.statements
+
+    def test_integral_floats_stay_in_bigint_column(self):
+        # 整數欄位出現空值時 pandas 讀成小數，轉回可為空的整數寫入，不需要修改欄位型別
+        chunk, column_types, statements = self.align(
+            pd.DataFrame({"count": [1, 2]}),
+            pd.DataFrame({"count": [3.0, None]}),
+        )
+        self.assertEqual(column_types["count"], "BIGINT")
+        self.assertEqual(str(chunk["count"].dtype), "Int64")
+        self.assertEqual(statements, [])
+
+    def test_fractional_values_widen_bigint_to_double(self):
+        _, column_types, statements = self.align(
+            pd.DataFrame({"count": [1, 2]}),
+            pd.DataFrame({"count": [1.5, 2.0]}),
+        )
+        self.assertEqual(column_types["count"], "DOUBLE PRECISION")
+        self.assertEqual(len(statements), 1)
+        self.assertIn('ALTER COLUMN "count" TYPE DOUBLE PRECISION', statements[0])
+
+    def test_large_integral_floats_widen_to_double(self):
+        _, column_types, _ = self.align(
+            pd.DataFrame({"count": [1]}),
+            pd.DataFrame({"count": [float(file_to_df.FLOAT_EXACT_INTEGER_LIMIT * 4), None]}),
+        )
+        self.assertEqual(column_types["count"], "DOUBLE PRECISION")
+
+    def test_text_values_widen_numeric_column_to_text(self):
+        _, column_types, statements = self.align(
+            pd.DataFrame({"code": [1, 2]}),
+            pd.DataFrame({"code": ["A01", "B02"]}),
+        )
+        self.assertEqual(column_types["code"], "TEXT")
+        self.assertIn('ALTER COLUMN "code" TYPE TEXT', statements[0])
+
+    def test_all_null_chunk_keeps_column_type(self):
+        _, column_types, statements = self.align(
+            pd.DataFrame({"count": [1, 2]}),
+            pd.DataFrame({"count": [None, None]}),
+        )
+        self.assertEqual(column_types["count"], "BIGINT")
+        self.assertEqual(statements, [])
@@ -1,7 +1,7 @@
 import json
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
-from utils.search import hybrid_search_with_rerank
+from utils.search import SearchOptions, hybrid_search_with_rerank
 from typing import Type
 from sources.models import Source, SourceFile, SourceFileTable, SourceFileChunk
 
@@ -76,7 +76,8 @@ class SourceFileQueryTool(BaseTool):
                 queryset=source_files, 
                 vector_field_name="summary_embedding",
                 text_field_name="summary",
-                original_question=question
+                original_question=question,
+                options=SearchOptions(caller="chat_tool", materialize=True),
             )
 
         # 3. 按檔案格式分組
@@ -181,7 +182,8 @@ class SourceFileChunkQueryTool(BaseTool):
                 queryset=child_chunks_queryset,
                 vector_field_name="content_embedding",
                 text_field_name="content",
-                original_question=question
+                original_question=question,
+                options=SearchOptions(caller="chat_tool", materialize=True),
             )
             
             if not searched_child_chunks:
@@ -375,6 +375,8 @@ class SourceUploadView(LoginRequiredMixin, UserPlanContextMixin, TemplateView):
             'remaining_file_count': max(0, limit.file_limit_per_source - current_file_count) if not has_unlimited_files else 999,
             'has_unlimited_files': has_unlimited_files,
             'can_upload_files': can_upload_files,
+            'max_file_size_mb': settings.SOURCE_FILE_MAX_SIZE_MB,
+            'max_pdf_size_mb': settings.SOURCE_PDF_MAX_SIZE_MB,
         })
         
         return context
@@ -392,6 +394,12 @@ class SourceUploadView(LoginRequiredMixin, UserPlanContextMixin, TemplateView):
         
         return format_mapping.get(extension, None)  # 不支援的格式返回 None
     
+    def _get_max_file_size_mb(self, filename):
+        """根據檔案格式取得檔案大小上限（MB）"""
+        if self._get_file_format(filename) == SourceFileFormat.PDF:
+            return settings.SOURCE_PDF_MAX_SIZE_MB
+        return settings.SOURCE_FILE_MAX_SIZE_MB
+    
     def _save_file(self, uploaded_file, username, file_uuid, file_format):
         """儲存檔案到指定路徑"""
         # 從設定獲取指定目錄
@@ -439,17 +447,19 @@ class SourceUploadView(LoginRequiredMixin, UserPlanContextMixin, TemplateView):
             messages.error(request, '一次最多只能上傳 5 個檔案，請分批上傳。')
             return self.get(request, *args, **kwargs)
         
-        # 檢查檔案大小限制（每個檔案最大20MB）
-        max_file_size = 20 * 1024 * 1024  # 20MB in bytes
+        # 檢查檔案大小限制（PDF 逐頁串流處理，上限較結構化檔案高）
         oversized_files = []
         for uploaded_file in uploaded_files:
-            if uploaded_file.size > max_file_size:
-                oversized_files.append(f"{uploaded_file.name} ({uploaded_file.size / (1024*1024):.1f} MB)")
+            max_file_size_mb = self._get_max_file_size_mb(uploaded_file.name)
+            if uploaded_file.size > max_file_size_mb * 1024 * 1024:
+                oversized_files.append(
+                    f"{uploaded_file.name} ({uploaded_file.size / (1024*1024):.1f} MB，上限 {max_file_size_mb}MB)"
+                )
         
         if oversized_files:
             messages.error(
                 request, 
-                f'以下檔案超過 20MB 限制：{", ".join(oversized_files)}。請壓縮檔案後重新上傳。'
+                f'以下檔案超過大小限制：{", ".join(oversized_files)}。請壓縮檔案後重新上傳。'
             )
             return self.get(request, *args, **kwargs)
         
@@ -0,0 +1,115 @@
+import hashlib
+import math
+import random
+import time
+from langchain_core.documents import Document
+from utils.keywords import to_bigrams
+
+EMBEDDING_DIMENSIONS = 1536
+
+SYMPTOM_TERMS = {
+    "內科": ["發燒", "咳嗽", "喉嚨痛", "頭痛", "血壓偏高", "血糖", "疲倦", "胸悶", "心悸", "感冒"],
+    "外科": ["傷口", "縫合", "疝氣", "腫塊", "術後疼痛", "開刀", "燙傷", "擦傷", "化膿", "拆線"],
+    "牙科": ["牙痛", "蛀牙", "牙齦出血", "智齒", "根管治療", "假牙", "牙周病", "敏感性牙齒", "洗牙", "口臭"],
+    "骨科": ["膝蓋痛", "腰痛", "骨折", "扭傷", "五十肩", "關節炎", "坐骨神經痛", "脊椎側彎", "足底筋膜炎", "韌帶"],
+    "眼科": ["視力模糊", "眼睛乾澀", "飛蚊症", "結膜炎", "近視", "白內障", "眼壓", "針眼", "散光", "流眼淚"],
+    "肝膽腸胃科": ["胃痛", "脹氣", "腹瀉", "便秘", "胃食道逆流", "肝指數", "膽結石", "血便", "噁心", "消化不良"],
+    "耳鼻喉科": ["鼻塞", "流鼻水", "耳鳴", "中耳炎", "過敏性鼻炎", "扁桃腺", "聲音沙啞", "鼻竇炎", "打鼾", "暈眩"],
+    "皮膚科": ["濕疹", "青春痘", "皮膚癢", "蕁麻疹", "掉髮", "香港腳", "紅疹", "脫皮", "黑斑", "富貴手"],
+}
+
+DATASET_TERMS = [
+    "人口統計", "戶籍", "出生率", "醫療院所", "藥品", "疫苗接種", "健保", "長期照顧", "身心障礙", "社會福利",
+    "就業服務", "職業訓練", "勞工保險", "退休金", "學校名錄", "補助", "交通事故", "公車路線", "停車場", "空氣品質",
+    "水質監測", "垃圾清運", "房屋稅", "地價", "租屋", "國民年金", "兵役", "育兒津貼", "托育", "觀光景點",
+]
+
+SENTENCE_TEMPLATES = [
+    "最近{0}而且{1}，請問需要注意什麼？",
+    "{0}持續一週，伴隨{1}，該怎麼處理？",
+    "想請問{0}和{1}有關嗎？{2}也有一點",
+    "{0}、{1}與{2}的相關資料",
+    "提供{0}及{1}之統計資料，包含{2}",
+]
+
+
+class HashedBigramEmbedder:
+    """
+    以字元二元組雜湊到固定維度並正規化的本地 embedding stub，
+    同樣的文字一定得到同樣的向量，共用詞彙越多的文字餘弦相似度越高。
+    """
+    model = "stub-hashed-bigram"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def __call__(self, text: str) -> list[float]:
+        return self.embed_query(text)
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for bigram in to_bigrams(text):
+            digest = hashlib.blake2b(bigram.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if not norm:
+            vector[0] = 1.0
+            return vector
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class StubReranker:
+    """
+    取代 CohereRerank 的本地 stub，以字元二元組重疊比例作為 relevance_score；
+    latency_ms 可模擬遠端呼叫的延遲。
+    """
+    model = "stub-bigram-overlap"
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+
+    def compress_documents(self, documents: list[Document], query: str) -> list[Document]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        query_bigrams = set(to_bigrams(query))
+        for document in documents:
+            document_bigrams = set(to_bigrams(document.page_content))
+            overlap = len(query_bigrams & document_bigrams)
+            document.metadata["relevance_score"] = overlap / (len(query_bigrams) or 1)
+
+        return sorted(documents, key=lambda document: document.metadata["relevance_score"], reverse=True)
+
+
+def synthetic_symptom_question(rng: random.Random, department: str) -> str:
+    terms = rng.sample(SYMPTOM_TERMS[department], 3)
+    return rng.choice(SENTENCE_TEMPLATES[:3]).format(*terms)
+
+
+def synthetic_dataset_description(rng: random.Random) -> str:
+    terms = rng.sample(DATASET_TERMS, 3)
+    return rng.choice(SENTENCE_TEMPLATES[3:]).format(*terms)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """線性內插的百分位數，p 介於 0~100。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def recall_at_k(approximate_ids: list, exact_ids: list, k: int) -> float:
+    expected = set(exact_ids[:k])
+    if not expected:
+        return 1.0
+    return len(expected & set(approximate_ids[:k])) / len(expected)
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+from django.core.cache import caches
+from redis.exceptions import RedisError
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.redis_hits + self.misses
+        return (self.memory_hits + self.redis_hits) / total if total else 0.0
+
+
+class TwoTierCache:
+    """
+    兩層快取：行程內 LRU 在前，共用的 Redis（Django `search` cache）在後。
+    Redis 無法連線時只降級為行程內快取，不影響呼叫端；alias 為 None 時只使用行程內快取。
+    """
+
+    def __init__(self, namespace: str, max_entries: int, ttl: int, alias: Optional[str] = "search"):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.alias = alias
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get_from_memory(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        value = self._get_from_redis(key)
+        if value is not None:
+            self._set_to_memory(key, value)
+            self._count("redis_hits")
+            return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        self._set_to_memory(key, value)
+        if self.alias is None:
+            return
+        try:
+            caches[self.alias].set(self._redis_key(key), value, timeout=self.ttl)
+        except RedisError as e:
+            print(f"⚠️  寫入 Redis 快取失敗（{self.namespace}）：{e}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.alias is None:
+            return
+        try:
+            caches[self.alias].delete(self._redis_key(key))
+        except RedisError as e:
+            print(f"⚠️  刪除 Redis 快取失敗（{self.namespace}）：{e}")
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _get_from_memory(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+
+            self._memory.move_to_end(key)
+            return value
+
+    def _set_to_memory(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _get_from_redis(self, key: str) -> Optional[Any]:
+        if self.alias is None:
+            return None
+        try:
+            return caches[self.alias].get(self._redis_key(key))
+        except RedisError as e:
+            print(f"⚠️  讀取 Redis 快取失敗（{self.namespace}）：{e}")
+            return None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _count(self, field_name: str) -> None:
+        with self._lock:
+            setattr(self.stats, field_name, getattr(self.stats, field_name) + 1)
@@ -0,0 +1,73 @@
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+from django.core.cache import caches
+from redis.exceptions import RedisError
+
+# 版本號存放在不會淘汰鍵的主要 Redis，檢索快取的 Redis 滿了也不會讓版本號消失
+CORPUS_VERSION_CACHE_ALIAS = "corpus"
+
+_batch_state = threading.local()
+
+
+def corpus_version_key(label: str) -> str:
+    return f"corpus_version:{label}"
+
+
+def new_corpus_version() -> str:
+    # 版本號是隨機 token 而非遞增計數，鍵遺失後重新產生的值也不會與舊快照、舊快取相同
+    return uuid.uuid4().hex
+
+
+def get_corpus_version(label: str) -> Optional[str]:
+    """
+    取得資料集（以模型 label 區分，例如 crawlers.Symptom）目前的版本 token。
+    Redis 無法連線時回傳 None，呼叫端應視為「版本未知」，不可使用依賴版本的快照與快取。
+    """
+    cache = caches[CORPUS_VERSION_CACHE_ALIAS]
+    key = corpus_version_key(label)
+    try:
+        version = cache.get(key)
+        if version is None:
+            # 第一次讀取（或鍵遺失）時產生新的 token；多個行程同時初始化時以先寫入者為準
+            cache.add(key, new_corpus_version(), timeout=None)
+            version = cache.get(key)
+        return version
+    except RedisError as e:
+        print(f"⚠️  讀取資料集版本失敗（{label}）：{e}")
+        return None
+
+
+@contextmanager
+def coalesce_corpus_version_bumps():
+    """
+    批次寫入（例如一次爬取）期間，同一資料集只在第一次異動時與結束時各更新一次版本，
+    不必每寫一筆就更新 Redis；結束時再更新一次，讓批次期間建立的快取同樣失效。
+    """
+    previous = getattr(_batch_state, "labels", None)
+    labels = set()
+    _batch_state.labels = labels
+    try:
+        yield
+    finally:
+        _batch_state.labels = previous
+        for label in labels:
+            bump_corpus_version(label)
+
+
+def bump_corpus_version(label: str) -> Optional[str]:
+    """資料有新增、修改或刪除時換上新的版本 token，讓依賴舊資料的快照與快取失效。"""
+    labels = getattr(_batch_state, "labels", None)
+    if labels is not None:
+        if label in labels:
+            return None
+        labels.add(label)
+
+    version = new_corpus_version()
+    try:
+        caches[CORPUS_VERSION_CACHE_ALIAS].set(corpus_version_key(label), version, timeout=None)
+        return version
+    except RedisError as e:
+        print(f"⚠️  更新資料集版本失敗（{label}）：{e}")
+        return None
@@ -0,0 +1,222 @@
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from django.conf import settings
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from utils.cache import TwoTierCache
+from utils.keywords import normalize_text
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+
+query_embedding_cache = TwoTierCache(
+    namespace="query_embedding",
+    max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl=settings.QUERY_EMBEDDING_CACHE_TTL,
+)
+
+# 文件 embedding 儲存區的行程內前端，資料本體在 Postgres（home.EmbeddingRecord）
+document_embedding_cache = TwoTierCache(
+    namespace="document_embedding",
+    max_entries=settings.EMBEDDING_STORE_MEMORY_SIZE,
+    ttl=settings.EMBEDDING_STORE_MEMORY_TTL,
+    alias=None,
+)
+
+EMBEDDING_STORE_BATCH_SIZE = 1000
+
+_embedding_clients = {}
+_embedding_clients_lock = threading.Lock()
+_token_encoding = None
+
+
+@dataclass
+class EmbeddingUsage:
+    """單一檔案（或單一工作）的 embedding 用量統計"""
+    requests: int = 0
+    texts: int = 0
+    tokens: int = 0
+    reused: int = 0
+
+    def __str__(self) -> str:
+        return f"requests={self.requests}, texts={self.texts}, tokens={self.tokens}, reused={self.reused}"
+
+
+class CachedDocumentEmbeddings(Embeddings):
+    """
+    處理單一檔案期間使用的 embeddings：相同的文字只查詢一次（例如與父段落完全相同的子段落、每頁重複的頁首頁尾），
+    未命中的文字交給 embed_texts 從儲存區取得或分批送出，用量記錄在 usage。
+    """
+
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, usage: EmbeddingUsage = None):
+        self.model = model
+        self.usage = usage if usage is not None else EmbeddingUsage()
+        self._vectors = {}
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        missing = list(dict.fromkeys(text for text in texts if text not in self._vectors))
+        self.usage.reused += len(texts) - len(missing)
+
+        for text, vector in zip(missing, embed_texts(missing, self.model, self.usage)):
+            self._vectors[text] = vector
+        return [self._vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def clear(self):
+        # 串流處理時每個視窗結束後清空，跨視窗的重複文字仍可由 embed_texts 的儲存區命中
+        self._vectors.clear()
+
+
+def get_embedding_client(model: str = DEFAULT_EMBEDDING_MODEL) -> OpenAIEmbeddings:
+    with _embedding_clients_lock:
+        if model not in _embedding_clients:
+            _embedding_clients[model] = OpenAIEmbeddings(model=model)
+        return _embedding_clients[model]
+
+
+def query_embedding_key(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> str:
+    content = f"{model}\x00{normalize_text(text)}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def embed_query(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> list[float]:
+    """
+    取得查詢向量，依 (model, 正規化後文字) 做內容定址快取；正規化只用於快取鍵，送出 embedding 的是原始文字。
+    向量以 float32 位元組存放，命中與未命中回傳的數值完全一致。
+    """
+    key = query_embedding_key(text, model)
+    packed = query_embedding_cache.get(key)
+
+    if packed is None:
+        embedding = get_embedding_client(model).embed_query(text)
+        packed = array("f", embedding).tobytes()
+        query_embedding_cache.set(key, packed)
+
+    vector = array("f")
+    vector.frombytes(packed)
+    return vector.tolist()
+
+
+def document_embedding_key(text: str, model: str = DEFAULT_EMBEDDING_MODEL) -> str:
+    return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def embed_texts(
+    texts: list[str],
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    usage: EmbeddingUsage = None,
+) -> list[list[float]]:
+    """
+    所有寫入資料的流程（PDF、結構化檔案、爬蟲）共用的 embedding 入口。
+    依 (model, sha256(文字)) 先查行程內快取，再查 Postgres 的 EmbeddingRecord，
+    都沒有的文字才分批送出，並寫回儲存區；文字本身不做正規化，內容完全相同才會命中。
+    """
+    from home.models import EmbeddingRecord
+
+    if not texts:
+        return []
+
+    keys = [document_embedding_key(text, model) for text in texts]
+    packed_by_key = {}
+    for key in dict.fromkeys(keys):
+        packed = document_embedding_cache.get(key)
+        if packed is not None:
+            packed_by_key[key] = packed
+
+    missing_hashes = {key.rsplit(":", 1)[1]: key for key in dict.fromkeys(keys) if key not in packed_by_key}
+    hashes = list(missing_hashes)
+    for start in range(0, len(hashes), EMBEDDING_STORE_BATCH_SIZE):
+        records = EmbeddingRecord.objects.filter(
+            model=model,
+            text_hash__in=hashes[start:start + EMBEDDING_STORE_BATCH_SIZE],
+        ).values_list("text_hash", "embedding")
+        for text_hash, embedding in records:
+            key = missing_hashes[text_hash]
+            packed_by_key[key] = array("f", embedding).tobytes()
+            document_embedding_cache.set(key, packed_by_key[key])
+
+    missing_texts = list({key: text for key, text in zip(keys, texts) if key not in packed_by_key}.items())
+    if missing_texts:
+        vectors = embed_documents_batched([text for _, text in missing_texts], model, usage)
+        new_records = []
+        for (key, _), vector in zip(missing_texts, vectors):
+            packed_by_key[key] = array("f", vector).tobytes()
+            document_embedding_cache.set(key, packed_by_key[key])
+            new_records.append(EmbeddingRecord(model=model, text_hash=key.rsplit(":", 1)[1], embedding=vector))
+        EmbeddingRecord.objects.bulk_create(new_records, batch_size=EMBEDDING_STORE_BATCH_SIZE, ignore_conflicts=True)
+
+    if usage is not None:
+        usage.reused += len(texts) - len(missing_texts)
+
+    result = []
+    for key in keys:
+        vector = array("f")
+        vector.frombytes(packed_by_key[key])
+        result.append(vector.tolist())
+    return result
+
+
+def count_tokens(text: str) -> int:
+    """text-embedding-3 系列使用 cl100k_base；編碼檔無法載入時以字元數估算（中文約一字一 token）。"""
+    global _token_encoding
+    if _token_encoding is None:
+        try:
+            import tiktoken
+            _token_encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"⚠️  無法載入 tiktoken 編碼，改以字元數估算 token：{e}")
+            _token_encoding = False
+
+    if _token_encoding is False:
+        return len(text)
+    return len(_token_encoding.encode(text, disallowed_special=()))
+
+
+def embed_documents_batched(
+    texts: list[str],
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    usage: EmbeddingUsage = None,
+) -> list[list[float]]:
+    """
+    將大量文字切成筆數（EMBEDDING_BATCH_SIZE）與 token 數（EMBEDDING_BATCH_MAX_TOKENS）都有上限的批次，
+    以小型執行緒池（EMBEDDING_MAX_WORKERS）並行送出，回傳順序與輸入相同。
+    """
+    if not texts:
+        return []
+
+    batches = _token_bounded_batches(texts)
+    client = get_embedding_client(model)
+
+    with ThreadPoolExecutor(max_workers=settings.EMBEDDING_MAX_WORKERS, thread_name_prefix="embedding") as executor:
+        batch_results = list(executor.map(lambda batch: client.embed_documents(batch[1]), batches))
+
+    if usage is not None:
+        usage.requests += len(batches)
+        usage.texts += len(texts)
+        usage.tokens += sum(tokens for tokens, _ in batches)
+
+    return [vector for vectors in batch_results for vector in vectors]
+
+
+def _token_bounded_batches(texts: list[str]) -> list[tuple[int, list[str]]]:
+    batches = []
+    batch, batch_tokens = [], 0
+
+    for text in texts:
+        tokens = count_tokens(text)
+        if batch and (
+            len(batch) >= settings.EMBEDDING_BATCH_SIZE
+            or batch_tokens + tokens > settings.EMBEDDING_BATCH_MAX_TOKENS
+        ):
+            batches.append((batch_tokens, batch))
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+
+    if batch:
+        batches.append((batch_tokens, batch))
+    return batches
@@ -1,5 +1,9 @@
 import io
+import re
 import hashlib
+import threading
+from queue import Empty, Full, Queue
+from typing import Callable, Iterator, Optional
 import pandas as pd
 import json
 import psycopg2
@@ -8,6 +12,21 @@ import xml.etree.ElementTree as ET
 import string
 from django.conf import settings
 
+# COPY 每段的資料行數，每段一個 savepoint，失敗時只需重做該段
+COPY_CHUNK_ROWS = 50000
+# CSV 中代表 NULL 的字串
+COPY_NULL_MARKER = '\\N'
+# 單一欄位值的最大長度，超過時截斷
+COPY_MAX_VALUE_LENGTH = 10000
+# 串流讀取 JSON 時每次從檔案讀入的字元數
+JSON_READ_SIZE = 1024 * 1024
+# 小數可精確表示的最大整數，超過時整數欄位改為放寬成 DOUBLE PRECISION
+FLOAT_EXACT_INTEGER_LIMIT = 2 ** 53
+# 背景解析最多預先準備的 chunk 數，限制解析速度快於寫入時的記憶體用量
+PREFETCH_CHUNKS = 2
+
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
 
 class FileDataFrameHandler:
     
@@ -47,7 +66,44 @@ class FileDataFrameHandler:
                 
         except Exception as e:
             return False, f"儲存失敗: {str(e)}"
-    
+
+    def iter_dataframe_chunks(self, path: str, file_format: str, encoding: str = 'utf-8') -> Iterator[pd.DataFrame]:
+        """
+        直接從檔案串流解析，每次產生最多 COPY_CHUNK_ROWS 筆的 DataFrame，不需把整個檔案讀進記憶體：
+        CSV 使用 read_csv(chunksize=...)，JSON 逐筆解析最外層陣列，XML 使用 iterparse 並隨時清除已處理的節點。
+        """
+        file_format = file_format.lower()
+        if file_format not in self.supported_formats:
+            raise ValueError(f"不支援的檔案格式: {file_format}")
+
+        if file_format == 'csv':
+            return self._iter_csv_chunks(path, encoding)
+        elif file_format == 'json':
+            return self._iter_json_chunks(path, encoding)
+        return self._iter_xml_chunks(path)
+
+    def save_chunks_to_database(
+        self,
+        chunks: Iterator[pd.DataFrame],
+        table_name: str,
+        database_name: str,
+        on_chunk_saved: Optional[Callable[[int], None]] = None,
+    ) -> tuple[bool, str, int]:
+        """
+        邊解析邊寫入：下一個 chunk 在背景執行緒解析，同時以 COPY 寫入目前的 chunk。
+        回傳 (是否成功, 訊息, 寫入的資料行數)；on_chunk_saved 於每個 chunk 寫入後以該段行數呼叫。
+        """
+        try:
+            row_count = self._create_table_from_chunks(
+                self._prefetch_chunks(chunks), table_name, database_name, on_chunk_saved
+            )
+        except Exception as e:
+            return False, f"儲存失敗: {str(e)}", 0
+
+        if row_count == 0:
+            return False, "DataFrame 為空", 0
+        return True, f"成功儲存到資料表 {table_name}", row_count
+
     def get_dataframe_md5(self, df: pd.DataFrame) -> str:
         df_copy = df.copy().astype(str)
         df_copy = df_copy[sorted(df_copy.columns)]
@@ -97,9 +153,145 @@ class FileDataFrameHandler:
             row = {child.tag: child.text for child in root}
             if row:
                 return pd.DataFrame([row])
-        
-        return None        
-    
+
+        return None
+
+    def _iter_csv_chunks(self, path: str, encoding: str) -> Iterator[pd.DataFrame]:
+        with open(path, encoding=encoding, errors='ignore', newline='') as f:
+            yield from pd.read_csv(f, chunksize=COPY_CHUNK_ROWS)
+
+    def _iter_json_chunks(self, path: str, encoding: str) -> Iterator[pd.DataFrame]:
+        with open(path, encoding=encoding, errors='ignore') as f:
+            head = f.read(JSON_READ_SIZE).lstrip()
+
+            # 最外層不是陣列時（例如 {"data": [...]}），沿用整份讀取的解析方式
+            if not head.startswith('['):
+                df = self._read_json_to_dataframe(head + f.read())
+                if df is not None:
+                    yield df
+                return
+
+            rows = []
+            for item in self._iter_json_array_items(f, head):
+                rows.append(item)
+                if len(rows) >= COPY_CHUNK_ROWS:
+                    yield pd.DataFrame(rows)
+                    rows = []
+            if rows:
+                yield pd.DataFrame(rows)
+
+    def _iter_json_array_items(self, f, buffer: str) -> Iterator:
+        # buffer 以 "[" 開頭；以 raw_decode 逐一解析陣列元素，緩衝區不足時再從檔案讀入
+        decoder = json.JSONDecoder()
+        position = 1
+        eof = False
+
+        while True:
+            position = _JSON_SEPARATORS.match(buffer, position).end()
+            if position < len(buffer) and buffer[position] == ']':
+                return
+
+            try:
+                if position >= len(buffer):
+                    raise json.JSONDecodeError("緩衝區已讀完", buffer, position)
+                item, end = decoder.raw_decode(buffer, position)
+                # 數字剛好在緩衝區結尾時可能被截斷，讀入更多內容後重新解析
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+
+            if complete:
+                yield item
+                position = end
+                continue
+
+            more = f.read(JSON_READ_SIZE)
+            eof = not more
+            buffer = buffer[position:] + more
+            position = 0
+
+    def _iter_xml_chunks(self, path: str) -> Iterator[pd.DataFrame]:
+        # 與 _read_xml_to_dataframe 相同：根節點下有子元素的節點各為一筆資料，都沒有時以根節點的欄位作為唯一一筆
+        rows = []
+        root_row = {}
+        has_records = False
+        root = None
+        depth = 0
+
+        for event, elem in ET.iterparse(path, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            row = {subchild.tag: subchild.text for subchild in elem}
+            if row:
+                rows.append(row)
+                has_records = True
+            elif not has_records:
+                root_row[elem.tag] = elem.text
+            # 已處理的節點從根節點移除，記憶體只保留目前這一段
+            root.clear()
+
+            if len(rows) >= COPY_CHUNK_ROWS:
+                yield pd.DataFrame(rows)
+                rows = []
+
+        if rows:
+            yield pd.DataFrame(rows)
+        elif not has_records and root_row:
+            yield pd.DataFrame([root_row])
+
+    def _prefetch_chunks(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """在背景執行緒解析 chunk，最多預先準備 PREFETCH_CHUNKS 個；解析錯誤會在取用端重新拋出。"""
+        queue = Queue(maxsize=PREFETCH_CHUNKS)
+        done = object()
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            # 取用端提前結束（例如寫入失敗）時不再等待佇列空位
+            while not stopped.is_set():
+                try:
+                    queue.put(item, timeout=0.5)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    if not put(chunk):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+
+        thread = threading.Thread(target=produce, name="dataframe-prefetch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                try:
+                    item = queue.get(timeout=0.5)
+                except Empty:
+                    if not thread.is_alive() and queue.empty():
+                        return
+                    continue
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+
     def _generate_excel_column_names(self, num_columns: int) -> list:
         column_names = []
         
@@ -120,20 +312,83 @@ class FileDataFrameHandler:
     
     def _create_table_from_dataframe(self, df: pd.DataFrame, table_name: str, database_name: str) -> bool:
         try:
-            db_config = settings.DATABASES['default']
-            
-            # 首先連接到默認資料庫 (通常是 postgres) 來創建目標資料庫
-            default_conn = psycopg2.connect(
-                host=db_config['HOST'],
-                port=db_config['PORT'],
-                database='postgres',  # 連接到默認的 postgres 資料庫
-                user=db_config['USER'],
-                password=db_config['PASSWORD']
-            )
-            
+            self._create_table_from_chunks(iter([df]), table_name, database_name, widen_text=False)
+            return True
+        except Exception as e:
+            return False
+
+    def _create_table_from_chunks(
+        self,
+        chunks: Iterator[pd.DataFrame],
+        table_name: str,
+        database_name: str,
+        on_chunk_saved: Optional[Callable[[int], None]] = None,
+        widen_text: bool = True,
+    ) -> int:
+        """
+        以第一個 chunk 建立資料表，之後的 chunk 依序寫入同一個交易，回傳寫入的資料行數。
+        串流寫入時只看得到第一段資料，文字欄位（widen_text）一律建為 TEXT，
+        後續 chunk 出現的新欄位以 TEXT 補上；後續 chunk 的型別與既有欄位不符時（例如整數欄位出現空值變成小數、
+        數字欄位出現文字），先放寬欄位型別再寫入，不會因型別不符而略過資料行。
+        """
+        first_chunk = next(chunks, None)
+        if first_chunk is None or first_chunk.empty:
+            return 0
+
+        self._ensure_database_exists(database_name)
+        conn = self._connect(database_name)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                conn.commit()
+
+                # 創建新的資料表
+                column_types = self._infer_column_types(first_chunk, widen_text)
+                cursor.execute(self._generate_create_table_sql(column_types, table_name))
+                conn.commit()
+
+                columns = list(first_chunk.columns)
+                row_count = 0
+                chunk = first_chunk
+                while chunk is not None:
+                    new_columns = [col for col in chunk.columns if col not in columns]
+                    for col in new_columns:
+                        cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" TEXT')
+                        column_types[col] = 'TEXT'
+                    columns.extend(new_columns)
+                    if chunk is not first_chunk:
+                        chunk = self._align_column_types(cursor, chunk, table_name, column_types, widen_text)
+
+                    if list(chunk.columns) != columns:
+                        chunk = chunk.reindex(columns=columns)
+                    self._insert_dataframe_to_table(cursor, chunk, table_name, row_count)
+                    row_count += len(chunk)
+                    if on_chunk_saved:
+                        on_chunk_saved(len(chunk))
+                    chunk = next(chunks, None)
+
+                conn.commit()
+            return row_count
+        finally:
+            conn.close()
+
+    def _connect(self, database_name: str):
+        db_config = settings.DATABASES['default']
+        return psycopg2.connect(
+            host=db_config['HOST'],
+            port=db_config['PORT'],
+            database=database_name,
+            user=db_config['USER'],
+            password=db_config['PASSWORD']
+        )
+
+    def _ensure_database_exists(self, database_name: str):
+        # 首先連接到默認資料庫 (通常是 postgres) 來創建目標資料庫
+        default_conn = self._connect('postgres')
+        try:
             # 設置自動提交模式以執行 CREATE DATABASE 命令
             default_conn.autocommit = True
-            
+
             with default_conn.cursor() as cursor:
                 # 先檢查資料庫是否已經存在
                 cursor.execute(
@@ -141,61 +396,80 @@ class FileDataFrameHandler:
                     (database_name,)
                 )
                 exists = cursor.fetchone()
-                
+
                 if not exists:
-                    # 資料庫不存在，創建它
-                    try:
-                        # 注意：CREATE DATABASE 不能使用參數化查詢，需要格式化字符串
-                        # 但我們先驗證 database_name 只包含安全字符
-                        if not database_name.replace('_', '').replace('-', '').isalnum():
-                            raise ValueError(f"資料庫名稱包含不安全字符: {database_name}")
-                        
-                        cursor.execute(f'CREATE DATABASE "{database_name}"')
-                    except Exception as e:
-                        raise
-            
-            default_conn.close()
-            
-            # 現在連接到目標資料庫來創建資料表
-            conn = psycopg2.connect(
-                host=db_config['HOST'],
-                port=db_config['PORT'],
-                database=database_name,
-                user=db_config['USER'],
-                password=db_config['PASSWORD']
-            )
-            
-            create_sql = self._generate_create_table_sql(df, table_name)
-            
-            with conn.cursor() as cursor:
-                cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
-                conn.commit()
-                
-                # 創建新的資料表
-                cursor.execute(create_sql)
-                conn.commit()
-                
-                self._insert_dataframe_to_table(cursor, df, table_name)
-                conn.commit()
-                
-            return True
-        except Exception as e:
-            return False
+                    # 注意：CREATE DATABASE 不能使用參數化查詢，需要格式化字符串
+                    # 但我們先驗證 database_name 只包含安全字符
+                    if not database_name.replace('_', '').replace('-', '').isalnum():
+                        raise ValueError(f"資料庫名稱包含不安全字符: {database_name}")
+
+                    cursor.execute(f'CREATE DATABASE "{database_name}"')
         finally:
-            if 'default_conn' in locals():
-                default_conn.close()
-            if 'conn' in locals():
-                conn.close()
-    
-    def _generate_create_table_sql(self, df: pd.DataFrame, table_name: str) -> str:
-        columns = []
+            default_conn.close()
+
+    def _infer_column_types(self, df: pd.DataFrame, widen_text: bool = False) -> dict[str, str]:
+        column_types = {}
         for col in df.columns:
             col_type = self._infer_column_type(df[col])
-            columns.append(f'"{col}" {col_type}')
-        
-        columns_sql = ', '.join(columns)
+            if widen_text and col_type.startswith('VARCHAR'):
+                col_type = 'TEXT'
+            column_types[col] = col_type
+        return column_types
+
+    def _generate_create_table_sql(self, column_types: dict[str, str], table_name: str) -> str:
+        columns_sql = ', '.join(f'"{col}" {col_type}' for col, col_type in column_types.items())
         return f'CREATE TABLE "{table_name}" ({columns_sql})'
-    
+
+    def _align_column_types(
+        self,
+        cursor,
+        chunk: pd.DataFrame,
+        table_name: str,
+        column_types: dict[str, str],
+        widen_text: bool = True,
+    ) -> pd.DataFrame:
+        """
+        讓後續 chunk 符合資料表的欄位型別：整數欄位因空值被讀成小數時轉回整數寫入，
+        其他無法容納的情況將欄位放寬為可同時容納兩者的型別。回傳調整後的 chunk。
+        """
+        for col, required_type in self._infer_column_types(chunk, widen_text).items():
+            values = chunk[col].dropna()
+            # 整段都是空值的欄位沒有型別資訊，維持原型別
+            if values.empty:
+                continue
+
+            if (
+                column_types[col] == 'BIGINT'
+                and required_type == 'DOUBLE PRECISION'
+                and (values == values.round()).all()
+                and values.abs().max() <= FLOAT_EXACT_INTEGER_LIMIT
+            ):
+                chunk[col] = chunk[col].astype('Int64')
+                continue
+
+            widened_type = self._widened_column_type(column_types[col], required_type)
+            if widened_type is None:
+                continue
+
+            print(f"資料表 {table_name} 欄位 {col}：{column_types[col]} 放寬為 {widened_type}")
+            cursor.execute(
+                f'ALTER TABLE "{table_name}" ALTER COLUMN "{col}" TYPE {widened_type} '
+                f'USING "{col}"::{widened_type}'
+            )
+            column_types[col] = widened_type
+
+        return chunk
+
+    def _widened_column_type(self, current_type: str, required_type: str) -> Optional[str]:
+        """回傳同時容納既有型別與新資料所需的型別；既有型別已足夠時回傳 None。"""
+        if current_type == required_type or current_type == 'TEXT':
+            return None
+        if current_type == 'DOUBLE PRECISION' and required_type == 'BIGINT':
+            return None
+        if current_type == 'BIGINT' and required_type == 'DOUBLE PRECISION':
+            return 'DOUBLE PRECISION'
+        return 'TEXT'
+
     def _infer_column_type(self, series: pd.Series) -> str:
         non_null_series = series.dropna()
         
@@ -226,56 +500,85 @@ class FileDataFrameHandler:
         
         return 'TEXT'
     
-    def _insert_dataframe_to_table(self, cursor, df: pd.DataFrame, table_name: str):
+    def _insert_dataframe_to_table(self, cursor, df: pd.DataFrame, table_name: str, row_offset: int = 0):
+        """
+        以 COPY ... FROM STDIN（CSV 格式）分段串流寫入，每段 COPY_CHUNK_ROWS 筆並各自包在 savepoint 中；
+        某一段 COPY 失敗時只回滾該段，改以逐行 INSERT 寫入並略過有問題的資料行。
+        """
         if df.empty:
             return
         
-        columns = [f'"{col}"' for col in df.columns]
-        placeholders = ['%s'] * len(df.columns)
-        expected_col_count = len(df.columns)
+        columns_sql = ', '.join(f'"{col}"' for col in df.columns)
+        copy_sql = f"""COPY "{table_name}" ({columns_sql}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL_MARKER}')"""
+        
+        copied_count = 0
+        fallback_count = 0
+        skipped_count = 0
+        
+        for start in range(0, len(df), COPY_CHUNK_ROWS):
+            chunk = self._truncate_long_values(df.iloc[start:start + COPY_CHUNK_ROWS])
+            
+            buffer = io.StringIO()
+            chunk.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL_MARKER)
+            buffer.seek(0)
+            
+            cursor.execute('SAVEPOINT copy_chunk')
+            try:
+                cursor.copy_expert(copy_sql, buffer)
+                cursor.execute('RELEASE SAVEPOINT copy_chunk')
+                copied_count += len(chunk)
+            except Exception as e:
+                cursor.execute('ROLLBACK TO SAVEPOINT copy_chunk')
+                first_row = row_offset + start
+                print(f"第 {first_row + 1}~{first_row + len(chunk)} 行 COPY 失敗，改為逐行插入: {str(e)}")
+                inserted, skipped = self._insert_rows_individually(cursor, chunk, table_name, first_row)
+                fallback_count += inserted
+                skipped_count += skipped
+        
+        print(f"資料表 {table_name}：COPY 寫入 {copied_count} 行，逐行插入 {fallback_count} 行，略過 {skipped_count} 行")
+    
+    def _truncate_long_values(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        # 與逐行插入相同，超過 COPY_MAX_VALUE_LENGTH 的文字截斷並以 "..." 結尾
+        truncated = None
+        for col in chunk.columns:
+            if chunk[col].dtype != 'object':
+                continue
+            
+            values = chunk[col]
+            too_long = values.notna() & (values.astype(str).str.len() > COPY_MAX_VALUE_LENGTH)
+            if too_long.any():
+                if truncated is None:
+                    truncated = chunk.copy()
+                truncated[col] = values.where(
+                    ~too_long,
+                    values.astype(str).str.slice(0, COPY_MAX_VALUE_LENGTH - 3) + "...",
+                )
+        
+        return chunk if truncated is None else truncated
+    
+    def _insert_rows_individually(self, cursor, chunk: pd.DataFrame, table_name: str, offset: int) -> tuple[int, int]:
+        columns = [f'"{col}"' for col in chunk.columns]
+        placeholders = ['%s'] * len(chunk.columns)
         
         insert_sql = f"""
             INSERT INTO "{table_name}" ({', '.join(columns)}) 
             VALUES ({', '.join(placeholders)})
         """
         
-        values = []
-        for idx, row in df.iterrows():
-            row_values = []
+        inserted_count = 0
+        skipped_count = 0
+        for i, row in enumerate(chunk.itertuples(index=False, name=None)):
+            row_values = tuple(None if pd.isna(val) else str(val) for val in row)
             
-            for col in df.columns:
-                val = row.get(col)
-                if pd.isna(val):
-                    row_values.append(None)
-                else:
-                    str_val = str(val)
-                    if len(str_val) > 10000:
-                        str_val = str_val[:9997] + "..."
-                    row_values.append(str_val)
-            
-            if len(row_values) != expected_col_count:
-                print(f"第 {idx+1} 行欄位數量不符 (期望: {expected_col_count}, 實際: {len(row_values)})，跳過")
-                continue
-                
-            values.append(tuple(row_values))
-        
-        if not values:
-            print("沒有有效的資料行可插入")
-            return
+            # 每行各自一個 savepoint，失敗的資料行不會中斷整個交易
+            cursor.execute('SAVEPOINT insert_row')
+            try:
+                cursor.execute(insert_sql, row_values)
+                cursor.execute('RELEASE SAVEPOINT insert_row')
+                inserted_count += 1
+            except Exception as row_error:
+                cursor.execute('ROLLBACK TO SAVEPOINT insert_row')
+                print(f"第 {offset + i + 1} 行插入失敗，跳過: {str(row_error)}")
+                skipped_count += 1
         
-        try:
-            cursor.executemany(insert_sql, values)
-        except Exception as e:
-            print(f"批量插入失敗，嘗試逐行插入: {str(e)}")
-            success_count = 0
-            for i, value_tuple in enumerate(values):
-                try:
-                    if len(value_tuple) != expected_col_count:
-                        print(f"第 {i+1} 行 tuple 長度不符 (期望: {expected_col_count}, 實際: {len(value_tuple)})，跳過")
-                        continue
-                        
-                    cursor.execute(insert_sql, value_tuple)
-                    success_count += 1
-                except Exception as row_error:
-                    print(f"第 {i+1} 行插入失敗，跳過: {str(row_error)}")
-                    continue 
\ No newline at end of file
+        return inserted_count, skipped_count
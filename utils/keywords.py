@@ -0,0 +1,147 @@
+import re
+import unicodedata
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
+from django.db.models import Func, Model
+
+MAX_KEYWORDS = 8
+MAX_KEYWORD_LENGTH = 4
+MIN_KEYWORD_LENGTH = 2
+
+# 依長度由長到短比對，避免「怎麼辦」先被「怎麼」切開
+CJK_STOP_PHRASES = sorted([
+    "請問", "想問", "想請問", "請教", "醫生", "醫師", "你好", "您好", "謝謝",
+    "怎麼辦", "怎麼", "怎樣", "如何", "為什麼", "什麼", "哪些", "哪裡", "哪個",
+    "是否", "有沒有", "可不可以", "可以", "能不能", "需不需要", "需要", "應該", "該",
+    "最近", "常常", "經常", "一直", "有點", "有些", "覺得", "感覺", "好像", "一下",
+    "處理", "相關", "有關", "關於", "資料", "一些", "這個", "那個", "這樣", "那樣",
+    "我們", "你們", "他們", "我的", "自己", "還是", "或是", "或者", "而且", "但是",
+    "因為", "所以", "如果", "然後", "已經", "會不會", "是不是", "嗎", "呢", "吧",
+    "啊", "呀", "喔", "的", "了", "和", "與", "及", "或", "在", "是", "有", "我",
+    "你", "他", "她", "也", "都", "就", "很", "會", "要", "想", "請", "把", "被",
+], key=len, reverse=True)
+
+LATIN_STOP_WORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are",
+    "what", "how", "why", "which", "with", "about", "can", "do", "does", "i",
+}
+
+CJK_RUN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+LATIN_WORD_PATTERN = re.compile(r"[0-9a-z][0-9a-z\-\.]*[0-9a-z]|[0-9a-z]")
+STOP_PHRASE_PATTERN = re.compile("|".join(map(re.escape, CJK_STOP_PHRASES)))
+BIGRAM_STRIP_PATTERN = re.compile(r"[\s\W_]+")
+
+# 回填關鍵字欄位時每批更新的筆數
+KEYWORD_TEXT_BATCH_SIZE = 2000
+
+
+class BigramDocument(Func):
+    """
+    對應 migrations 建立的 `cjk_bigram_tsvector(text)`，傳入的是 keyword_text() 正規化後存放的欄位，
+    SQL 端只負責切成字元二元組並轉為 tsvector，正規化規則只有 Python 一份，查詢與索引的詞項必定一致。
+    """
+    function = "cjk_bigram_tsvector"
+    output_field = SearchVectorField()
+
+
+class BigramQuery(SearchQuery):
+    """直接轉型為 tsquery，不經過全文檢索 parser，詞項與 cjk_bigram_tsvector 產生的二元組逐字相同。"""
+    template = "%(expressions)s::tsquery"
+
+    def __init__(self, value: str):
+        super().__init__(value, search_type="raw")
+
+
+def normalize_text(text: str) -> str:
+    normalized = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", normalized).strip().casefold()
+
+
+def keyword_text(text: str) -> str:
+    """關鍵字索引使用的正規化文字：NFKC、casefold，並去除空白、標點與底線。"""
+    return BIGRAM_STRIP_PATTERN.sub("", normalize_text(text))
+
+
+def keyword_field_name(text_field_name: str) -> str:
+    return f"{text_field_name}_normalized"
+
+
+def set_keyword_text(instance: Model, text_field_name: str):
+    setattr(instance, keyword_field_name(text_field_name), keyword_text(getattr(instance, text_field_name)))
+
+
+def fill_keyword_text(model: type[Model], text_field_name: str) -> int:
+    """回填關鍵字欄位為空的資料（migrations 或以 SQL 直接寫入的資料），回傳更新筆數。"""
+    field_name = keyword_field_name(text_field_name)
+    pending = model.objects.filter(**{f"{field_name}__isnull": True}).order_by("pk")
+
+    updated = 0
+    while True:
+        rows = list(pending.only("pk", text_field_name)[:KEYWORD_TEXT_BATCH_SIZE])
+        if not rows:
+            return updated
+        for row in rows:
+            set_keyword_text(row, text_field_name)
+        model.objects.bulk_update(rows, [field_name])
+        updated += len(rows)
+
+
+def extract_keywords(question: str) -> list[str]:
+    """
+    以本地規則切出關鍵字：中文依停用詞切段後再切成最多 4 字的片段，
+    英數字則以單字為單位。回傳順序依出現位置，並去除重複。
+    """
+    normalized = normalize_text(question)
+    keywords = _extract_cjk_keywords(normalized) + _extract_latin_keywords(normalized)
+
+    unique_keywords = list(dict.fromkeys(keywords))
+    return unique_keywords[:MAX_KEYWORDS]
+
+
+def build_keyword_query(keywords: list[str]) -> SearchQuery | None:
+    """將關鍵字轉成 OR 串接的 tsquery，每個關鍵字內部以 AND 串接其字元二元組。"""
+    clauses = []
+    for keyword in keywords:
+        bigrams = to_bigrams(keyword)
+        if bigrams:
+            clauses.append("(" + " & ".join(f"'{bigram}'" for bigram in bigrams) + ")")
+
+    if not clauses:
+        return None
+
+    return BigramQuery(" | ".join(clauses))
+
+
+def to_bigrams(text: str) -> list[str]:
+    cleaned = keyword_text(text)
+    if len(cleaned) < MIN_KEYWORD_LENGTH:
+        return []
+    return list(dict.fromkeys(cleaned[i:i + 2] for i in range(len(cleaned) - 1)))
+
+
+def _extract_cjk_keywords(normalized: str) -> list[str]:
+    keywords = []
+    for run in CJK_RUN_PATTERN.findall(normalized):
+        for segment in STOP_PHRASE_PATTERN.split(run):
+            keywords.extend(_split_segment(segment))
+    return keywords
+
+
+def _split_segment(segment: str) -> list[str]:
+    if len(segment) < MIN_KEYWORD_LENGTH:
+        return []
+
+    pieces = [
+        segment[i:i + MAX_KEYWORD_LENGTH]
+        for i in range(0, len(segment), MAX_KEYWORD_LENGTH)
+    ]
+    if len(pieces) > 1 and len(pieces[-1]) < MIN_KEYWORD_LENGTH:
+        pieces[-2] = pieces[-2][:-1]
+        pieces[-1] = segment[-2:]
+    return pieces
+
+
+def _extract_latin_keywords(normalized: str) -> list[str]:
+    return [
+        word for word in LATIN_WORD_PATTERN.findall(normalized)
+        if len(word) >= MIN_KEYWORD_LENGTH and word not in LATIN_STOP_WORDS
+    ]
@@ -1,83 +1,679 @@
-from django.db.models import Q, Case, When, QuerySet
+import hashlib
+import json
+import math
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
+from time import perf_counter
+from typing import Any, Callable, Optional
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, When, Q, QuerySet, Value, prefetch_related_objects
+from django.db.models.functions import Cast
 from langchain_core.documents import Document
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_cohere.rerank import CohereRerank
-from pgvector.django import CosineDistance
+import numpy as np
+from pgvector import Vector
+from pgvector.django import CosineDistance, HammingDistance, HnswIndex, VectorField
+from utils.cache import TwoTierCache
+from utils.embeddings import DEFAULT_EMBEDDING_MODEL, embed_query
+from utils.keywords import (
+    BigramDocument,
+    build_keyword_query,
+    extract_keywords,
+    keyword_field_name,
+    normalize_text,
+    to_bigrams,
+)
+from utils.search_metrics import record_search_timings
+from utils.vector_snapshots import SNAPSHOT_CORPORA, VectorSnapshot, get_vector_snapshot
+from utils.vectors import (
+    BinaryQuantize,
+    VectorPrecision,
+    binary_expression,
+    halfvec_expression,
+    pgvector_version,
+    short_field_name,
+    shorten_embedding,
+)
+
+RERANK_MODEL = "rerank-multilingual-v3.0"
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_search_executor = ThreadPoolExecutor(
+    max_workers=settings.SEARCH_MAX_WORKERS,
+    thread_name_prefix="hybrid-search",
+)
+
+rerank_cache = TwoTierCache(
+    namespace="rerank_scores",
+    max_entries=settings.RERANK_CACHE_SIZE,
+    ttl=settings.RERANK_CACHE_TTL,
+)
+
+
+_iterative_scan_support = {}
+_iterative_scan_support_lock = threading.Lock()
+
+
+class VectorScanPlan(StrEnum):
+    ANN = "ann"  # 走 HNSW 近似搜尋
+    EXACT = "exact"  # 過濾後筆數很少，直接對過濾結果做精確距離排序
+
+
+class RerankPolicy(StrEnum):
+    REMOTE = "remote"  # 一律呼叫 Cohere，失敗時退回本地排序
+    ADAPTIVE = "adaptive"  # 候選數不足或本地分數差距明顯時略過 Cohere
+    LOCAL = "local"  # 只使用本地 RRF + BM25 排序
+
+
+@dataclass
+class SearchOptions:
+    """
+    hybrid search 的查詢參數。
+    ef_search 越大召回越高、延遲也越高；caller 用來對應 SEARCH_RERANK_POLICIES 中的排序策略，
+    rerank_policy 有值時則直接覆寫；materialize 為 True 時回傳已載入的 SearchResults。
+    candidate_pool 為關鍵字與向量兩條路線各自取回的候選數量。
+    embedder / reranker 可替換查詢向量與遠端 rerank 的實作（例如 benchmark 使用的本地 stub），
+    reranker 需提供與 CohereRerank 相同的 compress_documents(documents, query)。
+    precision 未指定時使用 SEARCH_VECTOR_PRECISION。
+    rerank_candidates 限制送交遠端 rerank 的候選數（依本地融合分數取前段），其餘候選依本地排序接在後面。
+    """
+    ef_search: int = settings.SEARCH_HNSW_EF_SEARCH
+    top_n: int = 5
+    candidate_pool: int = 10
+    caller: str = "default"
+    rerank_policy: Optional[RerankPolicy] = None
+    materialize: bool = False
+    embedder: Optional[Callable[[str], list[float]]] = None
+    reranker: Optional[Any] = None
+    precision: Optional[VectorPrecision] = None
+    rerank_candidates: Optional[int] = None
+
+    def resolve_rerank_policy(self) -> RerankPolicy:
+        if self.rerank_policy:
+            return RerankPolicy(self.rerank_policy)
+        policies = settings.SEARCH_RERANK_POLICIES
+        return RerankPolicy(policies.get(self.caller, policies["default"]))
+
+
+@dataclass
+class SearchTimings:
+    """各階段耗時（毫秒）與筆數，供呼叫端記錄或除錯。"""
+    stages: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+
+    @contextmanager
+    def measure(self, stage: str):
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = round((perf_counter() - started_at) * 1000, 2)
+
+    def __str__(self) -> str:
+        stages = ", ".join(f"{name}={ms}ms" for name, ms in self.stages.items())
+        counts = ", ".join(f"{name}={count}" for name, count in self.counts.items())
+        return f"{stages} | {counts}"
+
+
+class SearchResults:
+    """
+    已排序且已載入的搜尋結果，介面與常用的 QuerySet 操作相容（count、切片、迭代、分頁），
+    每個物件附帶 relevance_score，避免重新查詢資料庫。
+    """
+
+    def __init__(self, objects: list, scores: dict):
+        self.objects = objects
+        self.scores = scores
+        for obj in objects:
+            obj.relevance_score = scores.get(obj.pk)
+
+    def count(self) -> int:
+        return len(self.objects)
+
+    def exists(self) -> bool:
+        return bool(self.objects)
+
+    def ids(self) -> list:
+        return [obj.pk for obj in self.objects]
+
+    def prefetch_related(self, *lookups) -> 'SearchResults':
+        prefetch_related_objects(self.objects, *lookups)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __getitem__(self, index):
+        return self.objects[index]
+
+    def __bool__(self) -> bool:
+        return bool(self.objects)
 
 
 def hybrid_search_with_rerank(
     queryset: QuerySet,
     vector_field_name: str,
     text_field_name: str,
-    original_question: str
-) -> QuerySet:
-    # 1. Extract keywords with OpenAI
-    prompt = ChatPromptTemplate.from_template(
-        "Extract relevant keywords from the following user question. "
-        "Return them as a comma-separated list. "
-        "User Question: {question}"
+    original_question: str,
+    options: Optional[SearchOptions] = None,
+    timings: Optional[SearchTimings] = None,
+) -> QuerySet | SearchResults:
+    options = options or SearchOptions()
+    timings = timings if timings is not None else SearchTimings()
+    # 正規化後的關鍵字欄位只給 GIN 索引使用，候選物件不需要載入
+    queryset = queryset.defer(keyword_field_name(text_field_name))
+
+    with timings.measure("total"):
+        # 1~3. 向量路線（embedding + 向量查詢）丟到背景執行緒，與關鍵字路線同時進行
+        vector_future = _search_executor.submit(
+            _run_in_worker, _vector_search,
+            queryset, vector_field_name, original_question, options, timings,
+        )
+        keyword_results = _keyword_search(queryset, text_field_name, original_question, options, timings)
+        vector_results = vector_future.result()
+
+        # 4. Combine and deduplicate results
+        with timings.measure("merge"):
+            combined_results = _merge_results(keyword_results, vector_results)
+        timings.counts["merged"] = len(combined_results)
+
+        # 5. 本地 RRF + BM25 融合排序，再依策略決定是否交給 Cohere rerank
+        with timings.measure("fusion"):
+            fused_scores = _fuse_scores(
+                keyword_results, vector_results, combined_results,
+                text_field_name, original_question,
+            )
+        with timings.measure("rerank"):
+            ranked = _rank_candidates(
+                combined_results, fused_scores, text_field_name, original_question, options, timings,
+            )
+        timings.counts["reranked"] = len(ranked)
+
+        # 6. 建立最終排序結果：直接沿用已載入的物件，或回傳依排序的 QuerySet（由呼叫端實際查詢）
+        final_results = _build_final_results(queryset, combined_results, ranked, options)
+
+    record_search_timings(
+        timings,
+        caller=options.caller,
+        model=embedding_model_name(options.embedder),
+        corpus=queryset.model._meta.label,
     )
-    model = ChatOpenAI()
-    parser = StrOutputParser()
-    chain = prompt | model | parser
-    keywords_str = chain.invoke({"question": original_question})
-    keywords = [keyword.strip() for keyword in keywords_str.split(',') if keyword.strip()]
+    return final_results
+
+
+def embedding_model_name(embedder: Optional[Callable[[str], list[float]]]) -> str:
+    """實際產生查詢向量的模型名稱；自訂 embedder 沒有 model 屬性時以類別或函式名稱代替。"""
+    if embedder is None:
+        return DEFAULT_EMBEDDING_MODEL
+    return getattr(embedder, "model", None) or getattr(embedder, "__qualname__", type(embedder).__name__)
+
+
+def _build_final_results(
+    queryset: QuerySet,
+    combined_results: list,
+    ranked: list[tuple],
+    options: SearchOptions,
+) -> QuerySet | SearchResults:
+    scores = dict(ranked)
+    sorted_ids = [result_id for result_id, _ in ranked]
+
+    if options.materialize:
+        results_by_id = {result.id: result for result in combined_results}
+        return SearchResults([results_by_id[pk] for pk in sorted_ids if pk in results_by_id], scores)
+
+    preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(sorted_ids)])
+    return queryset.model.objects.filter(pk__in=sorted_ids).order_by(preserved_order)
+
+
+def build_vector_queryset(
+    queryset: QuerySet,
+    vector_field_name: str,
+    embedding: list[float],
+    precision: VectorPrecision = VectorPrecision.FULL,
+) -> QuerySet:
+    """
+    距離函式與欄位表達式需與 HNSW 索引一致，索引才會被使用：
+    FULL 對應 vector_cosine_ops，HALFVEC 對應 halfvec_cosine_ops，BINARY 對應 bit_hamming_ops，
+    SHORT 則以縮短維度欄位（vector_cosine_ops）搭配同樣縮短的查詢向量。
+    """
+    dimensions = queryset.model._meta.get_field(vector_field_name).dimensions
+    query_vector = Value(Vector(embedding).to_text())
+
+    if precision == VectorPrecision.HALFVEC:
+        distance = CosineDistance(
+            halfvec_expression(vector_field_name, dimensions),
+            Cast(query_vector, halfvec_expression(vector_field_name, dimensions).output_field),
+        )
+    elif precision == VectorPrecision.BINARY:
+        distance = HammingDistance(
+            binary_expression(vector_field_name, dimensions),
+            BinaryQuantize(Cast(query_vector, VectorField(dimensions=dimensions))),
+        )
+    elif precision == VectorPrecision.SHORT:
+        distance = CosineDistance(short_field_name(vector_field_name), shorten_embedding(embedding))
+    else:
+        distance = CosineDistance(vector_field_name, embedding)
+
+    return queryset.annotate(distance=distance).order_by("distance")
+
+
+def vector_candidates(
+    queryset: QuerySet,
+    vector_field_name: str,
+    embedding: list[float],
+    limit: int,
+    ef_search: int,
+    scan_plan: VectorScanPlan = VectorScanPlan.ANN,
+    precision: VectorPrecision = VectorPrecision.FULL,
+    iterative_scan: bool = False,
+) -> list:
+    """
+    取回距離最近的 limit 筆。量化精度先多取 SEARCH_RESCORE_FACTOR 倍候選，
+    再以已載入的完整向量重新計算餘弦距離並排序；精確掃描時量化沒有意義，一律使用完整向量。
+    """
+    if scan_plan == VectorScanPlan.EXACT:
+        precision = VectorPrecision.FULL
+
+    fetch_limit = limit if precision == VectorPrecision.FULL else limit * settings.SEARCH_RESCORE_FACTOR
+    ef_search = max(ef_search, fetch_limit)
+
+    with hnsw_search_settings(ef_search, queryset.db, scan_plan, iterative_scan):
+        results = list(
+            build_vector_queryset(queryset, vector_field_name, embedding, precision)[:fetch_limit]
+        )
+
+    if precision != VectorPrecision.FULL:
+        rescore_by_full_vector(results, vector_field_name, embedding)
+
+    # relaxed_order 可能讓結果稍微亂序，依距離重新排序
+    results.sort(key=lambda result: result.distance)
+    return results[:limit]
+
+
+def rescore_by_full_vector(results: list, vector_field_name: str, embedding: list[float]):
+    if not results:
+        return
+
+    matrix = np.asarray([getattr(result, vector_field_name) for result in results], dtype=np.float32)
+    query = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    similarities = matrix @ query / np.where(norms == 0, 1, norms)
+
+    for result, similarity in zip(results, similarities):
+        result.distance = float(1 - similarity)
+
+
+@contextmanager
+def hnsw_search_settings(
+    ef_search: int,
+    using: str = "default",
+    scan_plan: VectorScanPlan = VectorScanPlan.ANN,
+    iterative_scan: bool = False,
+):
+    """
+    在同一個交易內以 SET LOCAL 語意調整向量查詢參數，交易結束即還原。
+    EXACT 會關閉 index scan，讓過濾條件先執行（bitmap scan 不受影響）再精確排序；
+    iterative_scan 開啟 pgvector 0.8 的迭代掃描，過濾後筆數不足時會繼續往下掃描索引。
+    """
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", [str(ef_search)])
+            if scan_plan == VectorScanPlan.EXACT:
+                cursor.execute("SELECT set_config('enable_indexscan', 'off', true)")
+            elif iterative_scan and supports_iterative_scan(using):
+                cursor.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+        yield
+
+
+def supports_iterative_scan(using: str = "default") -> bool:
+    """pgvector 0.8.0 起才有 hnsw.iterative_scan；版本只查一次並快取。"""
+    with _iterative_scan_support_lock:
+        if using not in _iterative_scan_support:
+            _iterative_scan_support[using] = pgvector_version(connections[using]) >= (0, 8)
+        return _iterative_scan_support[using]
+
+
+def plan_vector_scan(queryset: QuerySet) -> VectorScanPlan:
+    """
+    沒有過濾條件時一律走 ANN；有過濾條件時以 planner 預估的筆數決定，
+    筆數不超過 SEARCH_EXACT_SCAN_THRESHOLD 時精確掃描比 HNSW 過濾後再補撈更快也更準。
+    """
+    if not queryset.query.has_filters():
+        return VectorScanPlan.ANN
+
+    try:
+        estimated_rows = estimate_row_count(queryset)
+    except Exception as e:
+        print(f"預估過濾筆數失敗，改用 HNSW 搜尋：{str(e)}")
+        return VectorScanPlan.ANN
+
+    if estimated_rows <= settings.SEARCH_EXACT_SCAN_THRESHOLD:
+        return VectorScanPlan.EXACT
+    return VectorScanPlan.ANN
+
+
+def resolve_vector_precision(queryset: QuerySet, vector_field_name: str, precision: VectorPrecision) -> VectorPrecision:
+    """
+    科別、分類等部分 HNSW 索引只有完整精度，過濾條件命中部分索引時改用 FULL，
+    否則量化表達式的排序用不到部分索引，只能走全表索引後再過濾。
+    """
+    if precision != VectorPrecision.FULL and matches_partial_vector_index(queryset, vector_field_name):
+        return VectorPrecision.FULL
+    return precision
+
+
+def matches_partial_vector_index(queryset: QuerySet, vector_field_name: str) -> bool:
+    """查詢的等值過濾條件涵蓋某個部分 HNSW 索引的 condition 時回傳 True。"""
+    if not queryset.query.has_filters():
+        return False
+
+    exact_filters = _exact_filters(queryset.query.where)
+    for index in queryset.model._meta.indexes:
+        if not isinstance(index, HnswIndex) or index.condition is None or index.fields != [vector_field_name]:
+            continue
+        condition = index.condition
+        if condition.negated or condition.connector != Q.AND:
+            continue
+        if all(isinstance(child, tuple) and _filter_key(*child) in exact_filters for child in condition.children):
+            return True
+    return False
+
+
+def _exact_filters(where) -> set:
+    # 只收集 AND 串接、未取反的等值條件，OR 或 NOT 之下的條件不保證命中部分索引
+    filters = set()
+    if where.negated or where.connector != Q.AND:
+        return filters
+    for child in where.children:
+        if hasattr(child, "children"):
+            filters |= _exact_filters(child)
+        elif getattr(child, "lookup_name", None) == "exact" and hasattr(child.lhs, "target"):
+            key = _filter_key(child.lhs.target.name, child.rhs)
+            if key is not None:
+                filters.add(key)
+    return filters
+
+
+def _filter_key(field_name: str, value) -> Optional[tuple]:
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return field_name, value
+
+
+def estimate_row_count(queryset: QuerySet) -> int:
+    """只執行 EXPLAIN（不實際查詢），取 planner 預估的 Plan Rows。"""
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _run_in_worker(func, *args):
+    # 背景執行緒各自持有資料庫連線，用完即關閉以免連線外洩
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def _keyword_search(
+    queryset: QuerySet,
+    text_field_name: str,
+    question: str,
+    options: SearchOptions,
+    timings: SearchTimings,
+) -> list:
+    with timings.measure("keyword_extraction"):
+        keyword_query = build_keyword_query(extract_keywords(question))
 
-    # 2. Keyword-based search (Fuzzy search) - 在原始 queryset 上進行
     keyword_results = []
-    if keywords:
-        keyword_query = Q()
-        for keyword in keywords:
-            keyword_query |= Q(**{f"{text_field_name}__icontains": keyword})
-        keyword_results = list(queryset.filter(keyword_query)[:10])
-
-    # 3. Vector-based search - 在原始 queryset 上進行
-    question_embeddings = OpenAIEmbeddings(model="text-embedding-3-small").embed_query(original_question)
-    vector_results = list(queryset.annotate(
-        distance=CosineDistance(vector_field_name, question_embeddings)
-    ).order_by("distance")[:10])
-
-    # 4. Combine and deduplicate results
+    if keyword_query is not None:
+        with timings.measure("keyword_sql"):
+            keyword_results = list(queryset.alias(
+                keyword_document=BigramDocument(keyword_field_name(text_field_name))
+            ).filter(keyword_document=keyword_query)[:options.candidate_pool])
+
+    timings.counts["keyword"] = len(keyword_results)
+    return keyword_results
+
+
+def _vector_search(
+    queryset: QuerySet,
+    vector_field_name: str,
+    question: str,
+    options: SearchOptions,
+    timings: SearchTimings,
+) -> list:
+    with timings.measure("embedding"):
+        question_embeddings = (options.embedder or embed_query)(question)
+
+    snapshot = _usable_snapshot(queryset, vector_field_name)
+    if snapshot is not None:
+        with timings.measure("vector_snapshot"):
+            vector_results = snapshot_candidates(
+                snapshot, queryset, vector_field_name, question_embeddings, options.candidate_pool,
+            )
+        timings.counts["vector"] = len(vector_results)
+        timings.counts["snapshot"] = 1
+        return vector_results
+
+    with timings.measure("vector_plan"):
+        scan_plan = plan_vector_scan(queryset)
+        precision = resolve_vector_precision(
+            queryset,
+            vector_field_name,
+            VectorPrecision(options.precision or settings.SEARCH_VECTOR_PRECISION),
+        )
+
+    with timings.measure("vector_sql"):
+        vector_results = vector_candidates(
+            queryset,
+            vector_field_name,
+            question_embeddings,
+            limit=options.candidate_pool,
+            ef_search=options.ef_search,
+            scan_plan=scan_plan,
+            precision=precision,
+            iterative_scan=queryset.query.has_filters(),
+        )
+
+    timings.counts["vector"] = len(vector_results)
+    timings.counts["exact_scan"] = int(scan_plan == VectorScanPlan.EXACT)
+    return vector_results
+
+
+def _usable_snapshot(queryset: QuerySet, vector_field_name: str) -> Optional[VectorSnapshot]:
+    # 有過濾條件時交給 pgvector（科別 / 分類有部分索引），快照不需要先取出所有符合條件的 id
+    if not settings.VECTOR_SNAPSHOT_ENABLED or queryset.query.has_filters():
+        return None
+
+    label = queryset.model._meta.label
+    if SNAPSHOT_CORPORA.get(label) != vector_field_name:
+        return None
+    return get_vector_snapshot(label)
+
+
+def snapshot_candidates(
+    snapshot: VectorSnapshot,
+    queryset: QuerySet,
+    vector_field_name: str,
+    embedding: list[float],
+    limit: int,
+) -> list:
+    """
+    在行程內以快照做向量內積取候選，再以完整向量重新計分。只用於沒有過濾條件的查詢。
+    """
+    candidate_ids = snapshot.search(embedding, limit * settings.SEARCH_RESCORE_FACTOR)
+    objects_by_id = queryset.in_bulk(candidate_ids)
+    results = [objects_by_id[pk] for pk in candidate_ids if pk in objects_by_id]
+
+    rescore_by_full_vector(results, vector_field_name, embedding)
+    results.sort(key=lambda result: result.distance)
+    return results[:limit]
+
+
+def _merge_results(keyword_results: list, vector_results: list) -> list:
     combined_results = []
     seen_ids = set()
 
-    # 添加調試信息
-    print(f"關鍵字搜尋結果數量: {len(keyword_results)}")
-    print(f"向量搜尋結果數量: {len(vector_results)}")
-
-    # 合併兩個結果集並去重
     for result in keyword_results + vector_results:
         if result.id not in seen_ids:
             combined_results.append(result)
             seen_ids.add(result.id)
 
-    print(f"合併去重後結果數量: {len(combined_results)}")
+    return combined_results
+
+
+def _fuse_scores(
+    keyword_results: list,
+    vector_results: list,
+    combined_results: list,
+    text_field_name: str,
+    question: str,
+) -> Counter:
+    """以 Reciprocal Rank Fusion 合併關鍵字、向量與 BM25 三種排名。"""
+    query_terms = [bigram for keyword in extract_keywords(question) for bigram in to_bigrams(keyword)]
+    documents = [getattr(result, text_field_name) or "" for result in combined_results]
+    bm25 = bm25_scores(query_terms, documents)
+    bm25_ranking = [
+        result for _, result in sorted(
+            zip(bm25, combined_results), key=lambda pair: pair[0], reverse=True
+        )
+    ]
+
+    fused_scores = Counter()
+    for ranking in (keyword_results, vector_results, bm25_ranking):
+        for rank, result in enumerate(ranking, 1):
+            fused_scores[result.id] += 1 / (RRF_K + rank)
+    return fused_scores
+
+
+def bm25_scores(query_terms: list[str], documents: list[str]) -> list[float]:
+    """在候選集合內計算 BM25；中文以字元二元組作為詞項。"""
+    if not query_terms or not documents:
+        return [0.0] * len(documents)
+
+    tokenized = [Counter(to_bigrams(document)) for document in documents]
+    average_length = sum(sum(tokens.values()) for tokens in tokenized) / len(tokenized) or 1
+    document_frequency = Counter(term for tokens in tokenized for term in set(query_terms) & tokens.keys())
+
+    scores = []
+    for tokens in tokenized:
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(tokens.values()) / average_length)
+        score = 0.0
+        for term in set(query_terms):
+            frequency = tokens.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+        scores.append(score)
+    return scores
+
+
+def _rank_candidates(
+    combined_results: list,
+    fused_scores: Counter,
+    text_field_name: str,
+    question: str,
+    options: SearchOptions,
+    timings: SearchTimings,
+) -> list[tuple]:
+    """回傳 [(id, 分數), ...]；遠端 rerank 時為 Cohere relevance_score，否則為本地融合分數。"""
+    local_ranking = fused_scores.most_common(options.top_n)
+    policy = options.resolve_rerank_policy()
+    rerank_top_n = min(options.top_n, options.rerank_candidates or options.top_n)
+
+    if policy == RerankPolicy.LOCAL:
+        return local_ranking
+    if policy == RerankPolicy.ADAPTIVE and _can_skip_remote_rerank(fused_scores, rerank_top_n):
+        return local_ranking
 
-    # 5. Rerank using Cohere
-    reranker = CohereRerank(
-        model="rerank-multilingual-v3.0",
-        top_n=5
+    candidates = combined_results
+    if options.rerank_candidates and len(candidates) > options.rerank_candidates:
+        head_ids = {result_id for result_id, _ in fused_scores.most_common(options.rerank_candidates)}
+        candidates = [result for result in combined_results if result.id in head_ids]
+
+    rerank_model = getattr(options.reranker, "model", RERANK_MODEL)
+    cache_key = rerank_cache_key(candidates, text_field_name, question, rerank_top_n, rerank_model)
+    ranked = rerank_cache.get(cache_key)
+    if ranked is None:
+        try:
+            ranked = _remote_rerank(candidates, text_field_name, question, rerank_top_n, options.reranker)
+        except Exception as e:
+            print(f"Cohere rerank 失敗，改用本地排序：{str(e)}")
+            return local_ranking
+        rerank_cache.set(cache_key, ranked)
+        timings.counts["remote_rerank"] = 1
+
+    if len(ranked) >= options.top_n:
+        return ranked
+
+    # 只有前段送交 rerank 時，其餘名次依本地融合分數補齊
+    reranked_ids = {result_id for result_id, _ in ranked}
+    tail = [(result_id, score) for result_id, score in fused_scores.most_common() if result_id not in reranked_ids]
+    return ranked + tail[:options.top_n - len(ranked)]
+
+
+def rerank_cache_key(
+    combined_results: list,
+    text_field_name: str,
+    question: str,
+    top_n: int,
+    rerank_model: str = RERANK_MODEL,
+) -> str:
+    """
+    以正規化後的問題與排序後的 (id, 內容雜湊) 組成鍵值；
+    任一候選內容變動即產生新鍵值，舊結果自然失效並由 TTL 回收。
+    """
+    candidates = sorted(
+        (result.id, hashlib.sha256((getattr(result, text_field_name) or "").encode("utf-8")).hexdigest())
+        for result in combined_results
+    )
+    model_label = combined_results[0]._meta.label if combined_results else ""
+    content = f"{rerank_model}\x00{model_label}\x00{top_n}\x00{normalize_text(question)}\x00{candidates}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _can_skip_remote_rerank(fused_scores: Counter, top_n: int) -> bool:
+    if len(fused_scores) <= top_n:
+        return True
+
+    ranked_scores = [score for _, score in fused_scores.most_common(top_n + 1)]
+    boundary_score, next_score = ranked_scores[top_n - 1], ranked_scores[top_n]
+    return (boundary_score - next_score) / boundary_score >= settings.SEARCH_RERANK_SKIP_MARGIN
+
+
+def _remote_rerank(
+    combined_results: list,
+    text_field_name: str,
+    question: str,
+    top_n: int,
+    reranker=None,
+) -> list[tuple]:
+    reranker = reranker or CohereRerank(
+        model=RERANK_MODEL,
+        top_n=top_n
     )
 
     docs_to_rerank = [
-        Document(page_content=getattr(res, text_field_name), metadata={"id": res.id})
+        Document(page_content=getattr(res, text_field_name) or "", metadata={"id": res.id})
         for res in combined_results
     ]
 
     reranked_docs = reranker.compress_documents(
         documents=docs_to_rerank,
-        query=original_question
+        query=question
     )
 
-    print(f"Rerank 後結果數量: {len(reranked_docs)}")
-
-    # 6. 建立最終排序結果
-    sorted_ids = [doc.metadata["id"] for doc in reranked_docs]
-    preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(sorted_ids)])
-
-    final_queryset = queryset.model.objects.filter(pk__in=sorted_ids).order_by(preserved_order)
-    
-    print(f"最終結果數量: {final_queryset.count()}")
-    return final_queryset 
\ No newline at end of file
+    return [(doc.metadata["id"], doc.metadata.get("relevance_score")) for doc in reranked_docs[:top_n]]
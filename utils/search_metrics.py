@@ -0,0 +1,176 @@
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# 各階段對應到 SearchTimings.counts 中的筆數欄位
+STAGE_COUNT_KEYS = {
+    "keyword_sql": "keyword",
+    "vector_sql": "vector",
+    "merge": "merged",
+    "rerank": "reranked",
+    "semantic_cache": "semantic_cache_hit",
+}
+
+# 寫入 Redis 或資料庫都放到背景執行，不佔用搜尋回應時間
+_metrics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-metrics")
+_sinks = None
+
+
+@dataclass
+class StageRecord:
+    search_id: str
+    stage: str
+    duration_ms: float
+    result_count: Optional[int]
+    caller: str
+    model: str
+    corpus: str
+    timestamp: float
+
+
+def format_stage_records(records: list[StageRecord]) -> str:
+    stages = ", ".join(
+        f"{record.stage}={record.duration_ms}ms"
+        + (f"({record.result_count})" if record.result_count is not None else "")
+        for record in records
+    )
+    first = records[0]
+    return f"hybrid search 階段耗時（{first.caller} / {first.corpus} / {first.model}）：{stages}"
+
+
+class LogSink:
+    """寫入 logging（utils.search_metrics，INFO 等級），是否輸出由 LOGGING 設定決定。"""
+    synchronous = True
+
+    def emit(self, records: list[StageRecord]):
+        if records:
+            logger.info(format_stage_records(records))
+
+
+class PrintSink:
+    """直接 print 到標準輸出，只建議在本機除錯時使用。"""
+    synchronous = True
+
+    def emit(self, records: list[StageRecord]):
+        if records:
+            print(format_stage_records(records))
+
+
+class RedisStreamSink:
+    """每個階段寫入一條 Redis Stream（XADD + MAXLEN 近似裁切），作為輕量的時間序列。"""
+
+    def __init__(self):
+        import redis
+        self.client = redis.Redis.from_url(settings.SEARCH_CACHE_REDIS_URL)
+        self.max_length = settings.SEARCH_METRICS_REDIS_MAXLEN
+
+    def emit(self, records: list[StageRecord]):
+        pipeline = self.client.pipeline(transaction=False)
+        for record in records:
+            fields = {key: value for key, value in asdict(record).items() if value is not None}
+            pipeline.xadd(
+                f"ragpilot:search_metrics:{record.stage}",
+                fields,
+                maxlen=self.max_length,
+                approximate=True,
+            )
+        pipeline.execute()
+
+
+class DatabaseSink:
+    """
+    寫入 home.SearchStageMetric，每次搜尋約十筆，需手動加入 SEARCH_METRICS_SINKS 才會啟用；
+    超過 SEARCH_METRICS_RETENTION_DAYS 的紀錄由排程的 purge_search_metrics 清除。
+    """
+
+    def emit(self, records: list[StageRecord]):
+        from home.models import SearchStageMetric
+
+        using = router.db_for_write(SearchStageMetric)
+        try:
+            SearchStageMetric.objects.using(using).bulk_create([
+                SearchStageMetric(
+                    search_id=record.search_id,
+                    stage=record.stage,
+                    duration_ms=record.duration_ms,
+                    result_count=record.result_count,
+                    caller=record.caller,
+                    model=record.model,
+                    corpus=record.corpus,
+                )
+                for record in records
+            ])
+        finally:
+            # 只關閉背景執行緒自己的連線
+            connections[using].close()
+
+
+METRIC_SINKS = {
+    "log": LogSink,
+    "print": PrintSink,
+    "redis": RedisStreamSink,
+    "database": DatabaseSink,
+}
+
+
+def get_metric_sinks() -> list:
+    """SEARCH_METRICS_SINKS 可填內建名稱（log / print / redis / database）或自訂類別的完整路徑。"""
+    global _sinks
+    if _sinks is None:
+        sinks = []
+        for name in settings.SEARCH_METRICS_SINKS:
+            sink_class = METRIC_SINKS.get(name) or import_string(name)
+            sinks.append(sink_class())
+        _sinks = sinks
+    return _sinks
+
+
+def record_search_timings(timings, caller: str, model: str, corpus: str):
+    search_id = str(uuid.uuid4())
+    timestamp = time.time()
+    records = [
+        StageRecord(
+            search_id=search_id,
+            stage=stage,
+            duration_ms=duration_ms,
+            result_count=timings.counts.get(STAGE_COUNT_KEYS.get(stage)),
+            caller=caller,
+            model=model,
+            corpus=corpus,
+            timestamp=timestamp,
+        )
+        for stage, duration_ms in timings.stages.items()
+    ]
+
+    for sink in get_metric_sinks():
+        if getattr(sink, "synchronous", False):
+            sink.emit(records)
+        else:
+            _metrics_executor.submit(_emit_in_background, sink, records)
+
+
+def purge_search_metrics(days: Optional[int] = None) -> int:
+    """刪除超過保留天數的 SearchStageMetric，回傳刪除筆數。"""
+    from home.models import SearchStageMetric
+
+    days = settings.SEARCH_METRICS_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = SearchStageMetric.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _emit_in_background(sink, records: list[StageRecord]):
+    try:
+        sink.emit(records)
+    except Exception as e:
+        print(f"寫入搜尋耗時紀錄失敗（{type(sink).__name__}）：{str(e)}")
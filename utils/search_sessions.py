@@ -0,0 +1,99 @@
+import hashlib
+import json
+import secrets
+from typing import Callable, Optional
+from django.conf import settings
+from django.db.models import QuerySet
+from utils.cache import TwoTierCache
+from utils.search import SearchOptions, SearchResults
+
+search_session_cache = TwoTierCache(
+    namespace="search_session",
+    max_entries=settings.SEARCH_SESSION_CACHE_SIZE,
+    ttl=settings.SEARCH_SESSION_TTL,
+)
+
+
+class RankedResultList:
+    """
+    依快取的排序 id 清單延遲載入物件，給 Paginator 使用；
+    每次切片只查詢當頁的資料，並保留 relevance_score。
+    """
+
+    def __init__(self, queryset: QuerySet, ids: list, scores: dict):
+        self.queryset = queryset
+        self.ids = ids
+        self.scores = scores
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def prefetch_related(self, *lookups) -> 'RankedResultList':
+        self.queryset = self.queryset.prefetch_related(*lookups)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1 or None][0]
+
+        page_ids = self.ids[index]
+        objects_by_id = self.queryset.in_bulk(page_ids)
+        page = [objects_by_id[pk] for pk in page_ids if pk in objects_by_id]
+        for obj in page:
+            obj.relevance_score = self.scores.get(obj.pk)
+        return page
+
+
+def list_view_search_options(page_size: int) -> SearchOptions:
+    """
+    分頁快取取回 SEARCH_SESSION_CANDIDATE_POOL 筆排序結果，
+    但只有前 page_size × SEARCH_LIST_VIEW_RERANK_FACTOR 筆送交 Cohere rerank，控制每次列表搜尋的 API 費用。
+    """
+    pool_size = settings.SEARCH_SESSION_CANDIDATE_POOL
+    return SearchOptions(
+        caller="list_view",
+        materialize=True,
+        top_n=pool_size,
+        candidate_pool=pool_size,
+        rerank_candidates=page_size * settings.SEARCH_LIST_VIEW_RERANK_FACTOR,
+    )
+
+
+def search_fingerprint(queryset: QuerySet, **params) -> str:
+    content = json.dumps(
+        {"model": queryset.model._meta.label, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_or_create_search_session(
+    token: Optional[str],
+    queryset: QuerySet,
+    fingerprint: str,
+    run_search: Callable[[], SearchResults],
+) -> tuple[str, RankedResultList]:
+    """
+    分頁時以 token 取回第一次搜尋的排序結果，避免每次換頁都重跑整條檢索流程；
+    token 過期或查詢條件不同時才重新搜尋並建立新的 token。
+    """
+    session = search_session_cache.get(token) if token else None
+
+    if not session or session["fingerprint"] != fingerprint:
+        results = run_search()
+        token = secrets.token_urlsafe(12)
+        session = {
+            "fingerprint": fingerprint,
+            "ids": [obj.pk for obj in results],
+            "scores": dict(results.scores) if isinstance(results, SearchResults) else {},
+        }
+        search_session_cache.set(token, session)
+
+    return token, RankedResultList(queryset, session["ids"], session["scores"])
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import uuid
+from typing import Callable
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import QuerySet
+from redis.exceptions import RedisError
+from utils.corpus_version import get_corpus_version
+from utils.embeddings import embed_query
+from utils.search import SearchResults, SearchTimings, embedding_model_name
+from utils.search_metrics import record_search_timings
+from utils.vectors import shorten_embedding
+
+SEMANTIC_CACHE_ALIAS = "search"
+ENTRY_ID_BYTES = 16
+
+
+def semantic_scope_key(queryset: QuerySet, scope: dict) -> str:
+    content = json.dumps(
+        {"model": queryset.model._meta.label, "scope": scope},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return f"semantic_query:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+
+def cached_semantic_search(
+    queryset: QuerySet,
+    question: str,
+    scope: dict,
+    run_search: Callable[[], SearchResults | QuerySet],
+) -> SearchResults | QuerySet:
+    """
+    語意相近的查詢直接沿用先前的結果清單（例如「頭痛怎麼辦」與「頭痛該怎麼處理」）。
+    scope 為資料類型以外會影響結果的條件（過濾條件、呼叫端等），不同 scope 之間不共用；
+    快取鍵包含目前的資料集版本，版本更新後舊項目不再被讀取，由 TTL 自然過期。
+    """
+    if not question.strip():
+        # 空白問題無法產生查詢向量，也不是語意搜尋結果，直接執行搜尋
+        return run_search()
+
+    label = queryset.model._meta.label
+    corpus_version = get_corpus_version(label)
+    if corpus_version is None:
+        # 版本未知時無法判斷快取是否仍有效，不讀也不寫
+        return run_search()
+
+    timings = SearchTimings()
+    cache_key = f"{semantic_scope_key(queryset, scope)}:{corpus_version}"
+    with timings.measure("semantic_cache"):
+        query_vector = np.asarray(shorten_embedding(embed_query(question)), dtype=np.float32)
+        cached = _find_similar_entry(cache_key, query_vector)
+
+    if cached is not None:
+        results = _load_results(queryset, cached["ids"], cached["scores"])
+        timings.counts["semantic_cache_hit"] = results.count()
+        record_search_timings(
+            timings,
+            caller=scope.get("caller", "default"),
+            model=embedding_model_name(None),
+            corpus=label,
+        )
+        return results
+
+    results = run_search()
+
+    # 只有 SearchResults 帶有排序分數可快取；搜尋退回一般 QuerySet 時不寫入
+    if isinstance(results, SearchResults):
+        _add_entry(cache_key, query_vector, {
+            "question": question,
+            "ids": results.ids(),
+            "scores": dict(results.scores),
+        })
+
+    return results
+
+
+def _load_results(queryset: QuerySet, ids: list, scores: dict) -> SearchResults:
+    objects_by_id = queryset.in_bulk(ids)
+    return SearchResults([objects_by_id[pk] for pk in ids if pk in objects_by_id], scores)
+
+
+def _redis_client(cache, key: str, write: bool = False):
+    return cache._cache.get_client(key, write=write)
+
+
+def _find_similar_entry(cache_key: str, query_vector: np.ndarray):
+    """
+    向量清單的每個元素為 entry id（16 bytes）加上 float32 向量的原始 bytes，比對時不需要反序列化；
+    只有相似度達門檻的那一筆才讀取並反序列化結果內容。
+    """
+    cache = caches[SEMANTIC_CACHE_ALIAS]
+    vectors_key = cache.make_key(f"{cache_key}:vectors")
+    try:
+        items = _redis_client(cache, vectors_key).lrange(vectors_key, 0, settings.SEMANTIC_QUERY_CACHE_MAX_ENTRIES - 1)
+        items = [item for item in items if len(item) == ENTRY_ID_BYTES + query_vector.nbytes]
+        if not items:
+            return None
+
+        matrix = np.frombuffer(b"".join(item[ENTRY_ID_BYTES:] for item in items), dtype=np.float32)
+        similarities = matrix.reshape(len(items), -1) @ query_vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < settings.SEMANTIC_QUERY_CACHE_THRESHOLD:
+            return None
+        # 內容鍵已過期時視為未命中
+        return cache.get(_entry_key(cache_key, items[best][:ENTRY_ID_BYTES]))
+    except RedisError as e:
+        print(f"⚠️  讀取語意查詢快取失敗：{e}")
+        return None
+
+
+def _add_entry(cache_key: str, query_vector: np.ndarray, payload: dict):
+    """
+    先寫入內容鍵再 LPUSH 向量，讀到向量時內容必定已存在；LPUSH + LTRIM 為原子操作，
+    並行寫入不會互相覆蓋，清單只保留最新的 SEMANTIC_QUERY_CACHE_MAX_ENTRIES 筆。
+    """
+    cache = caches[SEMANTIC_CACHE_ALIAS]
+    entry_id = uuid.uuid4().bytes
+    vectors_key = cache.make_key(f"{cache_key}:vectors")
+    try:
+        cache.set(_entry_key(cache_key, entry_id), payload, timeout=settings.SEMANTIC_QUERY_CACHE_TTL)
+        pipeline = _redis_client(cache, vectors_key, write=True).pipeline(transaction=True)
+        pipeline.lpush(vectors_key, entry_id + query_vector.tobytes())
+        pipeline.ltrim(vectors_key, 0, settings.SEMANTIC_QUERY_CACHE_MAX_ENTRIES - 1)
+        pipeline.expire(vectors_key, settings.SEMANTIC_QUERY_CACHE_TTL)
+        pipeline.execute()
+    except RedisError as e:
+        print(f"⚠️  寫入語意查詢快取失敗：{e}")
+
+
+def _entry_key(cache_key: str, entry_id: bytes) -> str:
+    return f"{cache_key}:entry:{entry_id.hex()}"
@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from django.apps import apps
+from django.conf import settings
+from django.contrib.postgres.indexes import OpClass
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connections
+from django.db.migrations.operations.base import Operation
+from pgvector.django import HnswIndex
+from utils.vectors import (
+    VectorPrecision,
+    binary_expression,
+    halfvec_expression,
+    pgvector_version,
+    quantized_index_name,
+    short_field_name,
+)
+
+# halfvec、binary_quantize 與 bit_hamming_ops 需要 pgvector 0.7.0 以上
+QUANTIZED_MIN_PGVECTOR_VERSION = (0, 7)
+
+
+@dataclass(frozen=True)
+class VectorSearchColumn:
+    """
+    向量搜尋欄位的 HNSW 索引設定。migrations 一律建立完整精度索引，之後由 sync_vector_indexes
+    依 SEARCH_VECTOR_PRECISION 以新索引取代舊索引，每個欄位不會同時維護多份 HNSW 圖。
+    """
+    vector_field_name: str
+    dimensions: int
+    prefix: str
+    full_index_name: str
+
+    def index(self, precision: VectorPrecision) -> HnswIndex:
+        if precision == VectorPrecision.HALFVEC:
+            return HnswIndex(
+                OpClass(halfvec_expression(self.vector_field_name, self.dimensions), name="halfvec_cosine_ops"),
+                name=quantized_index_name(self.prefix, precision),
+                m=16,
+                ef_construction=64,
+            )
+        if precision == VectorPrecision.BINARY:
+            return HnswIndex(
+                OpClass(binary_expression(self.vector_field_name, self.dimensions), name="bit_hamming_ops"),
+                name=quantized_index_name(self.prefix, precision),
+                m=16,
+                ef_construction=64,
+            )
+        if precision == VectorPrecision.SHORT:
+            return HnswIndex(
+                name=quantized_index_name(self.prefix, precision),
+                fields=[short_field_name(self.vector_field_name)],
+                m=16,
+                ef_construction=64,
+                opclasses=["vector_cosine_ops"],
+            )
+        return HnswIndex(
+            name=self.full_index_name,
+            fields=[self.vector_field_name],
+            m=16,
+            ef_construction=64,
+            opclasses=["vector_cosine_ops"],
+        )
+
+    def indexes(self) -> dict[VectorPrecision, HnswIndex]:
+        return {precision: self.index(precision) for precision in VectorPrecision}
+
+
+# 以模型 label 對應向量搜尋欄位；索引由 SyncVectorSearchIndex / sync_vector_indexes 管理，不寫在 Meta.indexes
+VECTOR_SEARCH_COLUMNS = {
+    "crawlers.Symptom": VectorSearchColumn("question_embeddings", 1536, "symp_q_emb", "crawlers_symp_q_emb_hnsw_idx"),
+    "crawlers.Dataset": VectorSearchColumn("description_embeddings", 1536, "ds_desc_emb", "crawlers_desc_emb_hnsw_idx"),
+    "sources.SourceFile": VectorSearchColumn("summary_embedding", 1536, "file_summary_emb", "file_summary_embedding_hnsw_idx"),
+    "sources.SourceFileChunk": VectorSearchColumn("content_embedding", 1536, "file_chunk_emb", "file_chunk_embedding_hnsw_idx"),
+}
+
+
+def resolve_index_precision(connection, model, precision: VectorPrecision) -> VectorPrecision:
+    if precision in (VectorPrecision.HALFVEC, VectorPrecision.BINARY):
+        version = pgvector_version(connection)
+        if version < QUANTIZED_MIN_PGVECTOR_VERSION:
+            raise ImproperlyConfigured(
+                f"SEARCH_VECTOR_PRECISION={precision} 需要 pgvector 0.7.0 以上，"
+                f"目前為 {'.'.join(map(str, version))}，請更新映像檔後執行 ALTER EXTENSION vector UPDATE"
+            )
+    if precision == VectorPrecision.SHORT:
+        column = VECTOR_SEARCH_COLUMNS[model._meta.label]
+        with connection.cursor() as cursor:
+            column_names = {
+                description.name
+                for description in connection.introspection.get_table_description(cursor, model._meta.db_table)
+            }
+        if short_field_name(column.vector_field_name) not in column_names:
+            # 尚未 migrate 到加入縮短維度欄位的版本
+            print(f"⚠️  {model._meta.label} 尚無縮短維度欄位，暫時保留 full 索引")
+            return VectorPrecision.FULL
+    return precision
+
+
+def sync_vector_search_index(schema_editor, model, precision: VectorPrecision) -> VectorPrecision:
+    """
+    先建立 precision 對應的索引，再刪除其他精度的索引，切換期間查詢不會失去索引。
+    回傳實際保留的索引精度。
+    """
+    column = VECTOR_SEARCH_COLUMNS[model._meta.label]
+    connection = schema_editor.connection
+    precision = resolve_index_precision(connection, model, precision)
+
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.get_constraints(cursor, model._meta.db_table))
+
+    selected = column.index(precision)
+    if selected.name not in existing:
+        schema_editor.add_index(model, selected)
+
+    for other_precision, index in column.indexes().items():
+        if other_precision != precision and index.name in existing:
+            schema_editor.remove_index(model, index)
+    return precision
+
+
+class SyncVectorSearchIndex(Operation):
+    """
+    建立完整精度向量搜尋索引的 migration 操作，只影響資料庫、不改變 migration state。
+    結果不受執行 migrate 時的設定影響；改用其他精度請執行 manage.py sync_vector_indexes。
+    """
+    reversible = True
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [], {"model_name": self.model_name}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            sync_vector_search_index(schema_editor, model, VectorPrecision.FULL)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            sync_vector_search_index(schema_editor, model, VectorPrecision.FULL)
+
+    def describe(self):
+        return f"Sync full precision vector search HNSW index on {self.model_name}"
+
+    @property
+    def migration_name_fragment(self):
+        return f"sync_vector_search_index_{self.model_name.lower()}"
+
+
+def check_vector_search_indexes(app_configs=None, databases=None, **kwargs):
+    """
+    系統檢查：資料庫中的向量搜尋索引與 SEARCH_VECTOR_PRECISION 不一致時提出警告。
+    屬於 database 類檢查，只在 migrate 或 check --database 時執行。
+    """
+    if not databases:
+        return []
+
+    precision = VectorPrecision(settings.SEARCH_VECTOR_PRECISION)
+    warnings = []
+    for alias in databases:
+        connection = connections[alias]
+        for label, column in VECTOR_SEARCH_COLUMNS.items():
+            model = apps.get_model(label)
+            expected = column.index(precision).name
+            try:
+                with connection.cursor() as cursor:
+                    existing = set(connection.introspection.get_constraints(cursor, model._meta.db_table))
+            except DatabaseError:
+                # 資料庫尚未建立或連不上時由其他檢查回報
+                return warnings
+            if expected not in existing:
+                warnings.append(checks.Warning(
+                    f"{label} 缺少 SEARCH_VECTOR_PRECISION={precision} 對應的 HNSW 索引 {expected}",
+                    hint="執行 python manage.py sync_vector_indexes 切換向量索引精度",
+                    obj=label,
+                    id="crawlers.W001",
+                ))
+    return warnings
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from utils.corpus_version import get_corpus_version
+from utils.vectors import SHORT_EMBEDDING_DIMENSIONS
+
+# 只有爬蟲資料（只在排程爬取時變動）適合做快照
+SNAPSHOT_CORPORA = {
+    "crawlers.Symptom": "question_embeddings",
+    "crawlers.Dataset": "description_embeddings",
+}
+
+SNAPSHOT_BATCH_SIZE = 2000
+
+_loaded_snapshots = {}
+_loaded_snapshots_lock = threading.Lock()
+
+
+@dataclass
+class VectorSnapshot:
+    """
+    以 np.load(mmap_mode="r") 載入的向量快照，同一台機器上的所有行程共用作業系統的 page cache。
+    向量為完整 embedding 前 256 維經 L2 正規化的結果，內積即為餘弦相似度。
+    """
+    label: str
+    ids: np.ndarray
+    vectors: np.ndarray
+    created_at: float
+    corpus_version: Optional[str]
+    meta_mtime: int
+
+    def is_stale(self) -> bool:
+        if time.time() - self.created_at > settings.VECTOR_SNAPSHOT_MAX_AGE:
+            return True
+
+        # 版本未知（Redis 無法連線或建立快照時讀不到版本）時無法確認快照仍有效，一律視為過期
+        current_version = get_corpus_version(self.label)
+        if current_version is None or self.corpus_version is None:
+            return True
+        return current_version != self.corpus_version
+
+    def search(self, embedding: list[float], limit: int) -> list[int]:
+        query = np.asarray(embedding[:SHORT_EMBEDDING_DIMENSIONS], dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+        scores = self.vectors @ query
+
+        limit = min(limit, len(scores))
+        if limit <= 0:
+            return []
+
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return self.ids[top].tolist()
+
+
+def get_vector_snapshot(label: str) -> Optional[VectorSnapshot]:
+    """回傳可用的快照；不存在或已過期時回傳 None，呼叫端改用 pgvector。"""
+    if label not in SNAPSHOT_CORPORA:
+        return None
+
+    meta_path = _snapshot_meta_path(label)
+    try:
+        meta_mtime = os.stat(meta_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _loaded_snapshots_lock:
+        snapshot = _loaded_snapshots.get(label)
+        if snapshot is None or snapshot.meta_mtime != meta_mtime:
+            try:
+                snapshot = _load_snapshot(label, meta_path, meta_mtime)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  載入向量快照失敗（{label}）：{e}")
+                return None
+            _loaded_snapshots[label] = snapshot
+
+    if snapshot.is_stale():
+        return None
+    return snapshot
+
+
+def build_vector_snapshot(label: str) -> dict:
+    """
+    從資料庫串流讀取完整向量，縮短為 256 維後寫成 .npy 檔。
+    資料檔以新的 generation 名稱寫入，最後才以 os.replace 原子性地更新 meta 檔，
+    讀取中的行程不會看到寫到一半的檔案。
+    """
+    model = apps.get_model(label)
+    vector_field_name = SNAPSHOT_CORPORA[label]
+    # 先取版本號再讀資料，讀取期間若有異動，快照會因版本不符而被視為過期
+    corpus_version = get_corpus_version(label)
+
+    id_batches, vector_batches = [], []
+    batch_ids, batch_vectors = [], []
+    queryset = model.objects.filter(**{f"{vector_field_name}__isnull": False}).order_by("pk")
+    for pk, embedding in queryset.values_list("pk", vector_field_name).iterator(chunk_size=SNAPSHOT_BATCH_SIZE):
+        batch_ids.append(pk)
+        batch_vectors.append(embedding[:SHORT_EMBEDDING_DIMENSIONS])
+        if len(batch_ids) >= SNAPSHOT_BATCH_SIZE:
+            id_batches.append(np.asarray(batch_ids, dtype=np.int64))
+            vector_batches.append(_normalize_rows(batch_vectors))
+            batch_ids, batch_vectors = [], []
+
+    if batch_ids:
+        id_batches.append(np.asarray(batch_ids, dtype=np.int64))
+        vector_batches.append(_normalize_rows(batch_vectors))
+
+    ids = np.concatenate(id_batches) if id_batches else np.empty(0, dtype=np.int64)
+    vectors = (
+        np.concatenate(vector_batches) if vector_batches
+        else np.empty((0, SHORT_EMBEDDING_DIMENSIONS), dtype=np.float32)
+    )
+
+    snapshot_dir = Path(settings.VECTOR_SNAPSHOT_DIR)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    generation = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    name = _snapshot_name(label)
+
+    meta = {
+        "label": label,
+        "generation": generation,
+        "count": len(ids),
+        "dimensions": SHORT_EMBEDDING_DIMENSIONS,
+        "created_at": time.time(),
+        "corpus_version": corpus_version,
+        "ids_file": f"{name}-{generation}.ids.npy",
+        "vectors_file": f"{name}-{generation}.vectors.npy",
+    }
+    _atomic_save_array(snapshot_dir / meta["ids_file"], ids)
+    _atomic_save_array(snapshot_dir / meta["vectors_file"], vectors)
+    _atomic_write_text(_snapshot_meta_path(label), json.dumps(meta, ensure_ascii=False))
+
+    _remove_old_generations(snapshot_dir, name, keep={meta["ids_file"], meta["vectors_file"]})
+    return meta
+
+
+def _load_snapshot(label: str, meta_path: Path, meta_mtime: int) -> VectorSnapshot:
+    meta = json.loads(meta_path.read_text())
+    snapshot_dir = meta_path.parent
+    return VectorSnapshot(
+        label=label,
+        ids=np.load(snapshot_dir / meta["ids_file"], mmap_mode="r"),
+        vectors=np.load(snapshot_dir / meta["vectors_file"], mmap_mode="r"),
+        created_at=meta["created_at"],
+        corpus_version=meta["corpus_version"],
+        meta_mtime=meta_mtime,
+    )
+
+
+def _normalize_rows(rows: list) -> np.ndarray:
+    matrix = np.asarray(rows, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _snapshot_name(label: str) -> str:
+    return label.replace(".", "_").lower()
+
+
+def _snapshot_meta_path(label: str) -> Path:
+    return Path(settings.VECTOR_SNAPSHOT_DIR) / f"{_snapshot_name(label)}.json"
+
+
+def _atomic_save_array(path: Path, array: np.ndarray):
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    with open(temporary_path, "wb") as file:
+        np.save(file, array)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def _atomic_write_text(path: Path, content: str):
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    with open(temporary_path, "w") as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def _remove_old_generations(snapshot_dir: Path, name: str, keep: set[str]):
+    # 已 mmap 舊檔的行程在 Linux 上仍可繼續讀取已刪除的檔案，直到重新載入
+    for path in snapshot_dir.glob(f"{name}-*.npy"):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"⚠️  無法刪除舊的向量快照 {path.name}：{e}")
@@ -0,0 +1,69 @@
+import math
+from enum import StrEnum
+from typing import Optional
+from django.conf import settings
+from django.db.models import Func
+from django.db.models.functions import Cast
+from pgvector.django import BitField, HalfVectorField
+
+
+class VectorPrecision(StrEnum):
+    FULL = "full"  # 直接以 float32 向量走 HNSW
+    HALFVEC = "halfvec"  # 先以 halfvec（float16）索引取候選，再以完整向量重新計分
+    BINARY = "binary"  # 先以 binary_quantize 後的 bit 索引（Hamming 距離）取候選，再以完整向量重新計分
+    SHORT = "short"  # 先以縮短維度的向量欄位取候選，再以完整向量重新計分
+
+
+# text-embedding-3 系列支援縮短維度：取前 N 維再做 L2 正規化
+SHORT_EMBEDDING_DIMENSIONS = 256
+
+QUANTIZED_INDEX_SUFFIXES = {
+    VectorPrecision.HALFVEC: "half",
+    VectorPrecision.BINARY: "bin",
+    VectorPrecision.SHORT: "short",
+}
+
+
+class BinaryQuantize(Func):
+    """pgvector 的 binary_quantize()：每個維度只保留正負號。"""
+    function = "binary_quantize"
+
+
+def halfvec_expression(vector_field_name: str, dimensions: int) -> Cast:
+    return Cast(vector_field_name, HalfVectorField(dimensions=dimensions))
+
+
+def binary_expression(vector_field_name: str, dimensions: int) -> Cast:
+    return Cast(BinaryQuantize(vector_field_name), BitField(length=dimensions))
+
+
+def quantized_index_name(prefix: str, precision: VectorPrecision) -> str:
+    return f"{prefix}_{QUANTIZED_INDEX_SUFFIXES[precision]}_hnsw"
+
+
+def pgvector_version(connection) -> tuple[int, int]:
+    """資料庫目前安裝的 pgvector 版本（major, minor），未安裝時為 (0, 0)。"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+    return tuple(int(part) for part in row[0].split(".")[:2]) if row else (0, 0)
+
+
+def short_field_name(vector_field_name: str) -> str:
+    return f"{vector_field_name}_short"
+
+
+def shorten_embedding(embedding, dimensions: int = SHORT_EMBEDDING_DIMENSIONS) -> list[float]:
+    """與 API 的 dimensions 參數結果相同，不需要重新呼叫 OpenAI。"""
+    truncated = [float(value) for value in list(embedding)[:dimensions]]
+    norm = math.sqrt(sum(value * value for value in truncated))
+    if not norm:
+        return truncated
+    return [value / norm for value in truncated]
+
+
+def short_embedding_for_storage(embedding) -> Optional[list[float]]:
+    """只有 SEARCH_VECTOR_PRECISION 為 short 時才寫入縮短維度欄位，其他精度不需要多維護一份向量。"""
+    if embedding is None or settings.SEARCH_VECTOR_PRECISION != VectorPrecision.SHORT:
+        return None
+    return shorten_embedding(embedding)